@@ -0,0 +1,150 @@
+"""
+Benchmark the combined ranking of many races: time and peak memory of the
+external merge sort of combined_ranking under memory budgets, on 5M results
+spread over sorted race CSVs.
+
+Each ranking runs in a fresh interpreter. The in-memory ranking (a budget
+large enough for a single chunk, i.e. one sort of every row) is measured on
+fewer rows, as it needs several GB at 5M, and must write the same CSV as the
+external sort. The 5M-row rankings are checked to be ordered by race time,
+with consecutive positions.
+
+    python benchmarks/bench_combined_ranking.py [--rows 5000000] [--races 50]
+        [--budgets 16,64,256] [--reference-rows 500000]
+"""
+import argparse
+import csv
+import filecmp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from race_time import race_time_key  # noqa: E402
+from synthetic import make_participants  # noqa: E402
+
+# VmHWM is the peak RSS of the interpreter itself, without the peak of the
+# parent process it was forked from
+MEASURE = """
+import json, sys, time
+from combined_ranking import rank_results
+start = time.perf_counter()
+stats = rank_results([sys.argv[1]], sys.argv[2], int(sys.argv[3]), sys.argv[4])
+stats["seconds"] = time.perf_counter() - start
+with open("/proc/self/status") as status:
+    stats["peak_kib"] = int(next(line.split()[1] for line in status if line.startswith("VmHWM:")))
+print(json.dumps(stats))
+"""
+
+# Memory budget so large that every row is sorted in a single chunk
+IN_MEMORY_BUDGET = 1 << 50
+
+
+def write_races(directory, rows, races):
+    """Write rows results spread over races sorted CSVs, as main.py writes them."""
+    os.makedirs(directory)
+    per_race, extra = divmod(rows, races)
+    for race in range(races):
+        participants = make_participants(per_race + (race < extra), seed=race)
+        participants.sort(key=lambda participant: race_time_key(participant[6]))
+        with open(os.path.join(directory, f"race{race:03d}_sorted.csv"), "w", newline="",
+                  encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["pos", "pett", "athlete", "year", "sex", "team", "nat", "time"])
+            writer.writerows([position] + row for position, row in enumerate(participants, 1))
+
+
+def measure(directory, output_path, budget, temp_dir):
+    """Rank a folder in a fresh interpreter and return its stats."""
+    import json
+
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE, directory, output_path, str(budget), temp_dir],
+        cwd=REPO_ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def check_ranking(path, rows):
+    """Return an error message if a ranking CSV is not a valid ranking of rows results."""
+    previous_key = -1
+    count = 0
+    with open(path, newline="", encoding="utf-8") as csv_file:
+        reader = csv.reader(csv_file)
+        next(reader)
+        for count, row in enumerate(reader, 1):
+            key = race_time_key(row[-1])
+            if int(row[0]) != count:
+                return f"position {row[0]} at row {count}"
+            if key < previous_key:
+                return f"row {count} is faster than the previous one"
+            previous_key = key
+    if count != rows:
+        return f"{count} results instead of {rows}"
+    return None
+
+
+def report(label, stats):
+    print(
+        f"{label:<24} {stats['rows']:>9} rows {stats['chunks']:>5} chunks "
+        f"{stats['seconds']:>7.2f}s {stats['rows'] / stats['seconds']:>10,.0f} rows/s "
+        f"peak RSS {stats['peak_kib'] / 1024:>7.1f} MiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000, help="results to rank")
+    parser.add_argument("--races", type=int, default=50, help="race CSVs the results are spread over")
+    parser.add_argument("--budgets", default="16,64,256", help="comma separated memory budgets in MB")
+    parser.add_argument(
+        "--reference-rows", type=int, default=500_000,
+        help="results of the comparison with the in-memory ranking"
+    )
+    args = parser.parse_args()
+    budgets = [float(budget) for budget in args.budgets.split(",")]
+
+    errors = []
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        reference_dir = os.path.join(tmp, "reference")
+        large_dir = os.path.join(tmp, "large")
+        write_races(reference_dir, args.reference_rows, args.races)
+        write_races(large_dir, args.rows, args.races)
+        print(f"generated {args.rows} + {args.reference_rows} results in "
+              f"{time.perf_counter() - start:.1f}s, {args.races} races each\n")
+
+        in_memory_path = os.path.join(tmp, "in_memory.csv")
+        report("in memory", measure(reference_dir, in_memory_path, IN_MEMORY_BUDGET, tmp))
+        external_path = os.path.join(tmp, "external.csv")
+        stats = measure(reference_dir, external_path, int(min(budgets) * 1024 * 1024), tmp)
+        report(f"external, {min(budgets):g} MB budget", stats)
+        if not filecmp.cmp(in_memory_path, external_path, shallow=False):
+            errors.append("the external sort differs from the in-memory ranking")
+        print()
+
+        for budget in budgets:
+            output_path = os.path.join(tmp, f"ranking{budget:g}.csv")
+            stats = measure(large_dir, output_path, int(budget * 1024 * 1024), tmp)
+            report(f"external, {budget:g} MB budget", stats)
+            error = check_ranking(output_path, args.rows)
+            if error:
+                errors.append(f"{budget:g} MB budget: {error}")
+            os.remove(output_path)
+
+    if errors:
+        sys.exit("error: " + "; ".join(errors))
+    print("\nThe external sort writes the same ranking as the in-memory sort.")
+
+
+if __name__ == "__main__":
+    main()
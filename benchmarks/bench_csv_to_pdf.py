@@ -0,0 +1,118 @@
+"""
+Benchmark csv_to_pdf: column width measurement and full rendering rows/second.
+
+Column widths are measured both with one FPDF.get_string_width call per cell
+(the previous approach) and with max_string_width; both must agree. Peak
+memory of rendering a single PDF is compared with rendering volumes of at
+most --max-pages pages, each in a fresh interpreter.
+
+    python benchmarks/bench_csv_to_pdf.py [--rows 20000] [--max-pages 20]
+"""
+import argparse
+import csv
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from fpdf import FPDF  # noqa: E402
+
+from csv_to_pdf import csv_to_pdf, max_string_width, read_table  # noqa: E402
+from synthetic import FONT_PATH, make_participants  # noqa: E402
+
+
+def write_csv(csv_path, rows):
+    """Write a sorted results CSV like pdf_to_csv does."""
+    with open(csv_path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["pos", "pett", "athlete", "year", "sex", "team", "nat", "time"])
+        for position, participant in enumerate(rows, 1):
+            writer.writerow([position] + participant)
+
+
+def table_font_pdf():
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.add_font("DejaVu", "", FONT_PATH, uni=True)
+    pdf.set_font("DejaVu", "", 9)
+    return pdf
+
+
+def legacy_widths(pdf, measured_columns):
+    """One get_string_width call per cell, as csv_to_pdf used to do."""
+    return [max([0.0] + [pdf.get_string_width(text) for text in texts]) for texts in measured_columns]
+
+
+# VmHWM is the peak RSS of the interpreter itself: unlike ru_maxrss it does
+# not include the peak of the parent process it was forked from
+MEASURE_RSS = """
+import io, sys
+from contextlib import redirect_stdout
+from csv_to_pdf import csv_to_pdf
+max_pages = int(sys.argv[3]) or None
+with redirect_stdout(io.StringIO()):
+    csv_to_pdf(sys.argv[1], sys.argv[2], max_pages=max_pages)
+with open("/proc/self/status") as status:
+    print(next(line.split()[1] for line in status if line.startswith("VmHWM:")))
+"""
+
+
+def peak_rss_mib(csv_path, pdf_path, max_pages):
+    """Peak RSS of csv_to_pdf in a fresh interpreter, in MiB."""
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE_RSS, csv_path, pdf_path, str(max_pages or 0)],
+        cwd=os.path.dirname(BENCHMARKS_DIR),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return int(output) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--max-pages", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "results_sorted.csv")
+        write_csv(csv_path, make_participants(args.rows))
+        _, rows, measured_columns = read_table(csv_path)
+
+        pdf = table_font_pdf()
+        start = time.perf_counter()
+        before = legacy_widths(pdf, measured_columns)
+        before_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        after = [max_string_width(pdf, texts) for texts in measured_columns]
+        after_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            csv_to_pdf(csv_path, os.path.join(tmp, "results.pdf"))
+        render_s = time.perf_counter() - start
+
+        single_rss = peak_rss_mib(csv_path, os.path.join(tmp, "single.pdf"), None)
+        volumes_rss = peak_rss_mib(csv_path, os.path.join(tmp, "volumes.pdf"), args.max_pages)
+
+    print(f"rows:             {len(rows):,}")
+    print(f"widths, per cell: {len(rows) / before_s:12,.0f} rows/s")
+    print(f"widths, pruned:   {len(rows) / after_s:12,.0f} rows/s ({before_s / after_s:.0f}x)")
+    print(f"csv_to_pdf:       {len(rows) / render_s:12,.0f} rows/s")
+    print(f"peak RSS, single PDF:          {single_rss:8.1f} MiB")
+    print(f"peak RSS, {args.max_pages}-page volumes:     {volumes_rss:8.1f} MiB")
+    if before != after:
+        sys.exit("error: column widths differ from per-cell measurement")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Check that every extraction engine writes the same CSV as pdfplumber, and
+compare their speed.
+
+The corpus is a set of synthetic PDFs with wrapped names, names glued to the
+birth year and missing years, plus any real result PDFs given with --pdf.
+Exits with an error if any CSV differs from the pdfplumber one.
+
+    python benchmarks/bench_engines.py [--finishers 4000] [--pdf real_results.pdf ...]
+"""
+import argparse
+import filecmp
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from extraction_engines import DEFAULT_ENGINE, ENGINES, get_engine  # noqa: E402
+from pdf_to_csv import pdf_to_csv  # noqa: E402
+from synthetic import write_results_pdf  # noqa: E402
+
+# (name, layout) of the synthetic PDFs of the corpus
+CORPUS = [
+    ("plain", {"null_year_rate": 0.0}),
+    ("default", {}),
+    ("wrapped", {"multiline_rate": 0.3}),
+    ("glued", {"glued_rate": 0.3}),
+    ("mixed", {"null_year_rate": 0.2, "multiline_rate": 0.1, "glued_rate": 0.1}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--finishers", type=int, default=4000, help="finishers in each synthetic PDF")
+    parser.add_argument("--pdf", nargs="+", default=[], help="other PDFs to add to the corpus")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_paths = list(args.pdf)
+        for seed, (name, layout) in enumerate(CORPUS):
+            pdf_path = os.path.join(tmp, f"{name}.pdf")
+            write_results_pdf(pdf_path, args.finishers, seed, **layout)
+            pdf_paths.append(pdf_path)
+        pages = sum(get_engine(DEFAULT_ENGINE).page_count(pdf_path) for pdf_path in pdf_paths)
+
+        seconds = {}
+        for engine in ENGINES:
+            start = time.perf_counter()
+            for index, pdf_path in enumerate(pdf_paths):
+                pdf_to_csv(pdf_path, os.path.join(tmp, f"{index}_{engine}.csv"), engine=engine)
+            seconds[engine] = time.perf_counter() - start
+
+        differences = [
+            f"{pdf_path} ({engine})"
+            for engine in ENGINES
+            for index, pdf_path in enumerate(pdf_paths)
+            if not filecmp.cmp(
+                os.path.join(tmp, f"{index}_{DEFAULT_ENGINE}.csv"),
+                os.path.join(tmp, f"{index}_{engine}.csv"),
+                shallow=False,
+            )
+        ]
+
+    print(f"corpus: {len(pdf_paths)} PDFs, {pages} pages")
+    for engine, engine_seconds in seconds.items():
+        print(
+            f"{engine:<12} {engine_seconds:8.2f}s {pages / engine_seconds:10.1f} pages/s "
+            f"({seconds[DEFAULT_ENGINE] / engine_seconds:.1f}x)"
+        )
+    if differences:
+        sys.exit("error: CSVs differ from " + DEFAULT_ENGINE + ":\n" + "\n".join(differences))
+    print("All engines wrote identical CSVs.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compare the layout-aware extraction (--layout) with the text parser: share
+of participants read exactly right and pages per second, with every engine.
+
+The corpus is the set of synthetic PDFs of bench_engines, written as tables
+with one column per field, plus tables where missing birth years are left
+blank instead of printed as "null". The records of each PDF are compared
+with the participants it was generated from. Tables under other header rows
+(extra columns, other labels and column order) are only read with the
+layout-aware extraction, as the text parser expects the default columns.
+Exits with an error if the layout-aware extraction gets any participant
+wrong.
+
+    python benchmarks/bench_layout.py [--finishers 2000] [--engine pdfium]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from bench_engines import CORPUS  # noqa: E402
+from extraction_engines import ENGINES, get_engine  # noqa: E402
+from pdf_to_csv import iter_participants  # noqa: E402
+from synthetic import make_participants, write_results_pdf  # noqa: E402
+
+# Layouts added to the bench_engines corpus
+BLANK_YEAR_CORPUS = [
+    ("blank-years", {"null_year_rate": 0.2, "blank_years": True}),
+    ("blank-mixed", {
+        "null_year_rate": 0.2, "multiline_rate": 0.1, "glued_rate": 0.1, "blank_years": True,
+    }),
+]
+
+# Tables under other header rows, see synthetic.TABLE_HEADERS
+HEADER_CORPUS = [
+    ("numbered", {"header": "numbered", "null_year_rate": 0.2, "multiline_rate": 0.1,
+                  "glued_rate": 0.1, "blank_years": True}),
+    ("reordered", {"header": "reordered", "null_year_rate": 0.2, "multiline_rate": 0.1,
+                   "glued_rate": 0.1, "blank_years": True}),
+]
+
+MODES = {"text": False, "layout": True}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--finishers", type=int, default=2000, help="finishers in each synthetic PDF")
+    parser.add_argument("--engine", choices=list(ENGINES), nargs="+", default=list(ENGINES),
+                        help="extraction engines to compare (default: all)")
+    args = parser.parse_args()
+
+    errors = []
+    totals = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = []
+        for seed, (name, layout) in enumerate(CORPUS + BLANK_YEAR_CORPUS + HEADER_CORPUS):
+            participants = make_participants(
+                args.finishers, seed, layout.get("null_year_rate", 0.05), layout.get("multiline_rate", 0.0)
+            )
+            pdf_path = os.path.join(tmp, f"{name}.pdf")
+            options = {
+                key: value for key, value in layout.items() if key in ("glued_rate", "blank_years", "header")
+            }
+            write_results_pdf(pdf_path, args.finishers, seed, participants=participants, table=True, **options)
+            corpus.append((name, pdf_path, participants, layout.get("header", "plain")))
+        pages = get_engine("pdfium").page_count(corpus[0][1])
+
+        print(f"corpus: {len(corpus)} table PDFs of {args.finishers} finishers, {pages} pages each\n")
+        print(f"{'pdf':<12} {'engine':<11} {'text parser':>17} {'layout':>17}")
+        for name, pdf_path, participants, header in corpus:
+            for engine in args.engine:
+                cells = []
+                for mode, layout in MODES.items():
+                    if header != "plain" and not layout:
+                        cells.append("-")
+                        continue
+                    start = time.perf_counter()
+                    records = list(iter_participants(pdf_path, engine=engine, layout=layout))
+                    seconds = time.perf_counter() - start
+                    right = sum(record == truth for record, truth in zip(records, participants))
+                    total = totals.setdefault((engine, mode, header == "plain"), [0, 0, 0.0, 0])
+                    total[0] += right
+                    total[1] += len(participants)
+                    total[2] += seconds
+                    total[3] += 1
+                    cells.append(f"{right / len(participants):7.1%} {pages / seconds:6.0f} p/s")
+                    if layout and (right != len(participants) or len(records) != len(participants)):
+                        errors.append(f"{name} ({engine}): {right} of {len(participants)} right")
+                print(f"{name:<12} {engine:<11} {cells[0]:>17} {cells[1]:>17}")
+
+    print()
+    for (engine, mode, plain), (right, count, seconds, pdfs) in totals.items():
+        print(
+            f"{engine:<11} {mode:<7} {'' if plain else 'other headers':<14} {right / count:7.2%} right "
+            f"{pages * pdfs / seconds:8.1f} pages/s"
+        )
+    if errors:
+        sys.exit("error: layout-aware extraction got participants wrong:\n" + "\n".join(errors))
+    print("The layout-aware extraction read every participant right.")
+
+
+if __name__ == "__main__":
+    main()
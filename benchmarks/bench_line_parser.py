@@ -0,0 +1,135 @@
+"""
+Micro-benchmark of participant line parsing, before and after line_parser.
+
+Both parsers run on the same synthetic lines (with glued name+year tokens,
+null years and names continued on the next line) and must produce the same
+records.
+
+    python benchmarks/bench_line_parser.py [--lines 100000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from line_parser import parse_lines  # noqa: E402
+from synthetic import make_participants  # noqa: E402
+
+
+def legacy_parse(participants_data):
+    """The parsing loop of pdf_to_csv before line_parser, kept as reference."""
+    participants_list = []
+    i = 0
+    while i < len(participants_data):
+        if participants_data[i] != "":
+            data = participants_data[i].split(" ")
+
+            formatted_data = []
+            for item in data:
+                match = re.match(r"([A-Za-zÀ-ÿá-úà-ùè-éî-ôù]+)(\d+)", item)
+                if match:
+                    formatted_data.append(match.group(1))
+                    formatted_data.append(match.group(2))
+                else:
+                    formatted_data.append(item)
+            data = formatted_data
+
+            if len(data) >= 5:
+                bib_number = data[0]
+                race_time = data[-1]
+                nationality = data[-2]
+                sex = ""
+                team = ""
+                year = ""
+
+                year_idx = next(
+                    (
+                        i
+                        for i, w in enumerate(data[1:])
+                        if re.match(r"^\d{4}$", w) or w.lower() == "null"
+                    ),
+                    None,
+                )
+
+                if year_idx is not None:
+                    year = data[1:][year_idx]
+                    if data[1:][year_idx + 1] == "M" or data[1:][year_idx + 1] == "F":
+                        sex = data[1:][year_idx + 1]
+                    athlete_name = " ".join(data[1:][:year_idx])
+                    team = " ".join(data[1:][year_idx + 2 : -2])
+                else:
+                    year = "null"
+                    sex = data[1:][-3]
+                    athlete_name = " ".join(data[1:][1:-3])
+                    team = ""
+
+                while (
+                    i + 1 < len(participants_data)
+                    and len(participants_data[i + 1].split()) < 5
+                ):
+                    athlete_name += " " + participants_data[i + 1].strip()
+                    i += 1
+
+                participants_list.append(
+                    [bib_number, athlete_name.strip(), year, sex, team, nationality, race_time]
+                )
+                i += 1
+    return participants_list
+
+
+def make_lines(count, seed=0):
+    """Build count participant lines as pdfplumber extracts them."""
+    rng = random.Random(seed)
+    lines = []
+    for bib, name, year, sex, team, nat, race_time in make_participants(count, seed):
+        roll = rng.random()
+        if roll < 0.03 and year != "null":
+            # Name glued to the year
+            lines.append(" ".join(p for p in (bib, name + year, sex, team, nat, race_time) if p))
+        elif roll < 0.06:
+            # Name continued on the next line
+            first, last = name.split(" ", 1)
+            lines.append(" ".join(p for p in (bib, first, year, sex, team, nat, race_time) if p))
+            lines.append(last)
+        else:
+            lines.append(" ".join(p for p in (bib, name, year, sex, team, nat, race_time) if p))
+        if len(lines) >= count:
+            break
+    return lines[:count]
+
+
+def measure(parse, lines, repeat):
+    """Return the best lines/second over repeat runs, and the parsed records."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        records = list(parse(lines))
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+    before, legacy_records = measure(legacy_parse, lines, args.repeat)
+    after, records = measure(parse_lines, lines, args.repeat)
+
+    print(f"lines:  {len(lines)} ({len(records)} records)")
+    print(f"before: {before:12,.0f} lines/s")
+    print(f"after:  {after:12,.0f} lines/s ({after / before:.1f}x)")
+    if records != legacy_records:
+        sys.exit("error: parsed records differ from the legacy parser")
+
+
+if __name__ == "__main__":
+    main()
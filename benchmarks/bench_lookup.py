@@ -0,0 +1,221 @@
+"""
+Load test of the athlete lookup service: p50/p99 latency of bib and name
+lookups, in process and over HTTP, and the time to reload a changed CSV.
+
+The service runs in its own process, as it would at the finish area, and is
+queried over keep-alive connections by concurrent client processes. Clients
+speak just enough HTTP/1.1 to read the answers, so that the latencies measure
+the service rather than http.client.
+
+    python benchmarks/bench_lookup.py [--races 20] [--finishers 5000] [--requests 20000] [--clients 4]
+"""
+import argparse
+import csv
+import http.client
+import json
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from lookup_service import RESULTS_SUFFIX, ResultsLookup  # noqa: E402
+
+CSV_COLUMNS = ["pos", "pett", "athlete", "year", "sex", "team", "nat", "time"]
+SYLLABLES = ["RO", "SSI", "BIAN", "CHI", "VER", "DI", "MAR", "TIN", "ESPO", "SI", "TO",
+             "COL", "OM", "BO", "RIC", "CI", "GAL", "LI", "FER", "RA", "RÈ", "NÒ", "LÀ"]
+
+
+def make_name(rng):
+    """Build a random "LASTNAME FIRSTNAME", with some accented letters."""
+    return " ".join(
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))) for _ in range(2)
+    )
+
+
+def write_race_csv(csv_path, athletes, finishers, seed):
+    """Write a sorted results CSV like the ones of process_race_results."""
+    rng = random.Random(seed)
+    entrants = rng.sample(athletes, finishers)
+    seconds = sorted(rng.randint(30 * 60, 3 * 3600) for _ in entrants)
+    with open(csv_path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(CSV_COLUMNS)
+        for position, ((name, year, sex), time_s) in enumerate(zip(entrants, seconds), 1):
+            writer.writerow([
+                position, position, name, year, sex, "TEAM", "ITA",
+                f"{time_s // 3600:02d}:{time_s // 60 % 60:02d}:{time_s % 60:02d}",
+            ])
+
+
+def make_queries(count, athletes, finishers, seed=0):
+    """Build a mix of bib lookups and name prefix lookups."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            queries.append({"bib": str(rng.randint(1, finishers))})
+        else:
+            # What people type: a few letters of each name, in lower case,
+            # often without the accents
+            last_name, first_name = rng.choice(athletes)[0].split(" ")
+            name = f"{last_name[:rng.randint(3, 6)]} {first_name[:rng.randint(2, 4)]}".lower()
+            if rng.random() < 0.5:
+                name = name.replace("è", "e").replace("ò", "o").replace("à", "a")
+            queries.append({"name": name})
+    return queries
+
+
+def start_service(directory, poll_interval):
+    """Start lookup_service.py in its own process; return (process, port)."""
+    process = subprocess.Popen(
+        [sys.executable, "-u", os.path.join(ROOT_DIR, "lookup_service.py"), directory,
+         "--port", "0", "--poll-interval", str(poll_interval)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    line = process.stdout.readline()
+    match = re.search(r":(\d+)$", line.strip())
+    if match is None:
+        process.kill()
+        raise RuntimeError(f"lookup_service.py did not start: {line!r}")
+    return process, int(match.group(1))
+
+
+def get_json(connection, path):
+    """GET a path of the service and decode the JSON answer."""
+    connection.request("GET", path)
+    return json.loads(connection.getresponse().read())
+
+
+def percentiles(latencies):
+    """Return the p50 and p99 of latencies in seconds, in microseconds."""
+    quantiles = statistics.quantiles(latencies, n=100)
+    return quantiles[49] * 1e6, quantiles[98] * 1e6
+
+
+def run_client(port, queries):
+    """
+    Send queries over one keep-alive connection.
+
+    Returns:
+        list: Latency of each query, in seconds
+    """
+    latencies = []
+    with socket.create_connection(("127.0.0.1", port)) as connection:
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        responses = connection.makefile("rb")
+        for query in queries:
+            path = "/lookup?" + "&".join(f"{key}={quote(value)}" for key, value in query.items())
+            start = time.perf_counter()
+            connection.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("ascii"))
+            status_line = responses.readline()
+            length = 0
+            for line in iter(responses.readline, b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.lower() == b"content-length":
+                    length = int(value)
+            body = responses.read(length)
+            latencies.append(time.perf_counter() - start)
+            if b" 200 " not in status_line:
+                raise RuntimeError(f"{path}: {status_line!r} {body!r}")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--races", type=int, default=20, help="number of race CSVs")
+    parser.add_argument("--finishers", type=int, default=5000, help="finishers of each race")
+    parser.add_argument("--requests", type=int, default=20000, help="number of HTTP requests")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent HTTP connections")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    athletes = list({
+        (make_name(rng), str(rng.randint(1940, 2008)), rng.choice("MF"))
+        for _ in range(args.finishers * 4)
+    })
+    athletes.sort()
+    with tempfile.TemporaryDirectory() as tmp:
+        for race in range(args.races):
+            write_race_csv(
+                os.path.join(tmp, f"race{race:03d}{RESULTS_SUFFIX}"), athletes, args.finishers, race
+            )
+
+        start = time.perf_counter()
+        results = ResultsLookup(tmp)
+        results.refresh()
+        load_seconds = time.perf_counter() - start
+        queries = make_queries(args.requests, athletes, args.finishers)
+        process, port = start_service(tmp, poll_interval=0.05)
+
+        # In process: the cost of the indexes alone
+        index_latencies = []
+        matches = 0
+        for query in queries:
+            start = time.perf_counter()
+            matches += len(results.lookup(**query))
+            index_latencies.append(time.perf_counter() - start)
+
+        # Over HTTP, with concurrent keep-alive connections
+        with ProcessPoolExecutor(max_workers=args.clients) as executor:
+            start = time.perf_counter()
+            http_latencies = [
+                latency
+                for latencies in executor.map(
+                    run_client,
+                    [port] * args.clients,
+                    [queries[client::args.clients] for client in range(args.clients)],
+                )
+                for latency in latencies
+            ]
+            http_seconds = time.perf_counter() - start
+
+        # Hot reload: rewrite one race and wait until the service answers
+        # with the new results
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        write_race_csv(
+            os.path.join(tmp, f"race000{RESULTS_SUFFIX}"), athletes, args.finishers + 1, seed=-1
+        )
+        start = time.perf_counter()
+        deadline = start + 10
+        while get_json(connection, "/races")["races"]["race000"] != args.finishers + 1:
+            if time.perf_counter() > deadline:
+                break
+            time.sleep(0.001)
+        reload_seconds = time.perf_counter() - start
+        connection.close()
+        process.terminate()
+        process.wait()
+
+    if len(http_latencies) != len(queries):
+        sys.exit(f"error: {len(queries) - len(http_latencies)} HTTP requests failed")
+    if reload_seconds > 10:
+        sys.exit("error: the changed CSV was not reloaded")
+
+    total_rows = args.races * args.finishers
+    print(f"indexes:    {total_rows} results of {args.races} races loaded in {load_seconds:.2f}s")
+    print(
+        "in process: p50 {:.0f} us, p99 {:.0f} us ({:.1f} matches per lookup)".format(
+            *percentiles(index_latencies), matches / len(queries)
+        )
+    )
+    print(
+        "HTTP:       p50 {:.0f} us, p99 {:.0f} us, {:.0f} requests/s with {} clients".format(
+            *percentiles(http_latencies), len(queries) / http_seconds, args.clients
+        )
+    )
+    print(f"reload:     changed CSV served after {reload_seconds * 1000:.0f} ms (poll interval 50 ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Check that peak memory of participant extraction does not grow with PDF size.
+
+Each measurement runs in a fresh interpreter that streams every record out of
+iter_participants, then reports its peak resident set size. The PDFs are also
+generated in a separate interpreter: Linux carries the peak RSS of a parent
+across fork and exec, so a large parent would skew the measurement.
+
+    python benchmarks/bench_memory.py [--pages 10 1000] [--tolerance 1.25]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import ROWS_PER_PAGE  # noqa: E402
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+
+MEASURE = """
+import resource, sys
+from pdf_to_csv import iter_participants
+count = sum(1 for _ in iter_participants(sys.argv[1]))
+print(count, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def peak_rss_kb(pdf_path):
+    """Return (records, peak RSS in KiB) for streaming the records of a PDF."""
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE, pdf_path],
+        cwd=REPO_ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    return int(output[0]), int(output[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 1000])
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.25,
+        help="Maximum allowed ratio between the largest and smallest peak RSS",
+    )
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            pdf_path = os.path.join(tmp, f"results_{pages}.pdf")
+            subprocess.run(
+                [
+                    sys.executable,
+                    os.path.join(BENCHMARKS_DIR, "synthetic.py"),
+                    pdf_path,
+                    str(pages * ROWS_PER_PAGE),
+                ],
+                check=True,
+            )
+            records, rss = peak_rss_kb(pdf_path)
+            results.append(rss)
+            print(f"{pages:>6} pages {records:>8} records  peak RSS {rss / 1024:8.1f} MiB")
+
+    ratio = max(results) / min(results)
+    print(f"largest/smallest peak RSS: {ratio:.2f} (tolerance {args.tolerance:.2f})")
+    if ratio > args.tolerance:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark the size of formatted PDFs: bytes per 1000 rows of today's output
+and of compact output (--compact-pdf), for reports from a small category to
+a large race, with the share of the embedded font and of the page content.
+
+Both outputs must have the same pages and text.
+
+    python benchmarks/bench_pdf_size.py [--rows 20,100,500,1000,5000]
+"""
+import argparse
+import io
+import os
+import re
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from csv_to_pdf import RenderSession, rows_to_pdf  # noqa: E402
+from synthetic import make_participants  # noqa: E402
+
+CSV_COLUMNS = ["pos", "pett", "athlete", "year", "sex", "team", "nat", "time"]
+
+
+def make_rows(count, seed=0):
+    """Build the sorted result rows of a race of count finishers."""
+    participants = sorted(make_participants(count, seed=seed), key=lambda row: row[6])
+    return [[position] + row for position, row in enumerate(participants, 1)]
+
+
+def pdf_parts(path):
+    """
+    Measure a PDF file.
+
+    Returns:
+        tuple: (total bytes, bytes of the embedded font file, bytes of the
+            page content streams)
+    """
+    with open(path, "rb") as pdf_file:
+        data = pdf_file.read()
+    font = content = 0
+    for body in re.findall(rb"\d+ 0 obj(.*?)endobj", data, re.S):
+        if b"/Length1" in body:
+            font += len(body)
+        elif b"/Filter" in body and b"/Type" not in body:
+            content += len(body)
+    return len(data), font, content
+
+
+def pdf_text(path):
+    """Extract the text of every page of a PDF."""
+    import pdfplumber
+
+    with pdfplumber.open(path) as pdf:
+        return [page.extract_text() for page in pdf.pages]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--rows", default="20,100,500,1000,5000",
+        help="comma separated numbers of rows (default: 20,100,500,1000,5000)"
+    )
+    args = parser.parse_args()
+    counts = [int(count) for count in args.rows.split(",")]
+
+    sessions = {"today": RenderSession(), "compact": RenderSession(compact=True)}
+    print(f"{'rows':>6} {'output':<8} {'bytes':>9} {'per 1000 rows':>14} {'font':>7} {'content':>8}")
+    differences = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in counts:
+            rows = make_rows(count)
+            sizes = {}
+            for label, session in sessions.items():
+                path = os.path.join(tmp, f"{label}{count}.pdf")
+                with redirect_stdout(io.StringIO()):
+                    rows_to_pdf(CSV_COLUMNS, rows, path, "Race Results", session=session)
+                total, font, content = sizes[label] = pdf_parts(path)
+                print(
+                    f"{count:>6} {label:<8} {total:>9} {total * 1000 / count:>14.0f} "
+                    f"{font:>7} {content:>8}"
+                )
+            saved = 1 - sizes["compact"][0] / sizes["today"][0]
+            print(f"{'':>6} {'saved':<8} {saved:>9.1%}")
+            if pdf_text(os.path.join(tmp, f"today{count}.pdf")) != pdf_text(
+                os.path.join(tmp, f"compact{count}.pdf")
+            ):
+                differences.append(count)
+
+    if differences:
+        sys.exit("error: different text with rows: " + ", ".join(map(str, differences)))
+    print("Both outputs have the same pages and text.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark sorting rows by race time: datetime.strptime key vs integer key.
+
+    python benchmarks/bench_race_time.py [--rows 1000000] [--top 100]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from race_time import race_time_key, rank_by_time  # noqa: E402
+
+
+def legacy_key(time_str):
+    """The sort key of pdf_to_csv before race_time, kept as reference."""
+    try:
+        return datetime.strptime(time_str, "%H:%M:%S")
+    except ValueError:
+        return datetime.max
+
+
+def make_rows(count, seed=0):
+    """Build count rows whose last field is a HH:MM:SS time or a status code."""
+    rng = random.Random(seed)
+    rows = []
+    for bib in range(count):
+        if rng.random() < 0.02:
+            race_time = rng.choice(["DNF", "DSQ", "DNS"])
+        else:
+            seconds = rng.randint(30 * 60, 3 * 3600)
+            race_time = f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+        rows.append([str(bib), race_time])
+    return rows
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--top", type=int, default=100)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    before, legacy_sorted = timed(lambda: sorted(rows, key=lambda row: legacy_key(row[1])))
+    after, new_sorted = timed(lambda: rank_by_time(rows, 1))
+    top, podium = timed(lambda: rank_by_time(rows, 1, top=args.top))
+
+    print(f"rows:              {len(rows):,}")
+    print(f"strptime key sort: {before:8.3f}s")
+    print(f"integer key sort:  {after:8.3f}s ({before / after:.1f}x)")
+    print(f"top {args.top} heap:      {top:8.3f}s ({before / top:.1f}x)")
+
+    finished = [row for row in legacy_sorted if row[1] not in ("DNF", "DSQ", "DNS")]
+    if new_sorted[:len(finished)] != finished or podium != new_sorted[:args.top]:
+        sys.exit("error: integer key ranking differs from the legacy ranking")
+    if any(race_time_key(row[1]) < race_time_key(finished[-1][1]) for row in new_sorted[len(finished):]):
+        sys.exit("error: status codes ranked before finish times")
+
+
+if __name__ == "__main__":
+    main()
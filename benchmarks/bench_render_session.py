@@ -0,0 +1,107 @@
+"""
+Benchmark the render session on a batch of formatted PDFs: per-file render
+time with the font loaded and embedded for every file, as before sessions,
+and with one session shared by the whole batch.
+
+Both runs must write the same PDFs (apart from their creation date).
+
+    python benchmarks/bench_render_session.py [--files 50] [--finishers 100-2000]
+"""
+import argparse
+import io
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from csv_to_pdf import FONT_SUBSETS, RenderSession, rows_to_pdf  # noqa: E402
+from synthetic import make_participants  # noqa: E402
+
+CSV_COLUMNS = ["pos", "pett", "athlete", "year", "sex", "team", "nat", "time"]
+
+
+def make_batch(files, low, high, seed=0):
+    """Build the sorted result rows of files races of low to high finishers."""
+    rng = random.Random(seed)
+    batch = []
+    for index in range(files):
+        participants = sorted(
+            make_participants(rng.randint(low, high), seed=index), key=lambda row: row[6]
+        )
+        batch.append([[position] + row for position, row in enumerate(participants, 1)])
+    return batch
+
+
+def render_batch(batch, directory, shared):
+    """
+    Render every race of the batch, returning the render time of each file.
+
+    Without a shared session, every file gets a new session and no cached
+    font subsets, i.e. loads and embeds the font from scratch as every
+    document did before sessions.
+    """
+    session = RenderSession()
+    seconds = []
+    for index, rows in enumerate(batch):
+        start = time.perf_counter()
+        if not shared:
+            session = RenderSession()
+            FONT_SUBSETS.clear()
+        with redirect_stdout(io.StringIO()):
+            rows_to_pdf(
+                CSV_COLUMNS, rows, os.path.join(directory, f"race{index:03d}.pdf"),
+                "Race Results", session=session
+            )
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def pdf_content(path):
+    """Read a PDF without its creation date."""
+    with open(path, "rb") as pdf_file:
+        return re.sub(rb"/CreationDate \(D:\d+\)", b"", pdf_file.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=50, help="number of PDFs in the batch")
+    parser.add_argument(
+        "--finishers", default="100-2000", help="range of finishers per race (default: 100-2000)"
+    )
+    args = parser.parse_args()
+    low, high = map(int, args.finishers.split("-"))
+
+    batch = make_batch(args.files, low, high)
+    with tempfile.TemporaryDirectory() as before_dir, tempfile.TemporaryDirectory() as after_dir:
+        before = render_batch(batch, before_dir, shared=False)
+        FONT_SUBSETS.clear()
+        after = render_batch(batch, after_dir, shared=True)
+        differences = [
+            name for name in sorted(os.listdir(before_dir))
+            if pdf_content(os.path.join(before_dir, name)) != pdf_content(os.path.join(after_dir, name))
+        ]
+
+    rows = sum(len(rows) for rows in batch)
+    print(f"batch: {args.files} PDFs, {rows} rows")
+    for label, seconds in (("font per file", before), ("shared session", after)):
+        print(
+            f"{label:<15} total {sum(seconds):6.2f}s  per file: "
+            f"mean {statistics.mean(seconds) * 1000:6.1f} ms, "
+            f"median {statistics.median(seconds) * 1000:6.1f} ms"
+        )
+    print(f"speedup: {sum(before) / sum(after):.2f}x")
+    if differences:
+        sys.exit("error: PDFs differ: " + ", ".join(differences))
+    print("Both runs wrote the same PDFs.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark republishing a corrected results PDF: a full rebuild against --diff,
+which writes the changes by bib and renders again only the PDF volumes whose
+rows changed.
+
+A race is processed, then a corrected PDF of the same race with a few finish
+times adjusted by some seconds is processed again, both ways. The volumes
+--diff leaves and writes must be the same as a full render in volumes of the
+corrected results.
+
+    python benchmarks/bench_republish.py [--finishers 10000] [--corrections 3] [--engine pdfium]
+"""
+import argparse
+import copy
+import io
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from extraction_engines import ENGINES  # noqa: E402
+from main import DIFF_PAGES_PER_VOLUME, process_race_results  # noqa: E402
+from profiling import tracing  # noqa: E402
+from synthetic import make_participants, write_results_pdf  # noqa: E402
+
+
+def correct_times(participants, corrections, seed=0):
+    """Return a copy of participants with a few finish times moved by up to 30 seconds."""
+    rng = random.Random(seed)
+    corrected = copy.deepcopy(participants)
+    for participant in rng.sample(corrected, corrections):
+        hours, minutes, seconds = map(int, participant[6].split(":"))
+        total = hours * 3600 + minutes * 60 + seconds + rng.choice([-1, 1]) * rng.randint(1, 30)
+        participant[6] = f"{total // 3600:02d}:{total // 60 % 60:02d}:{total % 60:02d}"
+    return corrected
+
+
+def timed_run(input_pdf, output_directory, **options):
+    """
+    Run process_race_results, timing it.
+
+    Returns:
+        tuple: (total seconds, extraction seconds, captured output)
+    """
+    output = io.StringIO()
+    with redirect_stdout(output), tracing() as trace:
+        start = time.perf_counter()
+        process_race_results(input_pdf, output_directory, **options)
+        total = time.perf_counter() - start
+    extraction = sum(duration for name, _, duration, _ in trace.events if name == "extract_results")
+    return total, extraction, output.getvalue()
+
+
+def pdf_content(path):
+    """Read a file, without the creation date of PDFs."""
+    with open(path, "rb") as pdf_file:
+        return re.sub(rb"/CreationDate \(D:\d+\)", b"", pdf_file.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--finishers", type=int, default=10000, help="finishers of the race")
+    parser.add_argument("--corrections", type=int, default=3, help="finish times corrected")
+    parser.add_argument("--engine", choices=list(ENGINES), default="pdfium",
+                        help="text extraction engine (default: pdfium)")
+    args = parser.parse_args()
+
+    participants = make_participants(args.finishers)
+    options = dict(engine=args.engine, cache_dir=None)
+    with tempfile.TemporaryDirectory() as tmp:
+        original_pdf = os.path.join(tmp, "original", "race.pdf")
+        corrected_pdf = os.path.join(tmp, "corrected", "race.pdf")
+        os.makedirs(os.path.dirname(original_pdf))
+        os.makedirs(os.path.dirname(corrected_pdf))
+        write_results_pdf(original_pdf, args.finishers, participants=participants)
+        write_results_pdf(
+            corrected_pdf, args.finishers,
+            participants=correct_times(participants, args.corrections),
+        )
+
+        # Today: the corrected file is processed from scratch
+        full = timed_run(corrected_pdf, os.path.join(tmp, "full"), **options)
+
+        # --diff: the original was published before, the corrected file is compared with it
+        diff_directory = os.path.join(tmp, "diff")
+        timed_run(original_pdf, diff_directory, diff=True, **options)
+        diff = timed_run(corrected_pdf, diff_directory, diff=True, **options)
+
+        # Reference: every volume of the corrected results rendered again
+        check_directory = os.path.join(tmp, "check")
+        timed_run(
+            corrected_pdf, check_directory, max_pages_per_volume=DIFF_PAGES_PER_VOLUME, **options
+        )
+        differences = [
+            name for name in sorted(os.listdir(check_directory))
+            if pdf_content(os.path.join(check_directory, name))
+            != pdf_content(os.path.join(diff_directory, name))
+        ]
+        with open(os.path.join(diff_directory, "race_changes.json"), "rb") as changes_file:
+            changes_size = len(changes_file.read())
+
+    kept = re.search(r"(\d+) of (\d+) volumes unchanged", diff[2])
+    kept, volumes = (int(kept.group(1)), int(kept.group(2))) if kept else (0, None)
+    changes = re.search(r"Changes since the previous run \((.*)\)", diff[2]).group(1)
+
+    print(f"race: {args.finishers} finishers, {args.corrections} finish times corrected "
+          f"({args.engine} engine)")
+    for label, (total, extraction, _) in (("full rebuild", full), ("--diff", diff)):
+        print(
+            f"{label:<13} total {total:6.2f}s  extraction {extraction:6.2f}s  "
+            f"outputs {total - extraction:6.2f}s"
+        )
+    print(f"changes:      {changes} ({changes_size} bytes of JSON)")
+    if volumes:
+        print(f"volumes:      {volumes - kept} of {volumes} rendered again")
+    print(
+        f"--diff takes {diff[0] / full[0]:.0%} of a full rebuild, "
+        f"{(diff[0] - diff[1]) / (full[0] - full[1]):.0%} without the extraction"
+    )
+    if differences:
+        sys.exit("error: outputs differ from a full render: " + ", ".join(differences))
+    print("The outputs are the same as a full render in volumes.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark the series store: ingesting hundreds of races, re-ingesting one and
+computing the standings.
+
+    python benchmarks/bench_series_store.py [--races 300] [--athletes 400] [--pool 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from race_time import format_milliseconds  # noqa: E402
+from series_store import SeriesStore  # noqa: E402
+
+
+def make_pool(count, seed=0):
+    """Build count distinct (name, year, sex) athletes."""
+    rng = random.Random(seed)
+    pool = set()
+    while len(pool) < count:
+        name = f"ATHLETE{rng.randrange(count * 10)} {rng.choice('ABCDEFGHIJ')}"
+        pool.add((name, str(rng.randint(1940, 2008)), rng.choice("MF")))
+    return sorted(pool)
+
+
+def make_race(pool, count, rng):
+    """Build the sorted result rows of a race entered by count athletes of the pool."""
+    entrants = rng.sample(pool, count)
+    times = sorted(rng.randint(1800, 10800) * 1000 for _ in entrants)
+    rows = []
+    for position, ((name, year, sex), time_ms) in enumerate(zip(entrants, times), 1):
+        # Names are not always printed the same way from one race to another
+        if rng.random() < 0.1:
+            name = name.title()
+        rows.append([position, str(position), name, year, sex, "TEAM", "ITA",
+                     format_milliseconds(time_ms)])
+    return rows
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--races", type=int, default=300)
+    parser.add_argument("--athletes", type=int, default=400, help="athletes per race")
+    parser.add_argument("--pool", type=int, default=20_000, help="distinct athletes in the series")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    pool = make_pool(args.pool)
+    races = [make_race(pool, args.athletes, rng) for _ in range(args.races)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with SeriesStore(os.path.join(tmp, "series.db")) as store:
+            ingest, _ = timed(lambda: [
+                store.add_race(f"race{index:04d}", rows) for index, rows in enumerate(races)
+            ])
+            unchanged, changed = timed(lambda: store.add_race("race0000", races[0]))
+            races[0][0][7] = "00:20:00"
+            update, _ = timed(lambda: store.add_race("race0000", races[0]))
+            standings_time, standings = timed(store.standings)
+            best_time, _ = timed(lambda: store.standings(best=5))
+
+    entries = args.races * args.athletes
+    print(f"races:             {args.races:,} ({entries:,} results, {len(standings):,} athletes)")
+    print(f"ingest all:        {ingest:8.3f}s ({entries / ingest:,.0f} results/s)")
+    print(f"re-add unchanged:  {unchanged:8.3f}s")
+    print(f"re-add changed:    {update:8.3f}s")
+    print(f"standings:         {standings_time:8.3f}s")
+    print(f"best 5 standings:  {best_time:8.3f}s")
+
+    if changed or len(standings) > args.pool:
+        sys.exit("error: athletes were not matched across races")
+
+
+if __name__ == "__main__":
+    main()
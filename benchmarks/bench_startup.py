@@ -0,0 +1,99 @@
+"""
+Measure cold-start time of main.py for --help, CSV-only and full runs.
+
+Each scenario runs main.py in a fresh interpreter with -X importtime and
+reports the median wall-clock time and the total time spent importing
+modules, plus the slowest top-level imports.
+
+    python benchmarks/bench_startup.py [--repeat 5] [--json startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+
+
+def parse_importtime(stderr):
+    """
+    Parse the -X importtime report.
+
+    Returns:
+        tuple: (total import time in seconds, {top-level module: cumulative seconds})
+    """
+    total_us = 0
+    top_level = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        # Top-level imports are indented by a single space
+        if name.startswith(" ") and not name.startswith("  "):
+            top_level[name.strip()] = int(cumulative_us) / 1e6
+    return total_us / 1e6, top_level
+
+
+def run_scenario(arguments, repeat):
+    """Run main.py repeat times; return the median wall and import times."""
+    walls = []
+    imports = []
+    top_level = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "main.py"] + arguments,
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+        )
+        walls.append(time.perf_counter() - start)
+        if completed.returncode != 0:
+            sys.exit(f"error: main.py {' '.join(arguments)} failed:\n{completed.stdout}")
+        import_time, top_level = parse_importtime(completed.stderr)
+        imports.append(import_time)
+    return statistics.median(walls), statistics.median(imports), top_level
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "results.pdf")
+        subprocess.run(
+            [sys.executable, os.path.join(BENCHMARKS_DIR, "synthetic.py"), pdf_path, "40"],
+            check=True,
+        )
+        run_options = ["-i", pdf_path, "-o", os.path.join(tmp, "output"), "--no-cache", "-j", "1"]
+        scenarios = {
+            "help": ["--help"],
+            "csv-only": run_options + ["--csv-only"],
+            "full": run_options,
+        }
+
+        for name, arguments in scenarios.items():
+            wall, import_time, top_level = run_scenario(arguments, args.repeat)
+            slowest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:3]
+            results[name] = {"wall_s": wall, "import_s": import_time, "slowest_imports": dict(slowest)}
+            print(
+                f"{name:<9} wall {wall * 1000:8.1f} ms  imports {import_time * 1000:8.1f} ms  "
+                + ", ".join(f"{module} {seconds * 1000:.0f} ms" for module, seconds in slowest)
+            )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump(results, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+End-to-end benchmark suite, with results written as JSON.
+
+Measures pdf_to_csv pages/second, csv_to_pdf rows/second, the peak memory of
+both, and the wall-clock time of main.py on batches of 1, 10 and 100 files.
+The synthetic PDFs mix in wrapped names, names glued to the birth year and
+missing years, and the extracted records are checked against the generator.
+Every measurement runs in a fresh interpreter.
+
+    python benchmarks/bench_suite.py [--json results.json] [--compare baseline.json]
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from synthetic import ROWS_PER_PAGE, make_participants  # noqa: E402
+
+# Bump when the scenarios change, so results of different suites are not compared
+SUITE_VERSION = 1
+
+# Rates of the irregular lines mixed in the synthetic PDFs
+LAYOUT = {"null_year_rate": 0.05, "multiline_rate": 0.1, "glued_rate": 0.05}
+
+# Higher is better for these metrics; lower is better for every other one
+THROUGHPUT_METRICS = ("pages_per_second", "rows_per_second", "files_per_second")
+
+GENERATE = """
+import json, sys
+sys.path[:0] = [sys.argv[1], sys.argv[2]]
+from synthetic import write_results_pdf
+count, layout = int(sys.argv[3]), json.loads(sys.argv[4])
+for seed, pdf_path in enumerate(sys.argv[5:]):
+    print(write_results_pdf(pdf_path, count, seed, **layout))
+"""
+
+# VmHWM is the peak RSS of the interpreter itself: unlike ru_maxrss it does
+# not include the peak of the parent process it was forked from
+MEASURE_PDF_TO_CSV = """
+import json, sys, time
+sys.path[:0] = [sys.argv[1], sys.argv[2]]
+from pdf_to_csv import extract_results, write_csv
+from synthetic import make_participants
+count, layout, engine = int(sys.argv[5]), json.loads(sys.argv[6]), sys.argv[7]
+start = time.perf_counter()
+rows, _ = extract_results(sys.argv[3], engine=engine)
+write_csv(rows, sys.argv[4])
+seconds = time.perf_counter() - start
+expected = make_participants(count, 0, layout["null_year_rate"], layout["multiline_rate"])
+correct = sorted(row[1:] for row in rows) == sorted(expected)
+with open("/proc/self/status") as status:
+    peak_kb = int(next(line.split()[1] for line in status if line.startswith("VmHWM:")))
+print(json.dumps({"records": len(rows), "seconds": seconds, "peak_kb": peak_kb, "correct": correct}))
+"""
+
+MEASURE_CSV_TO_PDF = """
+import io, json, sys, time
+from contextlib import redirect_stdout
+sys.path.insert(0, sys.argv[1])
+from csv_to_pdf import csv_to_pdf
+start = time.perf_counter()
+with redirect_stdout(io.StringIO()):
+    written = csv_to_pdf(sys.argv[2], sys.argv[3])
+seconds = time.perf_counter() - start
+with open("/proc/self/status") as status:
+    peak_kb = int(next(line.split()[1] for line in status if line.startswith("VmHWM:")))
+print(json.dumps({"seconds": seconds, "peak_kb": peak_kb, "written": bool(written)}))
+"""
+
+
+def run_python(code, *arguments):
+    """Run code in a fresh interpreter and return its last line of output."""
+    completed = subprocess.run(
+        [sys.executable, "-c", code] + [str(argument) for argument in arguments],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        sys.exit(f"error: benchmark step failed:\n{completed.stderr}")
+    return completed.stdout.strip().splitlines()[-1]
+
+
+def generate_pdfs(pdf_paths, finishers):
+    """Write synthetic PDFs, each with its own seed; return the page count of the first."""
+    output = subprocess.run(
+        [sys.executable, "-c", GENERATE, REPO_ROOT, BENCHMARKS_DIR, str(finishers),
+         json.dumps(LAYOUT)] + pdf_paths,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return int(output.split()[0])
+
+
+def bench_pdf_to_csv(tmp, pages, engine):
+    """Measure extraction and sorting of a pages long PDF."""
+    # Wrapped names take two lines: size the PDF for about pages pages and
+    # report the actual page count
+    pdf_path = os.path.join(tmp, "extract.pdf")
+    finishers = int(pages * ROWS_PER_PAGE / (1 + LAYOUT["multiline_rate"]))
+    page_count = generate_pdfs([pdf_path], finishers)
+    result = json.loads(run_python(
+        MEASURE_PDF_TO_CSV, REPO_ROOT, BENCHMARKS_DIR, pdf_path,
+        os.path.join(tmp, "extract.csv"), finishers, json.dumps(LAYOUT), engine,
+    ))
+    if not result["correct"]:
+        sys.exit("error: pdf_to_csv records differ from the synthetic participants")
+    return {
+        "pages": page_count,
+        "records": result["records"],
+        "seconds": result["seconds"],
+        "pages_per_second": page_count / result["seconds"],
+        "peak_rss_mib": result["peak_kb"] / 1024,
+    }
+
+
+def bench_csv_to_pdf(tmp, rows):
+    """Measure rendering of a sorted CSV of rows rows."""
+    csv_path = os.path.join(tmp, "render.csv")
+    with open(csv_path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["pos", "pett", "athlete", "year", "sex", "team", "nat", "time"])
+        for position, participant in enumerate(make_participants(rows), 1):
+            writer.writerow([position] + participant)
+
+    result = json.loads(run_python(
+        MEASURE_CSV_TO_PDF, REPO_ROOT, csv_path, os.path.join(tmp, "render.pdf")
+    ))
+    if not result["written"]:
+        sys.exit("error: csv_to_pdf did not write the PDF")
+    return {
+        "rows": rows,
+        "seconds": result["seconds"],
+        "rows_per_second": rows / result["seconds"],
+        "peak_rss_mib": result["peak_kb"] / 1024,
+    }
+
+
+def bench_main(tmp, batch_sizes, finishers, jobs, engine):
+    """Measure main.py end to end on folders of batch_sizes files."""
+    pdf_paths = [os.path.join(tmp, "batch", f"race{index:03d}.pdf") for index in range(max(batch_sizes))]
+    os.makedirs(os.path.join(tmp, "batch"))
+    generate_pdfs(pdf_paths, finishers)
+
+    results = {}
+    for size in batch_sizes:
+        input_dir = os.path.join(tmp, f"input{size}")
+        os.makedirs(input_dir)
+        for pdf_path in pdf_paths[:size]:
+            os.link(pdf_path, os.path.join(input_dir, os.path.basename(pdf_path)))
+
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "main.py", "-i", input_dir, "-o", os.path.join(tmp, f"output{size}"),
+             "--no-cache", "-j", str(jobs), "--engine", engine],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+        )
+        seconds = time.perf_counter() - start
+        if completed.returncode != 0:
+            sys.exit(f"error: main.py failed on {size} files:\n{completed.stdout}")
+        results[str(size)] = {
+            "files": size,
+            "seconds": seconds,
+            "files_per_second": size / seconds,
+        }
+    return results
+
+
+def git_commit():
+    """Return the commit of the benchmarked tree, or None outside a git checkout."""
+    completed = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    return completed.stdout.strip() or None
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print the change of every metric against a baseline run.
+
+    Returns:
+        list: Names of the metrics that regressed by more than tolerance
+    """
+    regressions = []
+
+    def walk(current, previous, path):
+        for key, value in current.items():
+            if key not in previous:
+                continue
+            if isinstance(value, dict):
+                walk(value, previous[key], f"{path}{key}.")
+            elif isinstance(value, float) and previous[key]:
+                change = value / previous[key] - 1
+                worse = -change if key in THROUGHPUT_METRICS else change
+                flag = "  REGRESSION" if key != "seconds" and worse > tolerance else ""
+                if flag:
+                    regressions.append(path + key)
+                print(f"{path + key:<36} {previous[key]:12.2f} -> {value:12.2f} ({change:+.1%}){flag}")
+
+    walk(results, baseline, "")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200, help="pages of the pdf_to_csv PDF")
+    parser.add_argument("--rows", type=int, default=20_000, help="rows of the csv_to_pdf CSV")
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 10, 100],
+                        help="numbers of files processed by main.py")
+    parser.add_argument("--finishers", type=int, default=200, help="finishers in each batch file")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="main.py --jobs (default: CPU count)")
+    parser.add_argument("--engine", default="pdfplumber", help="text extraction engine")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare with a previous JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative slowdown or memory growth reported as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_to_csv_results = bench_pdf_to_csv(tmp, args.pages, args.engine)
+        print(f"pdf_to_csv:  {pdf_to_csv_results['pages_per_second']:10.1f} pages/s, "
+              f"peak RSS {pdf_to_csv_results['peak_rss_mib']:.1f} MiB")
+        csv_to_pdf_results = bench_csv_to_pdf(tmp, args.rows)
+        print(f"csv_to_pdf:  {csv_to_pdf_results['rows_per_second']:10.0f} rows/s, "
+              f"peak RSS {csv_to_pdf_results['peak_rss_mib']:.1f} MiB")
+        main_results = bench_main(tmp, args.batches, args.finishers, args.jobs, args.engine)
+        for size, result in main_results.items():
+            print(f"main.py {size:>3} files: {result['seconds']:8.2f}s "
+                  f"({result['files_per_second']:.1f} files/s)")
+
+    report = {
+        "suite_version": SUITE_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {
+            "pages": args.pages, "rows": args.rows, "batches": args.batches,
+            "finishers": args.finishers, "jobs": args.jobs, "engine": args.engine,
+            "layout": LAYOUT,
+        },
+        "results": {
+            "pdf_to_csv": pdf_to_csv_results,
+            "csv_to_pdf": csv_to_pdf_results,
+            "main": main_results,
+        },
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump(report, json_file, indent=2)
+        print(f"Results written to {args.json}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as json_file:
+            baseline = json.load(json_file)
+        if baseline.get("suite_version") != SUITE_VERSION or baseline.get("parameters") != report["parameters"]:
+            print("warning: the baseline was run with different parameters")
+        print(f"\nCompared with {args.compare} ({baseline.get('commit')}):")
+        regressions = compare(report["results"], baseline["results"], args.tolerance)
+        if regressions:
+            sys.exit(f"error: {len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Generate synthetic Endu-style race results PDFs for benchmarks.
+
+The generated files follow the layout pdf_to_csv expects: six header lines on
+the first page, two on the following ones, one participant per line and three
+footer lines on every page. Names wrapped on two lines, names glued to the
+birth year and missing years can be mixed in. Participants are written as
+lines of text, or as a table with every field in its own column (--table),
+under one of several header rows (--header).
+
+    python benchmarks/synthetic.py results.pdf 5000 [--multiline 0.1] [--glued 0.05] [--table]
+        [--header numbered]
+"""
+import argparse
+import os
+import random
+
+from fpdf import FPDF
+
+FONT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "fonts",
+    "DejaVuSans.ttf",
+)
+
+FIRST_NAMES = ["MARIO", "LUCA", "ANNA", "GIULIA", "NICCOLÒ", "ÉLODIE", "JOSÉ", "FRANCESCA"]
+LAST_NAMES = ["ROSSI", "BIANCHI", "VERDI", "D'AMBROSIO", "MARTIN", "ESPOSITO", "COLOMBO"]
+TEAMS = ["ATLETICA MILANO", "RUNNERS BERGAMO", "G.S. VALTELLINA", "POLISPORTIVA", ""]
+ROWS_PER_PAGE = 40
+
+# Cells of a table row beyond the 7 fields of a participant
+POSITION_CELL = 7
+CATEGORY_CELL = 8
+
+# Columns of the table layouts: header label, width in mm and index of the
+# cell of the row printed in the column
+TABLE_HEADERS = {
+    "plain": [
+        ("Pett", 14, 0), ("Atleta", 52, 1), ("Anno", 12, 2), ("Sex", 9, 3), ("Società", 48, 4),
+        ("Naz", 10, 5), ("Tempo", 18, 6),
+    ],
+    # Position column first, labels in capitals with punctuation
+    "numbered": [
+        ("Pos.", 10, POSITION_CELL), ("PETT.", 14, 0), ("ATLETA", 52, 1), ("ANNO", 12, 2),
+        ("SEX", 9, 3), ("SOCIETA'", 48, 4), ("NAZ.", 10, 5), ("TEMPO", 18, 6),
+    ],
+    # Other labels, some of two words, in another order, with a category column
+    "reordered": [
+        ("N.", 12, 0), ("Cognome Nome", 52, 1), ("Sesso", 11, 3), ("Anno Nascita", 22, 2),
+        ("Squadra", 42, 4), ("Real Time", 18, 6), ("Cat.", 12, CATEGORY_CELL), ("Nazione", 14, 5),
+    ],
+}
+
+
+def make_participants(count, seed=0, null_year_rate=0.05, multiline_rate=0.0):
+    """
+    Build random participant rows.
+
+    Args:
+        count (int): Number of finishers
+        seed (int, optional): Random seed, so runs are reproducible
+        null_year_rate (float, optional): Share of athletes without a birth
+            year ("null"). Defaults to 0.05.
+        multiline_rate (float, optional): Share of athletes with a third name,
+            which write_results_pdf wraps on the next line. Defaults to 0.
+
+    Returns:
+        list: [bib, name, year, sex, team, nat, time] string lists, i.e. the
+            records pdf_to_csv should extract, in document order
+    """
+    rng = random.Random(seed)
+    participants = []
+    for bib in range(1, count + 1):
+        name = f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}"
+        if multiline_rate and rng.random() < multiline_rate:
+            name += f" {rng.choice(FIRST_NAMES)}"
+        year = str(rng.randint(1940, 2008)) if rng.random() > null_year_rate else "null"
+        seconds = rng.randint(30 * 60, 3 * 3600)
+        time = f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+        participants.append(
+            [str(bib), name, year, rng.choice("MF"), rng.choice(TEAMS), "ITA", time]
+        )
+    return participants
+
+
+def participant_lines(participants, seed=0, glued_rate=0.0):
+    """
+    Lay out participant rows as lines of text, the way Endu prints them.
+
+    Names of more than two words are wrapped: the extra words go on a line
+    of their own after the participant line. Some names can be glued to the
+    birth year ("ROSSI MARIO1985"), as pdfplumber sometimes extracts them.
+
+    Args:
+        participants (list): Rows as returned by make_participants
+        seed (int, optional): Random seed, so runs are reproducible
+        glued_rate (float, optional): Share of names glued to the birth year.
+            Defaults to 0.
+
+    Returns:
+        list: Lines of text, in document order
+    """
+    rng = random.Random(f"{seed}-layout")
+    lines = []
+    for bib, name, year, sex, team, nat, time in participants:
+        words = name.split(" ")
+        name, wrapped = " ".join(words[:2]), " ".join(words[2:])
+        if glued_rate and year.isdecimal() and rng.random() < glued_rate:
+            name, year = name + year, ""
+        lines.append(" ".join(part for part in (bib, name, year, sex, team, nat, time) if part))
+        if wrapped:
+            lines.append(wrapped)
+    return lines
+
+
+def table_rows(participants, seed=0, glued_rate=0.0, blank_years=False):
+    """
+    Lay out participant rows as the cells of a results table.
+
+    Names of more than two words are wrapped on a row of their own, in the
+    athlete column. Some names can be printed right against the birth year,
+    with no gap left between the two columns.
+
+    Args:
+        participants (list): Rows as returned by make_participants
+        seed (int, optional): Random seed, so runs are reproducible
+        glued_rate (float, optional): Share of names printed against the
+            birth year. Defaults to 0.
+        blank_years (bool, optional): Leave the year cell of athletes without
+            a birth year blank instead of printing "null". Defaults to False.
+
+    Returns:
+        list: (cells, glued) tuples, one per table row, with the 7 fields of
+            the participant followed by its position and category cells
+    """
+    rng = random.Random(f"{seed}-layout")
+    rows = []
+    for position, (bib, name, year, sex, team, nat, time) in enumerate(participants, 1):
+        words = name.split(" ")
+        name, wrapped = " ".join(words[:2]), " ".join(words[2:])
+        glued = bool(glued_rate) and year.isdecimal() and rng.random() < glued_rate
+        if blank_years and year == "null":
+            year = ""
+        category = f"S{sex}" if sex else ""
+        rows.append(([bib, name, year, sex, team, nat, time, str(position), category], glued))
+        if wrapped:
+            rows.append((["", wrapped, "", "", "", "", "", "", ""], False))
+    return rows
+
+
+def write_table_row(pdf, texts, columns, glued=False):
+    """Write one row of the results table, each text in its column of columns."""
+    x = pdf.l_margin
+    for (_, width, cell), text in zip(columns, texts):
+        pdf.set_x(x)
+        if glued and cell == 1:
+            # Right aligned so that the name ends where the year starts
+            pdf.cell(width + 2 * pdf.c_margin, 5, text, align="R")
+        else:
+            pdf.cell(width, 5, text)
+        x += width
+    pdf.ln(5)
+
+
+def write_results_pdf(pdf_path, count, seed=0, null_year_rate=0.05, multiline_rate=0.0,
+                      glued_rate=0.0, participants=None, table=False, blank_years=False,
+                      header="plain"):
+    """
+    Write a synthetic race results PDF.
+
+    Args:
+        pdf_path (str): Path of the PDF to create
+        count (int): Number of finishers
+        seed (int, optional): Random seed, so runs are reproducible
+        null_year_rate (float, optional): Share of athletes without a birth year
+        multiline_rate (float, optional): Share of names wrapped on two lines
+        glued_rate (float, optional): Share of names glued to the birth year
+        participants (list, optional): Rows to write, as returned by
+            make_participants, instead of count random ones
+        table (bool, optional): Write the participants as a table, with the
+            header labels above the columns, instead of lines of text.
+            Defaults to False.
+        blank_years (bool, optional): Leave missing birth years blank instead
+            of writing "null". Defaults to False.
+        header (str, optional): Layout of the table, one of TABLE_HEADERS.
+            Defaults to "plain".
+
+    Returns:
+        int: Number of pages written
+    """
+    if participants is None:
+        participants = make_participants(count, seed, null_year_rate, multiline_rate)
+    if table:
+        lines = table_rows(participants, seed, glued_rate, blank_years)
+    else:
+        if blank_years:
+            participants = [
+                [field for field in participant if field != "null"] for participant in participants
+            ]
+        lines = participant_lines(participants, seed, glued_rate)
+    header_row = "Pett Atleta Anno Sex Società Naz Tempo"
+    columns = TABLE_HEADERS[header]
+    pdf = FPDF()
+    pdf.set_auto_page_break(False)
+    pdf.add_font("DejaVu", "", FONT_PATH, uni=True)
+    pdf.set_font("DejaVu", "", 8)
+
+    pages = 0
+    for start in range(0, max(len(lines), 1), ROWS_PER_PAGE):
+        pdf.add_page()
+        pages += 1
+        if start == 0:
+            header = [
+                "Trofeo Città di Milano",
+                "Sponsor Srl",
+                "12/05/2024",
+                "Corsa su strada 10 km",
+                "Classifica generale",
+            ]
+        else:
+            header = ["Trofeo Città di Milano"]
+        for line in header:
+            pdf.cell(0, 5, line, ln=1)
+        if table:
+            write_table_row(pdf, [label for label, _, _ in columns], columns)
+        else:
+            pdf.cell(0, 5, header_row, ln=1)
+
+        for line in lines[start:start + ROWS_PER_PAGE]:
+            if table:
+                cells, glued = line
+                write_table_row(pdf, [cells[cell] for _, _, cell in columns], columns, glued)
+            else:
+                pdf.cell(0, 5, line, ln=1)
+
+        for line in ["Cronometraggio a cura di Endu", "Milano", f"Pagina {pages}"]:
+            pdf.cell(0, 5, line, ln=1)
+
+    pdf.output(pdf_path)
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic race results PDF.")
+    parser.add_argument("output", help="Path of the PDF to create")
+    parser.add_argument("finishers", type=int, help="Number of finishers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--null-years", type=float, default=0.05, metavar="RATE",
+                        help="Share of athletes without a birth year (default: 0.05)")
+    parser.add_argument("--multiline", type=float, default=0.0, metavar="RATE",
+                        help="Share of names wrapped on two lines (default: 0)")
+    parser.add_argument("--glued", type=float, default=0.0, metavar="RATE",
+                        help="Share of names glued to the birth year (default: 0)")
+    parser.add_argument("--table", action="store_true",
+                        help="Write the participants as a table, one column per field")
+    parser.add_argument("--blank-years", action="store_true",
+                        help='Leave missing birth years blank instead of writing "null"')
+    parser.add_argument("--header", choices=list(TABLE_HEADERS), default="plain",
+                        help="Header row and columns of the table (default: plain)")
+    args = parser.parse_args()
+    write_results_pdf(
+        args.output, args.finishers, args.seed,
+        null_year_rate=args.null_years, multiline_rate=args.multiline, glued_rate=args.glued,
+        table=args.table, blank_years=args.blank_years, header=args.header,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import csv
+import json
+
+# Kinds of changes between two runs on the same race, in the order they are
+# listed in a changeset. A changed athlete is "retimed" if the race time
+# changed, else "edited" if another detail than a position changed (name,
+# team, year, ... corrected), else "reranked": moved by the changes of others.
+CHANGE_KINDS = ("added", "removed", "retimed", "edited", "reranked")
+
+# Columns holding a position in the sorted results
+POSITION_COLUMNS = ("pos", "sex_pos", "cat_pos")
+
+# Column identifying an athlete across runs: the bib
+KEY_COLUMN = "pett"
+
+
+def read_results_csv(csv_path):
+    """
+    Read the sorted results CSV of a previous run.
+
+    Args:
+        csv_path (str): Path of the CSV written by process_race_results
+
+    Returns:
+        tuple: (columns, rows) with rows as lists of strings, or None if
+            there is no such file
+    """
+    try:
+        with open(csv_path, newline="", encoding="utf-8") as csv_file:
+            reader = csv.reader(csv_file)
+            columns = next(reader, None)
+            rows = [row for row in reader if row]
+    except FileNotFoundError:
+        return None
+    if columns is None:
+        return None
+    return columns, rows
+
+
+def csv_value(value):
+    """Return a value as the CSV writer writes it."""
+    return "" if value is None else str(value)
+
+
+def keyed_rows(columns, rows):
+    """
+    Index rows by bib.
+
+    A bib listed more than once (e.g. an empty bib) is told apart by its
+    occurrence number, in order of position.
+
+    Returns:
+        dict: {(bib, occurrence): values} in the order of rows, with the
+            values as strings, one per column
+    """
+    key_index = columns.index(KEY_COLUMN)
+    padding = [""] * len(columns)
+    occurrences = {}
+    keyed = {}
+    for row in rows:
+        values = [csv_value(value) for value in row] + padding[len(row):]
+        bib = values[key_index]
+        occurrence = occurrences[bib] = occurrences.get(bib, 0) + 1
+        keyed[(bib, occurrence)] = values
+    return keyed
+
+
+def diff_results(previous_columns, previous_rows, columns, rows):
+    """
+    Compare the sorted results of a race with those of a previous run.
+
+    Athletes are matched by bib. Only columns present in both runs are
+    compared.
+
+    Args:
+        previous_columns (list): Columns of the previous results
+        previous_rows (list): Rows of the previous results
+        columns (list): Columns of the new results
+        rows (list): Rows of the new results, sorted
+
+    Returns:
+        dict: Changeset with the row counts of both runs ("rows") and a list
+            per kind of CHANGE_KINDS. Added and removed athletes are listed
+            with all their values; changed ones as {"pett", "athlete",
+            "changes": {column: [previous, new]}}. Values are strings, as in
+            the CSV.
+    """
+    previous = keyed_rows(previous_columns, previous_rows)
+    current = keyed_rows(columns, rows)
+    compared = [
+        (column, columns.index(column), previous_columns.index(column))
+        for column in columns
+        if column in previous_columns
+    ]
+    same_columns = columns == previous_columns
+    athlete_index = columns.index("athlete") if "athlete" in columns else None
+    changeset = {"rows": {"previous": len(previous_rows), "current": len(rows)}}
+    for kind in CHANGE_KINDS:
+        changeset[kind] = []
+
+    for key, values in current.items():
+        old_values = previous.get(key)
+        if old_values is None:
+            changeset["added"].append(dict(zip(columns, values)))
+            continue
+        if same_columns and old_values == values:
+            continue
+        changes = {
+            column: [old_values[old_index], values[index]]
+            for column, index, old_index in compared
+            if old_values[old_index] != values[index]
+        }
+        if not changes:
+            continue
+        if "time" in changes:
+            kind = "retimed"
+        elif any(column not in POSITION_COLUMNS for column in changes):
+            kind = "edited"
+        else:
+            kind = "reranked"
+        changeset[kind].append({
+            "pett": key[0],
+            "athlete": values[athlete_index] if athlete_index is not None else "",
+            "changes": changes,
+        })
+
+    changeset["removed"] = [
+        dict(zip(previous_columns, values)) for key, values in previous.items() if key not in current
+    ]
+    return changeset
+
+
+def count_changes(changeset):
+    """
+    Count the changes of a changeset.
+
+    Returns:
+        dict: Number of athletes of each kind of CHANGE_KINDS
+    """
+    return {kind: len(changeset[kind]) for kind in CHANGE_KINDS}
+
+
+def write_changeset(changeset, path):
+    """
+    Write a changeset as JSON.
+
+    Args:
+        changeset (dict): Changeset returned by diff_results
+        path (str): Path of the JSON file
+    """
+    with open(path, "w", encoding="utf-8") as changeset_file:
+        json.dump(changeset, changeset_file, ensure_ascii=False, indent=1)
+        changeset_file.write("\n")
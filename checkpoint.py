@@ -0,0 +1,193 @@
+import json
+import os
+
+from extraction_cache import file_digest
+
+# Version of the journal layout, bumped whenever it changes. Journals written
+# with another version are discarded.
+JOURNAL_VERSION = 1
+
+# Name of the journal of completed files, inside the checkpoint directory
+COMPLETED_JOURNAL = "completed.jsonl"
+
+
+class PageJournal:
+    """
+    Journal of the pages extracted from a PDF, to resume an interrupted run.
+
+    Each page is appended as one JSON line, with its participant lines and
+    the competition metadata read so far, as soon as it has been extracted.
+    The journal is named after the content hash of the PDF (the same key as
+    the extraction cache), so a rerun on the same file picks it up and only
+    extracts the pages after the last journaled one. A line cut short by a
+    crash is dropped. The journal is removed once the extraction completes.
+    """
+
+    def __init__(self, checkpoint_dir, key):
+        """
+        Args:
+            checkpoint_dir (str): Directory where journals are stored
+            key (str): Content hash of the PDF, including the parser version
+                and engine (see ExtractionCache.key)
+        """
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.path = os.path.join(checkpoint_dir, f"{key}.pages.jsonl")
+        self.key = key
+        self._file = None
+
+    def replay(self):
+        """
+        Read the pages journaled by a previous run, and open the journal for
+        appending the next ones.
+
+        Returns:
+            list: (page_number, lines, metadata) tuples in page order; lines
+                is None for pages without text
+        """
+        pages = []
+        good_size = 0
+        try:
+            with open(self.path, "rb") as journal_file:
+                header = parse_journal_line(journal_file.readline())
+                if header == {"version": JOURNAL_VERSION, "key": self.key}:
+                    good_size = journal_file.tell()
+                    for raw_line in journal_file:
+                        entry = parse_journal_line(raw_line)
+                        if entry is None:
+                            break
+                        pages.append((entry["page"], entry["lines"], entry["metadata"]))
+                        good_size += len(raw_line)
+        except FileNotFoundError:
+            pass
+
+        if good_size:
+            # Drop whatever follows the last complete page
+            self._file = open(self.path, "r+", encoding="utf-8")
+            self._file.truncate(good_size)
+            self._file.seek(good_size)
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._write({"version": JOURNAL_VERSION, "key": self.key})
+        return pages
+
+    def append(self, page_number, lines, metadata):
+        """
+        Journal an extracted page.
+
+        Args:
+            page_number (int): 1-based page number
+            lines (list): Participant lines of the page, or None without text
+            metadata (dict): Competition metadata read up to this page
+        """
+        self._write({"page": page_number, "lines": lines, "metadata": metadata})
+
+    def close(self):
+        """Close the journal, keeping it for a later run."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """Close and delete the journal, once the extraction is complete."""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+        self._file.write("\n")
+        # Flushed page by page, so the page survives if the process is killed
+        self._file.flush()
+
+
+def parse_journal_line(raw_line):
+    """
+    Parse one line of a journal.
+
+    Args:
+        raw_line (bytes): Line read from the journal
+
+    Returns:
+        dict: The entry, or None if the line is incomplete or corrupt
+    """
+    if not raw_line.endswith(b"\n"):
+        return None
+    try:
+        return json.loads(raw_line)
+    except ValueError:
+        return None
+
+
+class CompletedJournal:
+    """
+    Journal of the files a batch run has finished, to skip them when the run
+    is restarted.
+
+    A file is identified by the hash of its name, its content and the options
+    it was processed with, so a modified file or a run with other options
+    processes it again. It is only skipped while its outputs still exist.
+    """
+
+    def __init__(self, checkpoint_dir):
+        """
+        Args:
+            checkpoint_dir (str): Directory where the journal is stored
+        """
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.path = os.path.join(checkpoint_dir, COMPLETED_JOURNAL)
+        self._completed = {}
+        try:
+            with open(self.path, "rb") as journal_file:
+                for raw_line in journal_file:
+                    entry = parse_journal_line(raw_line)
+                    if entry is not None and entry.get("version") == JOURNAL_VERSION:
+                        self._completed[entry["key"]] = entry["outputs"]
+        except FileNotFoundError:
+            pass
+
+    def key(self, pdf_path, options):
+        """
+        Compute the key of a file processed with the given options.
+
+        Args:
+            pdf_path (str): Path to the input PDF file
+            options (dict): Options of process_race_results
+
+        Returns:
+            str: Hex digest of the file name, the options and the file content
+        """
+        # Outputs are named after the file: copies under other names are not done
+        fingerprint = json.dumps([os.path.basename(pdf_path), options], sort_keys=True, default=repr)
+        return file_digest(pdf_path, f"{fingerprint}\0".encode("utf-8"))
+
+    def completed(self, key):
+        """
+        Look up a completed file.
+
+        Args:
+            key (str): Key of the file, as returned by key()
+
+        Returns:
+            list: Output paths of the file, or None if it has not been
+                completed or some of its outputs have since been removed
+        """
+        outputs = self._completed.get(key)
+        if outputs is None or not all(os.path.exists(path) for path in outputs):
+            return None
+        return outputs
+
+    def record(self, key, input_path, outputs):
+        """
+        Record a completed file.
+
+        Args:
+            key (str): Key of the file, as returned by key()
+            input_path (str): Path to the input PDF file
+            outputs (list): Paths of the files it produced
+        """
+        self._completed[key] = outputs
+        entry = {"version": JOURNAL_VERSION, "key": key, "input": input_path, "outputs": outputs}
+        with open(self.path, "a", encoding="utf-8") as journal_file:
+            journal_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
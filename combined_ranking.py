@@ -0,0 +1,389 @@
+"""
+Combined ranking of many races: every result of every sorted CSV, ranked by
+race time into one CSV, within a memory budget.
+
+    python combined_ranking.py output_2024 output_2025 -o combined.csv [--memory-mb 64]
+
+Inputs are sorted CSVs (*_sorted.csv) or folders holding them. Results are
+read in chunks that fit the memory budget; each chunk is sorted by race time
+and spilled to a temporary file, then the chunks are merged with a heap, so
+rankings of millions of rows can be built on a small machine.
+"""
+import argparse
+import csv
+import heapq
+import os
+import pickle
+import sys
+import tempfile
+from contextlib import ExitStack
+from itertools import chain, islice
+from operator import itemgetter
+
+from profiling import stage
+from race_time import STATUS_KEY_BASE, race_time_key
+
+# Suffix of the sorted results written by process_race_results. Category
+# files (race_sorted_M_1960-1979.csv) repeat the same athletes and are not
+# read from folders.
+RESULTS_SUFFIX = "_sorted.csv"
+
+# Columns of the combined ranking: the overall and sex positions, then the
+# race and the position of the result in it, then the result itself
+COMBINED_COLUMNS = [
+    "pos", "sex_pos", "race", "race_pos", "pett", "athlete", "year", "sex", "team", "nat", "time",
+]
+
+# Columns copied from the sorted CSV of each race, in COMBINED_COLUMNS order
+# after "race", with the race position read from its "pos" column
+RACE_COLUMNS = ["pos", "pett", "athlete", "year", "sex", "team", "nat", "time"]
+
+# Default memory budget of the chunks being sorted, in bytes
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+# Maximum number of chunk files merged at once. With more chunks, groups of
+# chunks are first merged into larger ones, keeping open files bounded.
+MAX_MERGE_FILES = 64
+
+# Rows measured at the start of each chunk to estimate the memory of a row
+SIZE_SAMPLE_ROWS = 1000
+
+# Rows pickled together in chunk files. Chunks are read back one block at a
+# time, so a merge holds up to MAX_MERGE_FILES blocks in memory (a few MB).
+SPILL_BLOCK_ROWS = 100
+
+
+def find_results_csvs(paths):
+    """
+    List the sorted results CSVs to rank.
+
+    Args:
+        paths (list): Sorted CSVs, or folders whose *_sorted.csv files are
+            taken in name order
+
+    Returns:
+        list: (race, csv_path) tuples in input order. The race is the file
+            name without the suffix; races found under the same name in
+            several folders are prefixed with the name of their folder.
+
+    Raises:
+        FileNotFoundError: If a path does not exist
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found += sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.endswith(RESULTS_SUFFIX)
+            )
+        elif os.path.isfile(path):
+            found.append(path)
+        else:
+            raise FileNotFoundError(f"No such file or directory: {path}")
+
+    def race_name(csv_path):
+        name = os.path.basename(csv_path)
+        if name.endswith(RESULTS_SUFFIX):
+            return name[:-len(RESULTS_SUFFIX)]
+        return os.path.splitext(name)[0]
+
+    names = [race_name(csv_path) for csv_path in found]
+    races = []
+    for name, csv_path in zip(names, found):
+        if names.count(name) > 1:
+            folder = os.path.basename(os.path.dirname(os.path.abspath(csv_path)))
+            name = f"{folder}/{name}"
+        races.append((name, csv_path))
+    return races
+
+
+def iter_race_rows(races):
+    """
+    Read the results of every race, keyed by race time.
+
+    Args:
+        races (list): (race, csv_path) tuples, as returned by
+            find_results_csvs
+
+    Yields:
+        list: [sort key, race, race_pos, pett, athlete, year, sex, team, nat,
+            time], i.e. COMBINED_COLUMNS after "sex_pos" preceded by the
+            integer sort key of the race time
+
+    Raises:
+        ValueError: If a CSV has no "time" column
+    """
+    # Race times repeat a lot across races: each is parsed once
+    keys = {}
+    for race, csv_path in races:
+        with open(csv_path, newline="", encoding="utf-8") as csv_file:
+            reader = csv.reader(csv_file)
+            columns = next(reader, None)
+            if columns is None:
+                continue
+            if "time" not in columns:
+                raise ValueError(f"No time column in {csv_path}")
+            time_index = columns.index("time")
+            indexes = None
+            if columns != RACE_COLUMNS:
+                indexes = [columns.index(column) if column in columns else None for column in RACE_COLUMNS]
+            width = len(columns)
+            for row in reader:
+                if len(row) != width:
+                    if not row:
+                        continue
+                    row = (row + [""] * width)[:width]
+                race_time = row[time_index]
+                key = keys.get(race_time)
+                if key is None:
+                    key = keys[race_time] = race_time_key(race_time)
+                if indexes is None:
+                    yield [key, race] + row
+                else:
+                    yield [key, race] + [row[index] if index is not None else "" for index in indexes]
+
+
+def row_size(row):
+    """Estimate the memory held by a keyed row while it is sorted, in bytes."""
+    # The row, its values and the pointer to it in the chunk
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) + 8
+
+
+def iter_chunks(rows, memory_budget):
+    """
+    Group rows in chunks whose estimated size fits the memory budget.
+
+    The size of a row is measured on the first rows of each chunk only:
+    measuring every row would cost as much as reading it.
+
+    Args:
+        rows (iterable): Keyed rows, as yielded by iter_race_rows
+        memory_budget (int): Memory budget of a chunk, in bytes
+
+    Yields:
+        list: Chunks of rows, in input order
+    """
+    chunk = []
+    sampled = 0
+    capacity = None
+    for row in rows:
+        chunk.append(row)
+        if capacity is None:
+            sampled += row_size(row)
+            if sampled >= memory_budget:
+                capacity = len(chunk)
+            elif len(chunk) == SIZE_SAMPLE_ROWS:
+                capacity = memory_budget * SIZE_SAMPLE_ROWS // sampled
+        if capacity is not None and len(chunk) >= capacity:
+            yield chunk
+            chunk = []
+            sampled = 0
+            capacity = None
+    if chunk:
+        yield chunk
+
+
+def write_chunk(rows, path):
+    """Write keyed rows to a chunk file, in pickled blocks of SPILL_BLOCK_ROWS rows."""
+    rows = iter(rows)
+    with open(path, "wb") as chunk_file:
+        while True:
+            block = list(islice(rows, SPILL_BLOCK_ROWS))
+            if not block:
+                break
+            pickle.dump(block, chunk_file, pickle.HIGHEST_PROTOCOL)
+
+
+def iter_chunk(chunk_file):
+    """Read the keyed rows of an open chunk file."""
+    while True:
+        try:
+            block = pickle.load(chunk_file)
+        except EOFError:
+            return
+        yield from block
+
+
+def merge_chunks(chunk_paths, stack):
+    """
+    Merge sorted chunk files.
+
+    Rows with the same race time keep the order of the chunks, so the merge
+    is stable as long as the chunks are listed in input order.
+
+    Args:
+        chunk_paths (list): Paths of the chunk files, in input order
+        stack (ExitStack): Stack the chunk files are opened on
+
+    Returns:
+        iterator: Keyed rows sorted by race time
+    """
+    chunks = [
+        iter_chunk(stack.enter_context(open(path, "rb")))
+        for path in chunk_paths
+    ]
+    return heapq.merge(*chunks, key=itemgetter(0))
+
+
+def write_ranking(rows, output_path):
+    """
+    Write keyed rows sorted by race time as the combined ranking.
+
+    Every result gets an overall position; finishers with a sex also get a
+    position within their sex.
+
+    Args:
+        rows (iterable): Keyed rows sorted by race time
+        output_path (str): Path of the ranking CSV
+
+    Returns:
+        int: Number of results written
+    """
+    sex_counts = {}
+    count = 0
+
+    def ranked_rows():
+        nonlocal count
+        for count, row in enumerate(rows, 1):
+            # Keys under STATUS_KEY_BASE are finish times
+            sex = row[6]
+            if sex and row[0] < STATUS_KEY_BASE:
+                row[0] = sex_counts[sex] = sex_counts.get(sex, 0) + 1
+            else:
+                row[0] = ""
+            row.insert(0, count)
+            yield row
+
+    with open(output_path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(COMBINED_COLUMNS)
+        writer.writerows(ranked_rows())
+    return count
+
+
+def rank_results(csv_paths, output_path, memory_budget=DEFAULT_MEMORY_BUDGET, temp_dir=None,
+                 max_merge_files=MAX_MERGE_FILES):
+    """
+    Rank the results of many races by race time into one CSV.
+
+    Results are sorted in chunks that fit the memory budget, spilled to
+    temporary files and merged with a heap. When every result fits in a
+    single chunk nothing is spilled. Results with the same race time keep
+    the order of the inputs, as in the ranking of a single race.
+
+    Args:
+        csv_paths (list): Sorted CSVs, or folders of sorted CSVs (see
+            find_results_csvs)
+        output_path (str): Path of the combined ranking CSV
+        memory_budget (int, optional): Memory of the rows being sorted, in
+            bytes; the total use of the process is somewhat higher. Defaults
+            to DEFAULT_MEMORY_BUDGET.
+        temp_dir (str, optional): Directory of the chunk files. Defaults to
+            None (the system temporary directory).
+        max_merge_files (int, optional): Maximum number of chunk files merged
+            at once. Defaults to MAX_MERGE_FILES.
+
+    Returns:
+        dict: "races", "rows", "chunks" (number of sorted chunks) and
+            "merge_passes" (merges of chunk groups before the final merge)
+
+    Raises:
+        FileNotFoundError: If an input does not exist
+        ValueError: If an input has no "time" column
+    """
+    races = find_results_csvs(csv_paths)
+    rows = iter_race_rows(races)
+    stats = {"races": len(races), "rows": 0, "chunks": 0, "merge_passes": 0}
+
+    chunks = iter_chunks(rows, memory_budget)
+    chunk = next(chunks, [])
+    # Release the chunk held by the generator: chunks are read again below
+    chunks.close()
+    next_row = next(rows, None)
+    if next_row is None:
+        # Everything fits in memory
+        with stage("sort_chunk", rows=len(chunk)):
+            chunk.sort(key=itemgetter(0))
+        with stage("write_ranking") as write_stage:
+            stats["rows"] = write_ranking(chunk, output_path)
+            write_stage.set(rows=stats["rows"])
+        stats["chunks"] = 1 if chunk else 0
+        return stats
+
+    with tempfile.TemporaryDirectory(prefix="combined_ranking_", dir=temp_dir) as spill_dir:
+        chunk_paths = [spill_chunk(chunk, spill_dir, 0)]
+        del chunk
+        for chunk in iter_chunks(chain([next_row], rows), memory_budget):
+            chunk_paths.append(spill_chunk(chunk, spill_dir, len(chunk_paths)))
+            del chunk
+        stats["chunks"] = len(chunk_paths)
+
+        # Merge groups of chunks until few enough are left to open at once
+        spilled = len(chunk_paths)
+        while len(chunk_paths) > max_merge_files:
+            stats["merge_passes"] += 1
+            merged_paths = []
+            for start in range(0, len(chunk_paths), max_merge_files):
+                group = chunk_paths[start:start + max_merge_files]
+                merged_path = os.path.join(spill_dir, f"chunk{spilled}.pickle")
+                spilled += 1
+                with stage("merge_chunks", chunks=len(group)), ExitStack() as stack:
+                    write_chunk(merge_chunks(group, stack), merged_path)
+                for path in group:
+                    os.remove(path)
+                merged_paths.append(merged_path)
+            chunk_paths = merged_paths
+
+        with stage("write_ranking", chunks=len(chunk_paths)) as write_stage, ExitStack() as stack:
+            stats["rows"] = write_ranking(merge_chunks(chunk_paths, stack), output_path)
+            write_stage.set(rows=stats["rows"])
+    return stats
+
+
+def spill_chunk(chunk, spill_dir, number):
+    """
+    Sort a chunk by race time and write it to a temporary file.
+
+    Returns:
+        str: Path of the chunk file
+    """
+    path = os.path.join(spill_dir, f"chunk{number}.pickle")
+    with stage("sort_chunk", rows=len(chunk)):
+        chunk.sort(key=itemgetter(0))
+    with stage("spill_chunk", rows=len(chunk)):
+        write_chunk(chunk, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.strip().splitlines()[2:]),
+    )
+    parser.add_argument("inputs", nargs="+", help="sorted CSVs or output folders holding them")
+    parser.add_argument("-o", "--output", required=True, help="path of the combined ranking CSV")
+    parser.add_argument(
+        "--memory-mb", type=float, default=DEFAULT_MEMORY_BUDGET / (1024 * 1024),
+        help="memory budget of the rows being sorted, in MB (default: 64)"
+    )
+    parser.add_argument(
+        "--temp-dir", help="directory of the temporary chunk files (default: system temporary directory)"
+    )
+    args = parser.parse_args()
+    if args.memory_mb <= 0:
+        parser.error("--memory-mb must be positive")
+
+    try:
+        stats = rank_results(
+            args.inputs, args.output, int(args.memory_mb * 1024 * 1024), args.temp_dir
+        )
+    except (OSError, ValueError) as error:
+        sys.exit(f"error: {error}")
+    print(
+        f"Ranked {stats['rows']} results of {stats['races']} race(s) "
+        f"in {stats['chunks']} chunk(s): {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
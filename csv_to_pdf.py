@@ -1,9 +1,399 @@
-import pandas as pd
-from fpdf import FPDF
+import csv
+import hashlib
+import json
+import os
+import struct
+from collections import OrderedDict
+
+from profiling import stage
+
+# Font of the documents, resolved from this module so that the tool also
+# works when run from another directory
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "DejaVuSans.ttf")
+FONT_FAMILY = "DejaVu"
+
+# Version of the table layout, part of the digests of volumes: bump it when
+# the rendering changes, so that volumes of a previous render are not reused
+LAYOUT_VERSION = "2"
+
+# Maximum number of embedded font subsets kept by render sessions
+MAX_FONT_SUBSETS = 64
+
+# Platform of the font names kept by compact documents: Windows. The
+# Macintosh records repeat the same names, and PDF viewers do not need both.
+COMPACT_NAME_PLATFORM = 3
+
+# Cell values shown as empty cells, as pandas.read_csv treats them as missing
+NA_VALUES = frozenset(
+    [
+        "",
+        "#N/A",
+        "#N/A N/A",
+        "#NA",
+        "-1.#IND",
+        "-1.#QNAN",
+        "-NaN",
+        "-nan",
+        "1.#IND",
+        "1.#QNAN",
+        "<NA>",
+        "N/A",
+        "NA",
+        "NULL",
+        "NaN",
+        "None",
+        "n/a",
+        "nan",
+        "null",
+    ]
+)
+
+
+def read_table(csv_file):
+    """
+    Read a CSV file into column names and display strings.
+
+    Values are formatted like the pandas based reader this replaces: missing
+    values become empty strings and numeric columns are shown without
+    decimals when their values are integers.
+
+    Args:
+        csv_file (str): The path to the CSV file to read.
+
+    Returns:
+        tuple: (columns, rows, measured_columns) as returned by format_table
+    """
+    with stage("read_csv") as read_stage, open(csv_file, newline="", encoding="utf-8") as input_file:
+        reader = csv.reader(input_file)
+        columns = next(reader)
+        rows = [row for row in reader if row]
+        read_stage.set(rows=len(rows))
+    return (columns,) + format_table(columns, rows)
+
+
+def format_table(columns, rows):
+    """
+    Format raw table values for display.
+
+    Args:
+        columns (list): Column names
+        rows (list): Rows of raw values (strings, or integers for numbers)
+
+    Returns:
+        tuple: (rows, measured_columns) where rows are tuples of display
+            strings and measured_columns holds, for each column, the strings
+            used to size it
+    """
+    displayed_columns = []
+    measured_columns = []
+    with stage("format_table", rows=len(rows)):
+        for index in range(len(columns)):
+            values = [row[index] if index < len(row) else "" for row in rows]
+            displayed, measured = format_column(values)
+            displayed_columns.append(displayed)
+            measured_columns.append(measured)
+        rows = list(zip(*displayed_columns))
+    return rows, measured_columns
+
+
+def format_column(values):
+    """
+    Format the values of one column.
+
+    Numbers are typed per column as pandas does: a column of integers without
+    missing values is an integer column, any other numeric column is a float
+    column. Column widths have always been measured on the plain string form
+    of the values (e.g. "1985.0" in a float column), while cells show
+    integral values without decimals.
+
+    Args:
+        values (list): Raw string values of the column
+
+    Returns:
+        tuple: (displayed, measured) lists of strings
+    """
+    numbers = []
+    integer_column = True
+    for value in values:
+        if value in NA_VALUES:
+            numbers.append(None)
+            integer_column = False
+            continue
+        try:
+            numbers.append(int(value))
+            continue
+        except ValueError:
+            integer_column = False
+        try:
+            numbers.append(float(value))
+        except ValueError:
+            # Not a numeric column: show the text as is
+            displayed = ["" if value in NA_VALUES else value for value in values]
+            return displayed, displayed
+
+    if integer_column:
+        displayed = [str(number) for number in numbers]
+        return displayed, displayed
+
+    displayed = []
+    measured = []
+    for number in numbers:
+        if number is None:
+            displayed.append("")
+            measured.append("")
+            continue
+        number = float(number)
+        measured.append(str(number))
+        if number == int(number):
+            # Format integers without decimals
+            displayed.append(f"{int(number)}")
+        else:
+            displayed.append(str(number))
+    return displayed, measured
+
+
+# Per-character widths of the fonts used so far, in 1/1000 of the font size,
+# keyed by font name
+CHAR_WIDTHS = {}
+
+
+def char_width_table(pdf, chars):
+    """
+    Get the width of characters in the current font of a PDF.
+
+    Widths are computed like FPDF.get_string_width does, once per character
+    and font, and cached for the whole process.
+
+    Args:
+        pdf (FPDF): Document whose current font is used
+        chars (iterable): Characters that must be in the table
+
+    Returns:
+        dict: Width of each character, in 1/1000 of the font size
+    """
+    font = pdf.current_font
+    table = CHAR_WIDTHS.setdefault(font["name"], {})
+    missing = set(chars).difference(table)
+    if missing:
+        cw = font["cw"]
+        if pdf.unifontsubset:
+            missing_width = font["desc"]["MissingWidth"] or 500
+            for char in missing:
+                code = ord(char)
+                table[char] = cw[code] if len(cw) > code else missing_width
+        else:
+            for char in missing:
+                table[char] = cw.get(char, 0)
+    return table
+
+
+def max_string_width(pdf, texts):
+    """
+    Get the width of the widest string in the current font of a PDF.
+
+    Only distinct strings are measured, longest first, and measuring stops as
+    soon as no shorter string can be wider than the widest one found, given
+    the widest character in use.
+
+    Args:
+        pdf (FPDF): Document whose current font is used
+        texts (iterable): Strings to measure
+
+    Returns:
+        float: Same value as max(pdf.get_string_width(text) for text in texts),
+            or 0.0 if texts is empty
+    """
+    unique_texts = set(texts)
+    chars = set("".join(unique_texts))
+    if not chars:
+        return 0.0
+    widths = char_width_table(pdf, chars)
+    widest_char = max(widths[char] for char in chars)
+
+    widest = 0
+    for text in sorted(unique_texts, key=len, reverse=True):
+        if len(text) * widest_char <= widest:
+            break
+        widest = max(widest, sum(map(widths.__getitem__, text)))
+    return widest * pdf.font_size / 1000.0
+
+
+# Font subsets embedded so far, as (stream, codeToGlyph, maxUni) keyed by
+# (font file, compact, set of characters), least recently used first
+FONT_SUBSETS = OrderedDict()
+
+# Sessions used when none is given, created on first use, keyed by compact
+_default_sessions = {}
+
+
+class CompactFontPath(str):
+    """
+    Path of a font file embedded in compact form.
+
+    FPDF only hands the path of the font to the font subsetter, so compact
+    documents refer to the font through this marker type.
+    """
+
+
+class RenderSession:
+    """
+    Font data shared by the documents rendered in a process.
+
+    FPDF loads the metrics of a TrueType font again for every document that
+    adds it, and parses the whole font file again when the document is saved,
+    to embed the glyphs it uses. A session loads the metrics once and hands a
+    copy to every new document. Embedded subsets are kept for documents using
+    the same characters, which in a batch of result files is most of them.
+    The PDF files are the same as without a session.
+
+    A compact session writes smaller documents that look the same: the font
+    subset only holds the characters the document uses and the font names
+    of one platform, and the table borders are drawn as one grid per page
+    (see TableGrid) instead of a rectangle around every cell.
+    """
+
+    def __init__(self, font_path=FONT_PATH, compact=False):
+        """
+        Args:
+            font_path (str, optional): TrueType font of the documents.
+                Defaults to FONT_PATH.
+            compact (bool, optional): Write compact documents. Defaults to False.
+        """
+        self.font_path = font_path
+        self.compact = compact
+        # Font entries of an FPDF document after add_font, copied to every new document
+        self._fonts = None
+        self._font_files = None
+
+    def new_document(self):
+        """
+        Create an empty document with the font of the session added.
+
+        Returns:
+            FPDF: Document on which set_font(FONT_FAMILY, ...) can be called
+        """
+        from fpdf import FPDF
+
+        if self._fonts is None:
+            with stage("load_font"):
+                loader = FPDF()
+                loader.add_font(FONT_FAMILY, "", self.font_path, uni=True)
+                self._fonts = loader.fonts
+                self._font_files = loader.font_files
+                install_subset_cache()
+
+        # Entries are copied the way add_font creates them: the lists of
+        # characters used and object numbers are filled per document, the
+        # character widths are shared
+        pdf = FPDF()
+        for key, font in self._fonts.items():
+            if self.compact:
+                # FPDF drops the first character of the subset, code 0, and
+                # otherwise starts it with the control characters
+                pdf.fonts[key] = dict(font, subset=[0], ttffile=CompactFontPath(font["ttffile"]))
+            else:
+                pdf.fonts[key] = dict(font, subset=list(font["subset"]))
+        for key, font_file in self._font_files.items():
+            pdf.font_files[key] = dict(font_file)
+        return pdf
+
+
+def get_render_session(compact=False):
+    """
+    Return the render session of the process, creating it on first use.
+
+    Args:
+        compact (bool, optional): Return the session writing compact documents.
+
+    Returns:
+        RenderSession: Session shared by every report rendered in the process
+    """
+    session = _default_sessions.get(compact)
+    if session is None:
+        session = _default_sessions[compact] = RenderSession(compact=compact)
+    return session
+
+
+def install_subset_cache():
+    """
+    Make FPDF reuse the font subsets it already embedded.
+
+    FPDF 1.7.2 has no hook for this: its TrueType font class is replaced, in
+    the fpdf module, by a subclass returning a subset from FONT_SUBSETS when
+    the same characters of the same font were embedded before. FPDF lists the
+    characters of a document in order of first use, but the subset only
+    depends on which characters are used. Subsets of a CompactFontPath keep
+    the font names of COMPACT_NAME_PLATFORM only. Installing it more than
+    once has no effect.
+    """
+    import fpdf.fpdf
+    from fpdf.ttfonts import TTFontFile
+
+    if getattr(fpdf.fpdf.TTFontFile, "caches_subsets", False):
+        return
+
+    class SubsetCachingFontFile(TTFontFile):
+        caches_subsets = True
+        compact = False
+
+        def makeSubset(self, file, subset):
+            self.compact = isinstance(file, CompactFontPath)
+            key = (file, self.compact, frozenset(subset))
+            cached = FONT_SUBSETS.get(key)
+            if cached is None:
+                stream = super().makeSubset(file, subset)
+                cached = FONT_SUBSETS[key] = (stream, self.codeToGlyph, self.maxUni)
+                if len(FONT_SUBSETS) > MAX_FONT_SUBSETS:
+                    FONT_SUBSETS.popitem(last=False)
+            else:
+                FONT_SUBSETS.move_to_end(key)
+            stream, self.codeToGlyph, self.maxUni = cached
+            return stream
+
+        def add(self, tag, data):
+            if tag == "name" and self.compact:
+                data = platform_name_table(data, COMPACT_NAME_PLATFORM)
+            super().add(tag, data)
+
+    fpdf.fpdf.TTFontFile = SubsetCachingFontFile
+
+
+def platform_name_table(data, platform_id):
+    """
+    Keep the records of one platform in a TrueType "name" table.
+
+    Args:
+        data (bytes): The name table, in format 0
+        platform_id (int): Platform of the records to keep (3 for Windows)
+
+    Returns:
+        bytes: The name table with the records of platform_id only, or data
+            unchanged if it is not in format 0
+    """
+    table_format, count, strings_offset = struct.unpack(">HHH", data[:6])
+    if table_format != 0:
+        return data
+    records = []
+    strings = b""
+    for index in range(count):
+        record = struct.unpack(">6H", data[6 + 12 * index:18 + 12 * index])
+        if record[0] != platform_id:
+            continue
+        length, offset = record[4:]
+        start = strings_offset + offset
+        records.append(struct.pack(">6H", *record[:4], length, len(strings)))
+        strings += data[start:start + length]
+    header = struct.pack(">HHH", 0, len(records), 6 + 12 * len(records))
+    return header + b"".join(records) + strings
 
 
 def csv_to_pdf(
-    csv_file, pdf_file, description="This table represents the data from the CSV file."
+    csv_file,
+    pdf_file,
+    description="This table represents the data from the CSV file.",
+    max_rows=None,
+    max_pages=None,
+    session=None,
 ):
     """
     Converts a CSV file to a PDF file with a tabular representation of the data.
@@ -12,85 +402,495 @@ def csv_to_pdf(
         csv_file (str): The path to the CSV file to read.
         pdf_file (str): The path where the generated PDF file will be saved.
         description (str, optional): A short description to include at the top of the PDF. Defaults to a generic message.
+        max_rows (int, optional): Split the table in volumes of at most max_rows rows. See render_volumes.
+        max_pages (int, optional): Split the table in volumes of at most max_pages pages. See render_volumes.
+        session (RenderSession, optional): Session providing the font. Defaults to the session of the process.
+
+    Returns:
+        list: Paths of the files written (the PDF, or the volumes and their index)
     """
     # Read the CSV file
     try:
-        data_frame = pd.read_csv(csv_file)
+        columns, rows, measured_columns = read_table(csv_file)
     except Exception as e:
         print(f"Error reading the CSV file: {e}")
-        return
+        return []
+
+    return render_table(
+        columns, rows, measured_columns, pdf_file, description, max_rows, max_pages, session
+    )
+
+
+def rows_to_pdf(
+    columns,
+    rows,
+    pdf_file,
+    description="This table represents the data from the CSV file.",
+    max_rows=None,
+    max_pages=None,
+    session=None,
+    previous_index=None,
+):
+    """
+    Converts in-memory rows to a PDF file with a tabular representation of the data.
+
+    The PDF is the same as the one csv_to_pdf generates from a CSV of the
+    same rows, without writing and parsing the CSV.
 
-    # Create a PDF object and configure it
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=10)
-    pdf.add_page()
-    # pdf.set_font("Arial", size=12)
-    pdf.add_font("DejaVu", "", "fonts/DejaVuSans.ttf", uni=True)
-    pdf.set_font("DejaVu", "", 12)
-
-    # Add a title to the PDF
-    # pdf.set_font("Arial", style="B", size=14)
-    pdf.add_font("DejaVu", "", "fonts/DejaVuSans.ttf", uni=True)
-    pdf.set_font("DejaVu", "", 14)
-    pdf.cell(0, 10, "Data Table", ln=True, align="C")
-    pdf.ln(5)
-
-    # Add a description below the title
-    # pdf.set_font("Arial", size=10)
-    pdf.add_font("DejaVu", "", "fonts/DejaVuSans.ttf", uni=True)
-    pdf.set_font("DejaVu", "", 10)
-    line_height = pdf.font_size * 1.2
-    pdf.multi_cell(0, line_height, description, align="C")
-    pdf.ln(5)
-
-    # Configure table fonts and row heights
-    # pdf.set_font("Arial", size=9)
-    pdf.add_font("DejaVu", "", "fonts/DejaVuSans.ttf", uni=True)
-    pdf.set_font("DejaVu", "", 9)
+    Args:
+        columns (list): Column names.
+        rows (list): Rows of string or integer values, one per column.
+        pdf_file (str): The path where the generated PDF file will be saved.
+        description (str, optional): A short description to include at the top of the PDF. Defaults to a generic message.
+        max_rows (int, optional): Split the table in volumes of at most max_rows rows. See render_volumes.
+        max_pages (int, optional): Split the table in volumes of at most max_pages pages. See render_volumes.
+        session (RenderSession, optional): Session providing the font. Defaults to the session of the process.
+        previous_index (str, optional): Index file of a previous render in volumes, whose
+            unchanged volumes are kept. See render_volumes.
+
+    Returns:
+        list: Paths of the files written (the PDF, or the volumes and their index)
+    """
+    rows, measured_columns = format_table(columns, rows)
+    return render_table(
+        columns, rows, measured_columns, pdf_file, description, max_rows, max_pages, session,
+        previous_index
+    )
+
+
+def render_table(
+    columns, rows, measured_columns, pdf_file, description, max_rows=None, max_pages=None,
+    session=None, previous_index=None
+):
+    """
+    Write a formatted table to a PDF file, or to several volumes.
+
+    Args:
+        columns (list): Column names.
+        rows (iterable): Rows of display strings, as returned by format_table.
+        measured_columns (list): Strings used to size each column, as returned by format_table.
+        pdf_file (str): The path where the generated PDF file will be saved.
+        description (str): A short description to include at the top of the PDF.
+        max_rows (int, optional): Split the table in volumes of at most max_rows rows.
+        max_pages (int, optional): Split the table in volumes of at most max_pages pages.
+        session (RenderSession, optional): Session providing the font.
+        previous_index (str, optional): Index file of a previous render in volumes.
+
+    Returns:
+        list: Paths of the files written
+    """
+    if max_rows or max_pages:
+        return render_volumes(
+            columns, rows, measured_columns, pdf_file, description, max_rows, max_pages, session,
+            previous_index
+        )
+
+    if session is None:
+        session = get_render_session()
+    pdf = new_document(description, session=session)
     row_height = pdf.font_size * 1.5
+    column_widths = compute_column_widths(pdf, columns, measured_columns)
+    grid = TableGrid(column_widths) if session.compact else None
+
+    # Write the table headers
+    write_header_row(pdf, columns, column_widths, row_height, grid)
+
+    # Write the rows of data
+    with stage("render_rows") as render_stage:
+        cell = pdf.cell
+        border = 0 if grid else 1
+        row_count = 0
+        for row_count, row in enumerate(rows, 1):
+            if grid is not None:
+                # Break the page where the first cell would, after drawing its grid
+                if pdf.get_y() + row_height > pdf.page_break_trigger:
+                    grid.draw(pdf)
+                    pdf.add_page()
+                grid.add_row(pdf, row_height)
+            for column_width, text in zip(column_widths, row):
+                cell(column_width, row_height, text, border=border, align="C")
+            pdf.ln(row_height)
+        if grid is not None:
+            grid.draw(pdf)
+        render_stage.set(rows=row_count, pages=pdf.page_no())
+
+    return [pdf_file] if save_document(pdf, pdf_file) else []
+
+
+def render_volumes(
+    columns, rows, measured_columns, pdf_file, description, max_rows=None, max_pages=None,
+    session=None, previous_index=None
+):
+    """
+    Write a formatted table as a series of PDF volumes with an index file.
+
+    Rows are streamed into one volume at a time and each volume is written
+    and released as soon as it is full, so memory use is bounded by the
+    volume size rather than by the number of rows. The table header is
+    repeated on every page. Volumes are named after pdf_file with a _partN
+    suffix, and <pdf_file>_index.json lists them with the rows they contain
+    and a digest of their content (see volume_digest).
+
+    Page and volume breaks are planned from the layout of the table before a
+    volume is drawn. Given the index of a previous render of the report, a
+    volume whose digest is unchanged and whose file still exists is not
+    rendered again: its file is left as it is. Volumes of an earlier render
+    to the same path that are beyond the new last volume are deleted once
+    the new index is written.
 
+    Args:
+        columns (list): Column names.
+        rows (iterable): Rows of display strings, as returned by format_table.
+        measured_columns (list): Strings used to size each column, as returned by format_table.
+        pdf_file (str): Base path of the volumes.
+        description (str): A short description to include at the top of each volume.
+        max_rows (int, optional): Maximum number of rows per volume.
+        max_pages (int, optional): Maximum number of pages per volume.
+        session (RenderSession, optional): Session providing the font.
+        previous_index (str, optional): Index file of a previous render of the
+            report, whose unchanged volumes are kept.
+
+    Returns:
+        list: Paths of the volumes written, followed by the path of the index file
+    """
+    if session is None:
+        session = get_render_session()
+    base_path = os.path.splitext(pdf_file)[0]
+    previous_digests = read_volume_digests(previous_index) if previous_index else {}
+    index_path = volume_index_path(pdf_file)
+    replaced_files = volume_files(index_path)
+    volumes = []
+    written = []
+    kept = 0
+
+    # The document of the first volume gives the layout of all of them
+    pdf = new_document(description, "Data Table - Part 1", session)
+    row_height = pdf.font_size * 1.5
+    column_widths = compute_column_widths(pdf, columns, measured_columns)
+    first_page_y = pdf.get_y() + row_height
+    next_page_y = pdf.t_margin + row_height
+    page_break = pdf.page_break_trigger
+    layout = [description, columns, column_widths, session.compact, os.path.basename(session.font_path)]
+
+    def write_volume(first_row, volume_rows, page_starts):
+        nonlocal pdf, kept
+        number = len(volumes) + 1
+        volume_path = f"{base_path}_part{number}.pdf"
+        volume = {
+            "file": os.path.basename(volume_path),
+            "first_row": first_row,
+            "rows": len(volume_rows),
+            "last_row": first_row + len(volume_rows) - 1,
+            "pages": len(page_starts) + 1,
+            "digest": volume_digest(layout, page_starts, volume_rows),
+        }
+        volumes.append(volume)
+        if previous_digests.get(volume["file"]) == volume["digest"]:
+            kept += 1
+            pdf = None
+            return
+
+        if pdf is None:
+            pdf = new_document(description, f"Data Table - Part {number}", session)
+        grid = TableGrid(column_widths) if session.compact else None
+        border = 0 if grid else 1
+        page_starts = set(page_starts)
+        write_header_row(pdf, columns, column_widths, row_height, grid)
+        for index, row in enumerate(volume_rows):
+            if index in page_starts:
+                if grid is not None:
+                    grid.draw(pdf)
+                pdf.add_page()
+                write_header_row(pdf, columns, column_widths, row_height, grid)
+            if grid is not None:
+                grid.add_row(pdf, row_height)
+            for column_width, text in zip(column_widths, row):
+                pdf.cell(column_width, row_height, text, border=border, align="C")
+            pdf.ln(row_height)
+        if grid is not None:
+            grid.draw(pdf)
+        if save_document(pdf, volume_path):
+            written.append(volume_path)
+        pdf = None
+
+    with stage("render_volumes") as render_stage:
+        row_number = 0
+        first_row = 1
+        volume_rows = []
+        # Index in volume_rows of the first row of each page after the first
+        page_starts = []
+        y = first_page_y
+        for row in rows:
+            row_number += 1
+            if volume_rows and max_rows and len(volume_rows) >= max_rows:
+                write_volume(first_row, volume_rows, page_starts)
+                volume_rows = []
+            elif volume_rows and y + row_height > page_break:
+                if max_pages and len(page_starts) + 1 >= max_pages:
+                    write_volume(first_row, volume_rows, page_starts)
+                    volume_rows = []
+                else:
+                    page_starts.append(len(volume_rows))
+                    y = next_page_y
+
+            if not volume_rows:
+                first_row = row_number
+                page_starts = []
+                y = first_page_y
+            volume_rows.append(row)
+            y += row_height
+
+        # Without rows, still write a volume with the header, like a single PDF would have
+        write_volume(first_row, volume_rows, page_starts)
+        render_stage.set(rows=row_number, volumes=len(volumes), kept=kept)
+
+    with open(index_path, "w", encoding="utf-8") as index_file:
+        json.dump({"rows": row_number, "volumes": volumes}, index_file, indent=2)
+    written.append(index_path)
+    remove_stale_volumes(index_path, replaced_files)
+    if kept:
+        print(f"{kept} of {len(volumes)} volumes unchanged since the previous render")
+    print(f"Index of {len(volumes)} volumes saved: {index_path}")
+    return written
+
+
+def volume_index_path(pdf_file):
+    """Return the path of the index file of the volumes of pdf_file."""
+    return f"{os.path.splitext(pdf_file)[0]}_index.json"
+
+
+def volume_digest(layout, page_starts, rows):
+    """
+    Hash the content of a volume, to find out whether it changed since a previous render.
+
+    Args:
+        layout (list): Values the table layout depends on (description,
+            columns and their widths, compact mode and font)
+        page_starts (list): Index of the first row of each page after the first
+        rows (list): Rows of display strings of the volume
+
+    Returns:
+        str: Hex digest, which also covers LAYOUT_VERSION
+    """
+    content = json.dumps([LAYOUT_VERSION, layout, page_starts, rows], ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def read_volume_digests(index_path):
+    """
+    Read the digests of the volumes of a previous render whose files still exist.
+
+    Args:
+        index_path (str): Index file written by render_volumes
+
+    Returns:
+        dict: Digest of each volume file name; empty if the index is missing
+            or unreadable, or was written before volumes had digests
+    """
+    try:
+        with open(index_path, encoding="utf-8") as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        return {}
+    directory = os.path.dirname(index_path)
+    return {
+        volume["file"]: volume["digest"]
+        for volume in index.get("volumes", [])
+        if "digest" in volume and os.path.isfile(os.path.join(directory, volume["file"]))
+    }
+
+
+def volume_files(index_path):
+    """
+    List the volumes of a render.
+
+    Args:
+        index_path (str): Index file written by render_volumes
+
+    Returns:
+        set: File names of the volumes listed in the index; empty if the
+            index is missing or unreadable
+    """
+    try:
+        with open(index_path, encoding="utf-8") as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        return set()
+    return {volume["file"] for volume in index.get("volumes", [])}
+
+
+def remove_stale_volumes(index_path, previous_files):
+    """
+    Delete the volumes of a previous render that a new index no longer lists.
+
+    Call it once the new index is in place, so that no index ever lists a
+    missing volume.
+
+    Args:
+        index_path (str): Index file of the new render
+        previous_files (set): File names of the volumes of the previous
+            render, as returned by volume_files before it was replaced
+
+    Returns:
+        list: Paths of the volumes deleted
+    """
+    directory = os.path.dirname(index_path)
+    removed = []
+    for name in sorted(previous_files - volume_files(index_path)):
+        path = os.path.join(directory, name)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        removed.append(path)
+    if removed:
+        print(f"{len(removed)} volumes of the previous render removed")
+    return removed
+
+
+def new_document(description, title="Data Table", session=None):
+    """
+    Create a PDF document with a title and description, ready for the table.
+
+    Args:
+        description (str): A short description to include below the title.
+        title (str, optional): Title on top of the first page.
+        session (RenderSession, optional): Session providing the font.
+            Defaults to the session of the process.
+
+    Returns:
+        FPDF: Document with the table font selected
+    """
+    if session is None:
+        session = get_render_session()
+    with stage("new_document"):
+        # Create a PDF object and configure it
+        pdf = session.new_document()
+        pdf.set_auto_page_break(auto=True, margin=10)
+        pdf.add_page()
+        # pdf.set_font("Arial", size=12)
+        pdf.set_font(FONT_FAMILY, "", 12)
+
+        # Add a title to the PDF
+        # pdf.set_font("Arial", style="B", size=14)
+        pdf.set_font(FONT_FAMILY, "", 14)
+        pdf.cell(0, 10, title, ln=True, align="C")
+        pdf.ln(5)
+
+        # Add a description below the title
+        # pdf.set_font("Arial", size=10)
+        pdf.set_font(FONT_FAMILY, "", 10)
+        line_height = pdf.font_size * 1.2
+        pdf.multi_cell(0, line_height, description, align="C")
+        pdf.ln(5)
+
+        # Configure table fonts
+        # pdf.set_font("Arial", size=9)
+        pdf.set_font(FONT_FAMILY, "", 9)
+    return pdf
+
+
+def compute_column_widths(pdf, columns, measured_columns):
+    """
+    Size the columns of the table to fit the page width.
+
+    Args:
+        pdf (FPDF): Document with the table font selected.
+        columns (list): Column names.
+        measured_columns (list): Strings used to size each column.
+
+    Returns:
+        list: Width of each column
+    """
     # Calculate column widths to fit the page
     table_width = pdf.w - 20
     column_ratios = []
-    for column_name in data_frame.columns:
-        max_width = pdf.get_string_width(str(column_name).capitalize())
-        for item in data_frame[column_name]:
-            text = str(item) if not pd.isna(item) else ""
-            max_width = max(max_width, pdf.get_string_width(text))
-        column_ratios.append(max_width)
+    with stage("column_widths"):
+        for i, column_name in enumerate(columns):
+            max_width = pdf.get_string_width(str(column_name).capitalize())
+            max_width = max(max_width, max_string_width(pdf, measured_columns[i]))
+            column_ratios.append(max_width)
 
     # Normalize column widths to fit the table within the page width
     total_width = sum(column_ratios)
-    column_widths = [table_width * (ratio / total_width) for ratio in column_ratios]
+    return [table_width * (ratio / total_width) for ratio in column_ratios]
 
-    # Write the table headers
-    for i, column_name in enumerate(data_frame.columns):
+
+def write_header_row(pdf, columns, column_widths, row_height, grid=None):
+    """Write the row of column names of the table, leaving its borders to grid if given."""
+    if grid is not None:
+        grid.add_row(pdf, row_height)
+    for i, column_name in enumerate(columns):
         pdf.cell(
             column_widths[i],
             row_height,
             str(column_name).capitalize(),
-            border=1,
+            border=0 if grid else 1,
             align="C",
         )
     pdf.ln(row_height)
 
-    # Write the rows of data
-    for _, row in data_frame.iterrows():
-        for i, item in enumerate(row):
-            if pd.isna(item):
-                text = ""
-            else:
-                # Format integers without decimals and other values as strings
-                if isinstance(item, (int, float)) and item == int(item):
-                    text = f"{int(item)}"
-                else:
-                    text = str(item)
-            pdf.cell(column_widths[i], row_height, text, border=1, align="C")
-        pdf.ln(row_height)
 
-    # Save the PDF to a file
+class TableGrid:
+    """
+    Borders of the table rows written on the current page.
+
+    A cell with border=1 is drawn with a rectangle of its own, which repeats
+    four coordinates per cell in the page content. Compact documents write
+    their cells without borders and draw the grid once the page is full,
+    with a line across the table per row boundary and a line down the page
+    per column boundary, in the same place and with the same line width and
+    caps. Every line is drawn once, where the rectangles of the cells on
+    either side stroked inner lines twice.
+    """
+
+    def __init__(self, column_widths):
+        """
+        Args:
+            column_widths (list): Width of each column of the table
+        """
+        self.column_widths = column_widths
+        self.left = None
+        # Top of each row written on the page, then the bottom of the last one
+        self.row_lines = []
+
+    def add_row(self, pdf, row_height):
+        """Record a row about to be written at the current position of pdf."""
+        if not self.row_lines:
+            self.left = pdf.get_x()
+            self.row_lines.append(pdf.get_y())
+        self.row_lines.append(pdf.get_y() + row_height)
+
+    def draw(self, pdf):
+        """Draw the grid of the rows recorded on the current page, and start a new one."""
+        if not self.row_lines:
+            return
+        right = self.left
+        column_lines = [self.left]
+        for column_width in self.column_widths:
+            # Summed like FPDF moves from cell to cell
+            right += column_width
+            column_lines.append(right)
+        top, bottom = self.row_lines[0], self.row_lines[-1]
+        for y in self.row_lines:
+            pdf.line(self.left, y, right, y)
+        for x in column_lines:
+            pdf.line(x, top, x, bottom)
+        self.row_lines = []
+
+
+def save_document(pdf, pdf_file):
+    """
+    Save a PDF document to a file.
+
+    Returns:
+        bool: Whether the file was saved
+    """
     try:
-        pdf.output(pdf_file)  # Save the PDF to the specified path
+        with stage("pdf_output", pages=pdf.page_no()):
+            pdf.output(pdf_file)  # Save the PDF to the specified path
         print(f"PDF file successfully saved: {pdf_file}")
+        return True
     except Exception as e:
         print(f"Error saving the PDF file: {e}")
+        return False
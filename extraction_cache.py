@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import tempfile
+
+# Default size limit of the cache directory, in bytes
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Size of the blocks read when hashing a PDF
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_digest(path, prefix=b""):
+    """
+    Compute the SHA-256 of a file, reading it in blocks.
+
+    Args:
+        path (str): Path to the file
+        prefix (bytes, optional): Data hashed before the file content
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256(prefix)
+    with open(path, "rb") as input_file:
+        for block in iter(lambda: input_file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Content-addressed cache of the participant records extracted from PDFs.
+
+    Entries are keyed by a hash of the PDF content and of the parser version,
+    so a file is never parsed twice and entries written by an older parser
+    are never reused. Each entry is a JSON file; the least recently used
+    entries are removed when the directory grows over its size limit.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir (str): Directory where cache entries are stored
+            max_bytes (int, optional): Size limit of the cache directory
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, pdf_path, parser_version):
+        """
+        Compute the cache key of a PDF file.
+
+        Args:
+            pdf_path (str): Path to the PDF file
+            parser_version (str): Version of the parser producing the records
+
+        Returns:
+            str: Hex digest identifying the file content and parser version
+        """
+        return file_digest(pdf_path, f"{parser_version}\0".encode("utf-8"))
+
+    def get(self, key):
+        """
+        Look up a cache entry and mark it as recently used.
+
+        Args:
+            key (str): Cache key, as returned by key()
+
+        Returns:
+            tuple: (participants, metadata), or None on a cache miss
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, encoding="utf-8") as entry_file:
+                entry = json.load(entry_file)
+            os.utime(entry_path)
+        except (OSError, ValueError):
+            return None
+        return entry["participants"], entry["metadata"]
+
+    def put(self, key, participants, metadata):
+        """
+        Store the records of a PDF, then evict old entries if needed.
+
+        The entry is written to a temporary file and renamed, so concurrent
+        readers never see a partial entry.
+
+        Args:
+            key (str): Cache key, as returned by key()
+            participants (list): Participant records, in document order
+            metadata (dict): Competition metadata
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as entry_file:
+                json.dump(
+                    {"participants": participants, "metadata": metadata},
+                    entry_file,
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                )
+            os.replace(tmp_path, self._entry_path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the size limit is met."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
@@ -0,0 +1,267 @@
+from profiling import stage
+
+# Characters without a position of their own in the lines of PDFium text
+BLANK_CHARS = frozenset(" \r\n")
+
+# Engine used when none is selected. pdfplumber is the reference: the other
+# engines must produce the same text for the same pages.
+DEFAULT_ENGINE = "pdfplumber"
+
+
+class PdfplumberEngine:
+    """
+    Page text from pdfplumber's extract_text().
+
+    pdfplumber builds layout objects for every character before assembling
+    the text, which makes it the slowest engine, and the reference one.
+    """
+
+    name = "pdfplumber"
+
+    def page_count(self, pdf_path):
+        """Return the number of pages of a PDF."""
+        import pdfplumber
+
+        with pdfplumber.open(pdf_path) as pdf:
+            return len(pdf.pages)
+
+    def iter_pages(self, pdf_path, start, stop):
+        """
+        Yield the text of a contiguous range of pages, one page at a time.
+
+        The layout objects pdfplumber caches for a page are released as soon
+        as the page has been consumed, so memory use does not grow with the
+        number of pages read.
+
+        Args:
+            pdf_path (str): Path to the input PDF file
+            start (int): Index of the first page (0-based)
+            stop (int): Index after the last page, or None for the end of the file
+
+        Yields:
+            tuple: (page_number, text) with 1-based page numbers
+        """
+        for page in self._iter_page_objects(pdf_path, start, stop):
+            with stage("extract_text", page=page.page_number):
+                text = page.extract_text()
+            yield page.page_number, text
+
+    def iter_page_lines(self, pdf_path, start, stop):
+        """
+        Yield the lines of a contiguous range of pages with the position of
+        every character, one page at a time.
+
+        Args:
+            pdf_path (str): Path to the input PDF file
+            start (int): Index of the first page (0-based)
+            stop (int): Index after the last page, or None for the end of the file
+
+        Yields:
+            tuple: (page_number, text, lines) with 1-based page numbers, text
+                as yielded by iter_pages and lines as (text, xs) tuples, where
+                xs holds the x position of every character of the line text
+                (None for the spaces between words)
+        """
+        for page in self._iter_page_objects(pdf_path, start, stop):
+            with stage("extract_lines", page=page.page_number):
+                lines = [
+                    positioned_line(line["text"], line["chars"])
+                    for line in page.extract_text_lines(return_chars=True)
+                ]
+            yield page.page_number, "\n".join(text for text, _ in lines), lines
+
+    def _iter_page_objects(self, pdf_path, start, stop):
+        """Yield the pdfplumber pages of a range, releasing each once consumed."""
+        # Imported here: pdfplumber is slow to import and not needed at all
+        # when records come from the extraction cache
+        import pdfplumber
+
+        with stage("open_pdf"):
+            pdf = pdfplumber.open(pdf_path)
+            pages = pdf.pages
+        # Cache of the parsed PDF objects of pdfminer. It is private: if a
+        # pdfminer release drops it, pages are still released but the
+        # objects are kept until the file is closed
+        cached_objects = getattr(pdf.doc, "_cached_objs", None)
+        if not isinstance(cached_objects, dict):
+            cached_objects = None
+        with pdf:
+            for index in range(*slice(start, stop).indices(len(pages))):
+                page = pages[index]
+                yield page
+
+                # Drop the page and the PDF objects parsed for it, which
+                # pdfplumber and pdfminer would otherwise keep until the file
+                # is closed
+                page.close()
+                pages[index] = None
+                if cached_objects is not None:
+                    cached_objects.clear()
+
+
+def positioned_line(text, chars):
+    """
+    Pair the text of a pdfplumber line with the x position of its characters.
+
+    Args:
+        text (str): Text of the line, with a space between words
+        chars (list): pdfplumber chars of the words of the line, in order
+
+    Returns:
+        tuple: (text, xs) where xs holds the x position of every character of
+            text, None for the spaces between words
+    """
+    positions = iter([char["x0"] for char in chars for _ in char["text"]])
+    return text, [None if char == " " else next(positions) for char in text]
+
+
+class PdfiumEngine:
+    """
+    Page text from PDFium's text page API, through pypdfium2.
+
+    PDFium extracts the text directly, without building layout objects for
+    Python, and is much faster than pdfplumber. pypdfium2 is already installed
+    as a dependency of pdfplumber. Line breaks are normalized to match the
+    text of pdfplumber.
+    """
+
+    name = "pdfium"
+
+    def page_count(self, pdf_path):
+        """Return the number of pages of a PDF."""
+        import pypdfium2
+
+        pdf = pypdfium2.PdfDocument(pdf_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    def iter_pages(self, pdf_path, start, stop):
+        """
+        Yield the text of a contiguous range of pages, one page at a time.
+
+        Args:
+            pdf_path (str): Path to the input PDF file
+            start (int): Index of the first page (0-based)
+            stop (int): Index after the last page, or None for the end of the file
+
+        Yields:
+            tuple: (page_number, text) with 1-based page numbers
+        """
+        import pypdfium2
+
+        with stage("open_pdf"):
+            pdf = pypdfium2.PdfDocument(pdf_path)
+        try:
+            for index in range(*slice(start, stop).indices(len(pdf))):
+                with stage("extract_text", page=index + 1):
+                    page = pdf[index]
+                    text_page = page.get_textpage()
+                    text = text_page.get_text_range()
+                    text_page.close()
+                    page.close()
+                yield index + 1, normalize_text(text)
+        finally:
+            pdf.close()
+
+    def iter_page_lines(self, pdf_path, start, stop):
+        """
+        Yield the lines of a contiguous range of pages with the position of
+        every character, one page at a time.
+
+        Args:
+            pdf_path (str): Path to the input PDF file
+            start (int): Index of the first page (0-based)
+            stop (int): Index after the last page, or None for the end of the file
+
+        Yields:
+            tuple: (page_number, text, lines) with 1-based page numbers, text
+                as yielded by iter_pages and lines as (text, xs) tuples, where
+                xs holds the x position of every character of the line text
+                (None for spaces)
+        """
+        import ctypes
+
+        import pypdfium2
+        import pypdfium2.raw as pdfium
+
+        x = ctypes.c_double()
+        y = ctypes.c_double()
+        x_pointer = ctypes.byref(x)
+        y_pointer = ctypes.byref(y)
+        get_char_origin = pdfium.FPDFText_GetCharOrigin
+        with stage("open_pdf"):
+            pdf = pypdfium2.PdfDocument(pdf_path)
+        try:
+            for index in range(*slice(start, stop).indices(len(pdf))):
+                with stage("extract_lines", page=index + 1):
+                    page = pdf[index]
+                    text_page = page.get_textpage()
+                    text = text_page.get_text_range()
+                    # The text holds one character per character index, line
+                    # breaks included, unless some are outside the BMP
+                    count = text_page.count_chars()
+                    if len(text) != count:
+                        text = "".join(text_page.get_text_range(char, 1) for char in range(count))
+                    xs = [None] * count
+                    handle = text_page.raw
+                    for char_index, char in enumerate(text):
+                        if char not in BLANK_CHARS:
+                            get_char_origin(handle, char_index, x_pointer, y_pointer)
+                            xs[char_index] = x.value
+                    text_page.close()
+                    page.close()
+                    lines = []
+                    line_start = 0
+                    for line in text.split("\r\n"):
+                        lines.append((line, xs[line_start:line_start + len(line)]))
+                        line_start += len(line) + 2
+                    if lines and not lines[-1][0]:
+                        lines.pop()
+                yield index + 1, normalize_text(text), lines
+        finally:
+            pdf.close()
+
+
+def normalize_text(text):
+    """
+    Normalize PDFium page text to the line layout of pdfplumber.
+
+    PDFium ends lines with "\\r\\n", including the last one, while pdfplumber
+    separates lines with "\\n".
+
+    Args:
+        text (str): Text of a page as returned by PDFium
+
+    Returns:
+        str: Text with "\\n" line separators and no trailing line break
+    """
+    return text.replace("\r\n", "\n").replace("\r", "\n").rstrip("\n")
+
+
+ENGINES = {
+    engine.name: engine for engine in (PdfplumberEngine(), PdfiumEngine())
+}
+
+
+def get_engine(name):
+    """
+    Look up an extraction engine by name.
+
+    Args:
+        name (str): Name of the engine, one of ENGINES
+
+    Returns:
+        Engine with page_count(pdf_path), iter_pages(pdf_path, start, stop)
+            and iter_page_lines(pdf_path, start, stop)
+
+    Raises:
+        ValueError: If there is no engine with this name
+    """
+    try:
+        return ENGINES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown extraction engine: {name} (choose from {', '.join(ENGINES)})"
+        ) from None
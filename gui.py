@@ -1,15 +1,38 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
+import queue
 import threading
-from pdf_to_csv import pdf_to_csv
-from csv_to_pdf import csv_to_pdf
+import time
+
+# Milliseconds between two refreshes of the window from the event queue
+REFRESH_INTERVAL = 100
+
+# Maximum number of events handled per refresh, so that a burst of log lines
+# cannot freeze the window
+MAX_EVENTS_PER_REFRESH = 500
+
+# Seconds the worker thread waits for batch jobs before checking for a
+# cancellation again
+CANCEL_POLL_INTERVAL = 0.2
+
+
+class ProcessingCancelled(Exception):
+    """Raised from the page progress callback to stop processing a file."""
+
+    def __init__(self):
+        super().__init__("Processing cancelled")
 
 
 class RaceResultsProcessorGUI:
     def __init__(self, root):
         """
         Initialize the GUI for race results processing.
+
+        Processing runs on a worker thread that never touches the widgets: it
+        posts ("log", message), ("progress", counts) and ("done", summary)
+        events to a queue, which the Tk main loop drains every
+        REFRESH_INTERVAL milliseconds.
         
         Args:
             root: tkinter root window
@@ -23,7 +46,13 @@ class RaceResultsProcessorGUI:
         self.input_path = tk.StringVar()
         self.output_path = tk.StringVar()
         self.csv_only = tk.BooleanVar(value=False)
+        self.save_profile = tk.BooleanVar(value=False)
+        self.progress_text = tk.StringVar(value="Ready")
         self.processing = False
+
+        # Communication with the worker thread
+        self.events = queue.Queue()
+        self.cancel_requested = threading.Event()
         
         # Default output path
         default_output = os.path.join(os.getcwd(), "output")
@@ -54,6 +83,7 @@ class RaceResultsProcessorGUI:
         ttk.Label(input_frame, text="PDF File/Folder:").grid(row=0, column=0, sticky=tk.W, padx=5)
         ttk.Entry(input_frame, textvariable=self.input_path).grid(row=0, column=1, sticky=(tk.W, tk.E), padx=5)
         ttk.Button(input_frame, text="Browse", command=self.browse_input).grid(row=0, column=2, padx=5)
+        ttk.Button(input_frame, text="Folder", command=self.browse_input_folder).grid(row=0, column=3, padx=5)
         
         # Output section
         output_frame = ttk.LabelFrame(main_frame, text="Output", padding="5")
@@ -71,19 +101,22 @@ class RaceResultsProcessorGUI:
         
         ttk.Checkbutton(options_frame, text="Generate CSV only (skip PDF generation)", 
                        variable=self.csv_only).grid(row=0, column=0, sticky=tk.W, padx=5)
+        ttk.Checkbutton(options_frame, text="Save stage timings (profile.json in the output folder)",
+                       variable=self.save_profile).grid(row=1, column=0, sticky=tk.W, padx=5)
         
         # Progress section
         self.progress_frame = ttk.LabelFrame(main_frame, text="Progress", padding="5")
         self.progress_frame.grid(row=3, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=5, pady=5)
         self.progress_frame.columnconfigure(0, weight=1)
-        self.progress_frame.rowconfigure(1, weight=1)
+        self.progress_frame.rowconfigure(2, weight=1)
         
-        self.progress_bar = ttk.Progressbar(self.progress_frame, mode='indeterminate')
+        self.progress_bar = ttk.Progressbar(self.progress_frame, mode='determinate')
         self.progress_bar.grid(row=0, column=0, sticky=(tk.W, tk.E), padx=5, pady=5)
+        ttk.Label(self.progress_frame, textvariable=self.progress_text).grid(row=1, column=0, sticky=tk.W, padx=5)
         
         # Log text area with frame
         log_frame = ttk.Frame(self.progress_frame)
-        log_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=5, pady=5)
+        log_frame.grid(row=2, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=5, pady=5)
         log_frame.columnconfigure(0, weight=1)
         log_frame.rowconfigure(0, weight=1)
         
@@ -102,7 +135,11 @@ class RaceResultsProcessorGUI:
         self.process_button = ttk.Button(button_frame, text="Process Files", command=self.start_processing)
         self.process_button.grid(row=0, column=0, padx=5)
         
-        ttk.Button(button_frame, text="Clear Log", command=self.clear_log).grid(row=0, column=1, padx=5)
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self.cancel_processing,
+                                        state="disabled")
+        self.cancel_button.grid(row=0, column=1, padx=5)
+
+        ttk.Button(button_frame, text="Clear Log", command=self.clear_log).grid(row=0, column=2, padx=5)
         
     def browse_input(self):
         """Open file dialog for input selection"""
@@ -110,6 +147,13 @@ class RaceResultsProcessorGUI:
         if path:
             self.input_path.set(path)
             self.log(f"Selected input: {path}")
+
+    def browse_input_folder(self):
+        """Open directory dialog for input folder selection"""
+        path = filedialog.askdirectory()
+        if path:
+            self.input_path.set(path)
+            self.log(f"Selected input folder: {path}")
     
     def browse_output(self):
         """Open directory dialog for output folder selection"""
@@ -119,7 +163,7 @@ class RaceResultsProcessorGUI:
             self.log(f"Selected output folder: {path}")
     
     def log(self, message):
-        """Add message to log window"""
+        """Add message to log window (main thread only)"""
         self.log_text.insert(tk.END, message + "\n")
         self.log_text.see(tk.END)
     
@@ -127,52 +171,267 @@ class RaceResultsProcessorGUI:
         """Clear the log window"""
         self.log_text.delete(1.0, tk.END)
     
-    def process_files(self):
-        """Process the selected files"""
+    def post(self, kind, value):
+        """Send an event from the worker thread to the window"""
+        self.events.put((kind, value))
+
+    def start_processing(self):
+        """Validate the input and start processing on a worker thread"""
+        if self.processing:
+            return
+
+        input_path = self.input_path.get()
+        output_path = self.output_path.get()
         try:
-            input_path = self.input_path.get()
-            output_path = self.output_path.get()
-            
             if not input_path:
-                raise ValueError("Please select an input PDF file")
-            
+                raise ValueError("Please select an input PDF file or folder")
             if not output_path:
                 raise ValueError("Please select an output folder")
             
-            # Create output directory if it doesn't exist
+            if os.path.isdir(input_path):
+                pdf_files = [
+                    os.path.join(input_path, f)
+                    for f in sorted(os.listdir(input_path))
+                    if f.endswith('.pdf')
+                ]
+                if not pdf_files:
+                    raise ValueError(f"No PDF files found in folder: {input_path}")
+            elif os.path.isfile(input_path):
+                pdf_files = [input_path]
+            else:
+                raise ValueError(f"Input path does not exist: {input_path}")
+        except ValueError as e:
+            self.show_error_message(str(e))
+            return
+
+        # Same options and cache location as the command line
+        options = dict(
+            generate_final_pdf=not self.csv_only.get(),
+            cache_dir=os.path.join(output_path, ".cache"),
+        )
+
+        self.processing = True
+        self.cancel_requested.clear()
+        self.process_button["state"] = "disabled"
+        self.cancel_button["state"] = "normal"
+        self.progress_bar["value"] = 0
+        self.progress_text.set("Starting...")
+
+        # Start processing in a separate thread
+        self.thread = threading.Thread(
+            target=self.process_files,
+            args=(pdf_files, output_path, options, self.save_profile.get()),
+        )
+        self.thread.daemon = True
+        self.thread.start()
+
+        # Periodically apply the events posted by the thread
+        self.root.after(REFRESH_INTERVAL, self.drain_events)
+
+    def cancel_processing(self):
+        """Ask the worker thread to stop as soon as possible"""
+        self.cancel_requested.set()
+        self.cancel_button["state"] = "disabled"
+        self.progress_text.set("Cancelling...")
+        self.log("Cancelling: files already being processed will finish first...")
+
+    def process_files(self, pdf_files, output_path, options, profile):
+        """
+        Process the selected files (worker thread).
+
+        A single file is processed in this thread, with progress reported
+        page by page. Folders are processed on a pool of worker processes,
+        like the command line batch mode, with progress reported file by file.
+
+        Args:
+            pdf_files (list): Paths to the input PDF files
+            output_path (str): Directory where output files will be saved
+            options (dict): Options of main.process_race_results
+            profile (bool): Save the stage timings to profile.json
+        """
+        from main import process_file_job
+        from profiling import write_profile
+
+        start = time.perf_counter()
+        summary = {"files": len(pdf_files), "failed": [], "cancelled": False}
+        profiled_files = []
+        try:
             os.makedirs(output_path, exist_ok=True)
             
-            # Process the file
-            self.log(f"Processing: {input_path}")
+            page_counts = self.count_pages(pdf_files)
+            progress = {
+                "files_done": 0,
+                "files_total": len(pdf_files),
+                "pages_done": 0,
+                "pages_total": sum(page_counts.values()),
+            }
+            pages_reported = dict.fromkeys(pdf_files, 0)
+            self.post("progress", dict(progress))
             
-            # Get the base filename
-            base_name = os.path.splitext(os.path.basename(input_path))[0]
-            csv_path = os.path.join(output_path, f"{base_name}_sorted.csv")
+            def report(result):
+                # Called once per file, in completion order
+                pdf_file = result["input"]
+                name = os.path.basename(pdf_file)
+                if result["output"]:
+                    self.post("log", result["output"].rstrip("\n"))
+                if result["error"] is not None:
+                    if not self.cancel_requested.is_set():
+                        summary["failed"].append(f"{name}: {result['error']}")
+                        self.post("log", f"Failed: {name} ({result['error']})")
+                else:
+                    self.post("log", f"Processed: {name}")
+                if profile:
+                    profiled_files.append({
+                        "input": pdf_file,
+                        "error": result["error"],
+                        "cpu_time": result["cpu_time"],
+                        "events": result["events"],
+                    })
+                progress["files_done"] += 1
+                progress["pages_done"] += page_counts[pdf_file] - pages_reported[pdf_file]
+                pages_reported[pdf_file] = page_counts[pdf_file]
+                self.post("progress", dict(progress))
             
-            # Convert PDF to CSV
-            self.log("Converting to CSV...")
-            pdf_to_csv(input_path, csv_path)
-            self.log(f"CSV file created: {csv_path}")
+            jobs = min(os.cpu_count() or 1, len(pdf_files))
+            if jobs == 1:
+                for pdf_file in pdf_files:
+                    if self.cancel_requested.is_set():
+                        break
+                    self.post("log", f"Processing: {pdf_file}")
             
-            # Generate formatted PDF if requested
-            if not self.csv_only.get():
-                pdf_path = os.path.join(output_path, f"{base_name}_sorted_formatted.pdf")
-                self.log("Generating formatted PDF...")
-                description = (
-                    "Race Results\n"
-                    "This document contains the sorted race results with participant details.\n"
-                    "Athletes are ranked by their finish time."
+                    def on_page(page_number, page_count, pdf_file=pdf_file):
+                        if self.cancel_requested.is_set():
+                            raise ProcessingCancelled()
+                        progress["pages_done"] += page_number - pages_reported[pdf_file]
+                        pages_reported[pdf_file] = page_number
+                        self.post("progress", dict(progress))
+
+                    report(process_file_job(
+                        pdf_file, output_path, profile, progress=on_page, **options
+                    ))
+            else:
+                self.run_pool(pdf_files, output_path, options, profile, jobs, report)
+
+            if profile:
+                profile_path = os.path.join(output_path, "profile.json")
+                write_profile(
+                    profile_path, start, profiled_files,
+                    jobs=jobs, wall_time=time.perf_counter() - start,
                 )
-                csv_to_pdf(csv_path, pdf_path, description)
-                self.log(f"PDF file created: {pdf_path}")
+                self.post("log", f"Stage timings saved: {profile_path}")
+        except Exception as e:
+            summary["failed"].append(str(e))
+        finally:
+            summary["cancelled"] = self.cancel_requested.is_set()
+            summary["wall_time"] = time.perf_counter() - start
+            self.post("done", summary)
             
-            # Use Tkinter's `after` method to update the UI after processing
-            self.root.after(0, self.show_success_message)
+    def count_pages(self, pdf_files):
+        """
+        Count the pages of each input file, for the progress bar (worker thread).
 
-        except Exception as e:
-            # If an exception occurs, show an error message in the main thread
-            self.root.after(0, self.show_error_message, str(e))
+        Returns:
+            dict: Path -> number of pages (0 for files that cannot be read)
+        """
+        from extraction_engines import ENGINES
     
+        # PDFium only reads the page tree, which is much faster than pdfplumber
+        engine = ENGINES["pdfium"]
+        page_counts = {}
+        for pdf_file in pdf_files:
+            try:
+                page_counts[pdf_file] = engine.page_count(pdf_file)
+            except Exception:
+                page_counts[pdf_file] = 0
+        return page_counts
+
+    def run_pool(self, pdf_files, output_path, options, profile, jobs, report):
+        """
+        Process files on a pool of worker processes (worker thread).
+
+        On cancellation, files not started yet are dropped and the files
+        being processed are allowed to finish.
+
+        Args:
+            pdf_files (list): Paths to the input PDF files
+            output_path (str): Directory where output files will be saved
+            options (dict): Options of main.process_race_results
+            profile (bool): Record the stage timings of each file
+            jobs (int): Number of worker processes
+            report (callable): Called with the result of each file
+        """
+        import multiprocessing
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+        from main import process_file_job
+
+        self.post("log", f"Processing {len(pdf_files)} files on {jobs} worker processes...")
+        # Forking a process that runs Tk threads is unsafe: start fresh interpreters
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as executor:
+            pending = {
+                executor.submit(process_file_job, pdf_file, output_path, profile, **options)
+                for pdf_file in pdf_files
+            }
+            cancelled = False
+            while pending:
+                done, pending = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if not future.cancelled():
+                        report(future.result())
+                if self.cancel_requested.is_set() and not cancelled:
+                    cancelled = True
+                    pending = {future for future in pending if not future.cancel()}
+
+    def drain_events(self):
+        """Apply the events posted by the worker thread (main thread)"""
+        lines = []
+        progress = None
+        summary = None
+        for _ in range(MAX_EVENTS_PER_REFRESH):
+            try:
+                kind, value = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "log":
+                lines.append(value)
+            elif kind == "progress":
+                progress = value
+            elif kind == "done":
+                summary = value
+
+        # One widget update per refresh, however many events arrived
+        if lines:
+            self.log("\n".join(lines))
+        if progress is not None:
+            self.progress_bar["maximum"] = max(progress["pages_total"], 1)
+            self.progress_bar["value"] = progress["pages_done"]
+            self.progress_text.set(
+                f"Files {progress['files_done']}/{progress['files_total']}, "
+                f"pages {progress['pages_done']}/{progress['pages_total']}"
+            )
+
+        if summary is None:
+            self.root.after(REFRESH_INTERVAL, self.drain_events)
+        else:
+            self.finish_processing(summary)
+
+    def finish_processing(self, summary):
+        """Restore the controls and report the outcome of a run"""
+        self.processing = False
+        self.process_button["state"] = "normal"
+        self.cancel_button["state"] = "disabled"
+
+        if summary["cancelled"]:
+            self.progress_text.set(f"Cancelled after {summary['wall_time']:.1f}s")
+            messagebox.showinfo("Cancelled", "Processing was cancelled.")
+        elif summary["failed"]:
+            self.progress_text.set(f"{len(summary['failed'])} file(s) failed")
+            self.show_error_message("\n".join(summary["failed"]))
+        else:
+            self.progress_text.set(
+                f"Processed {summary['files']} file(s) in {summary['wall_time']:.1f}s"
+            )
+            self.show_success_message()
 
     def show_success_message(self):
         """Show a success message in a dialog box"""
@@ -182,38 +441,10 @@ class RaceResultsProcessorGUI:
         """Show an error message in a dialog box"""
         messagebox.showerror("Error", error_message)
     
-    def start_processing(self):
-        """Start processing in a separate thread"""
-        if not self.processing:
-            self.processing = True
-            self.process_button["state"] = "disabled"
-            self.progress_bar.start()
-            
-            # Start processing in a separate thread
-            self.thread = threading.Thread(target=self.process_files)
-            self.thread.daemon = True
-            self.thread.start()
-
-            # Periodically check if the thread is still running
-            # The check_thread function will be called every 100 ms
-            self.root.after(100, self.check_thread)
-    
-    def check_thread(self):
-        """Checks if the thread has finished its task"""
-        if self.thread.is_alive():
-            # If the thread is still running, keep checking
-            # The function will be called again in 100 ms
-            self.root.after(100, self.check_thread)
-        else:
-            # Ensure proper thread termination and UI update
-            self.processing = False
-            self.progress_bar.stop()
-            self.process_button["state"] = "normal"
-
 def gui():
     root = tk.Tk()
     app = RaceResultsProcessorGUI(root)
     root.mainloop()
 
 if __name__ == "__main__":
-    gui()
\ No newline at end of file
+    gui()
@@ -0,0 +1,286 @@
+import re
+import unicodedata
+from bisect import bisect_right
+
+from race_time import UNKNOWN_KEY, race_time_key
+
+# Header labels accepted for each field of the participant records, in record
+# order, compared without case, accents and punctuation. A label may span
+# several words. Columns with other labels (position, category, pace, ...)
+# are allowed and ignored.
+FIELD_LABELS = (
+    ("pett", "pettorale", "dorsale", "n", "num", "numero", "bib"),
+    ("atleta", "nome", "cognome nome", "cognome e nome", "nominativo", "athlete", "name"),
+    ("anno", "anno nascita", "anno di nascita", "nato", "year", "yob"),
+    ("sex", "sesso", "s"),
+    ("societa", "squadra", "team", "club"),
+    ("naz", "nazione", "nazionalita", "nat", "nation", "country"),
+    ("tempo", "tempo ufficiale", "tempo reale", "real time", "time", "finish time"),
+)
+
+# Fields the header row must have: without them no participant can be read
+REQUIRED_FIELDS = (0, 1, 6)
+
+# Longest label, in words
+MAX_LABEL_WORDS = max(len(label.split()) for labels in FIELD_LABELS for label in labels)
+
+# Points a value may start left of the header label of its column, e.g. a
+# bib right aligned under a slightly wider label
+COLUMN_TOLERANCE = 3.0
+
+# Indexes of the fields telling participant rows from wrapped names
+BIB_COLUMN = 0
+ATHLETE_COLUMN = 1
+TIME_COLUMN = 6
+
+# Share of the participant rows of the first page that must have a race time
+# in the time column for the page to be read as a table
+MIN_TIMED_ROWS = 0.5
+
+
+def fold_label(word):
+    """Return a header word without case, accents and punctuation ("Società" -> "societa")."""
+    word = unicodedata.normalize("NFKD", word.casefold())
+    return re.sub(r"[\W_]+", "", "".join(char for char in word if not unicodedata.combining(char)))
+
+
+def match_header(words):
+    """
+    Match the words of a line with the header labels of FIELD_LABELS.
+
+    Labels are matched from left to right, longest first. Every other word
+    starts a column of its own.
+
+    Args:
+        words (list): Folded words of the line, as returned by fold_label
+
+    Returns:
+        tuple: (columns, fields) where columns lists the index of the first
+            word of every column and fields the column of every field of
+            FIELD_LABELS (None if the line has no such column), or None if
+            the line lacks a field of REQUIRED_FIELDS or has more unknown
+            columns than known ones
+    """
+    columns = []
+    fields = [None] * len(FIELD_LABELS)
+    unknown = 0
+    index = 0
+    while index < len(words):
+        for size in range(min(MAX_LABEL_WORDS, len(words) - index), 0, -1):
+            label = " ".join(words[index:index + size])
+            field = next(
+                (field for field, labels in enumerate(FIELD_LABELS) if label in labels), None
+            )
+            if field is not None and fields[field] is None:
+                fields[field] = len(columns)
+                break
+        else:
+            size = 1
+            unknown += 1
+        columns.append(index)
+        index += size
+
+    if any(fields[field] is None for field in REQUIRED_FIELDS) or unknown > len(columns) - unknown:
+        return None
+    return columns, fields
+
+
+def find_header_row(lines):
+    """
+    Find the header row of the results table on a page.
+
+    Args:
+        lines (list): (text, xs) lines of the page, where xs holds the x
+            position of every character of text (see the iter_page_lines
+            method of the extraction engines)
+
+    Returns:
+        tuple: (index of the header line, (starts, fields)) where starts are
+            the x positions from which a character belongs to each column of
+            the table and fields the column of every field of FIELD_LABELS
+            (None for a field the table lacks), or None if the page has no
+            header row. Characters left of the table belong to the first
+            column.
+    """
+    for line_index, (text, xs) in enumerate(lines):
+        positions = []
+        words = []
+        index = 0
+        for token in text.split(" "):
+            word = fold_label(token)
+            if word:
+                positions.append(xs[index])
+                words.append(word)
+            index += len(token) + 1
+        header = match_header(words)
+        if header is None:
+            continue
+        columns, fields = header
+        starts = [positions[word] - COLUMN_TOLERANCE for word in columns]
+        starts[0] = float("-inf")
+        return line_index, (starts, fields)
+    return None
+
+
+def split_cells(text, xs, starts):
+    """
+    Split a line of the table into the text of each of its columns.
+
+    Words are assigned to the column their position falls in. A word that
+    runs over the start of the next column, e.g. a name printed against the
+    birth year ("ROSSI MARIO1985"), is split where its characters cross it.
+
+    Args:
+        text (str): Text of the line
+        xs (list): x position of every character of text
+        starts (list): Column starts of the table (see find_header_row)
+
+    Returns:
+        list: Text of each column, "" for empty cells
+    """
+    cells = [[] for _ in starts]
+    index = 0
+    for token in text.split(" "):
+        if token:
+            column = bisect_right(starts, xs[index]) - 1
+            last = bisect_right(starts, xs[index + len(token) - 1]) - 1
+            if column == last:
+                cells[column].append(token)
+            else:
+                start = 0
+                for offset in range(1, len(token)):
+                    char_column = bisect_right(starts, xs[index + offset]) - 1
+                    if char_column != column:
+                        cells[column].append(token[start:offset])
+                        column = char_column
+                        start = offset
+                cells[column].append(token[start:])
+        index += len(token) + 1
+    return [" ".join(words) for words in cells]
+
+
+def field_cells(text, xs, columns):
+    """
+    Split a line of the table into the text of each field of FIELD_LABELS.
+
+    Args:
+        text (str): Text of the line
+        xs (list): x position of every character of text
+        columns (tuple): (starts, fields) of the table, as returned by
+            find_header_row
+
+    Returns:
+        list: Text of each field, "" for empty cells and missing columns
+    """
+    starts, fields = columns
+    cells = split_cells(text, xs, starts)
+    return [cells[column] if column is not None else "" for column in fields]
+
+
+def is_participant_row(cells):
+    """Return whether the cells of a line are those of a participant."""
+    return bool(cells[BIB_COLUMN] and cells[TIME_COLUMN])
+
+
+def is_wrapped_name(cells):
+    """Return whether the cells of a line only continue the athlete name."""
+    return bool(cells[ATHLETE_COLUMN]) and not any(
+        cell for index, cell in enumerate(cells) if index != ATHLETE_COLUMN
+    )
+
+
+def table_body(lines, columns):
+    """
+    Crop a page to the rows of the results table.
+
+    The body starts after the header row, or at the first participant row
+    if the page has none, and ends at the first line after it that is
+    neither a participant nor a wrapped name: the footer.
+
+    Args:
+        lines (list): (text, xs) lines of the page
+        columns (tuple): (starts, fields) of the table of the document, as
+            returned by find_header_row
+
+    Returns:
+        list: Cells of every row of the body by field, in page order
+    """
+    header = find_header_row(lines)
+    in_body = header is not None
+    rows = []
+    for text, xs in lines[header[0] + 1 if header else 0:]:
+        cells = field_cells(text, xs, columns)
+        if is_participant_row(cells) or (in_body and is_wrapped_name(cells)):
+            rows.append(cells)
+            in_body = True
+        elif rows:
+            break
+    return rows
+
+
+def check_table(rows):
+    """
+    Check that the rows of a page are laid out in the columns of its header.
+
+    Raises:
+        ValueError: If fewer than MIN_TIMED_ROWS of the participant rows have
+            a race time or status in the time column, e.g. when participants
+            are printed as lines of text under a header line
+    """
+    participants = [cells for cells in rows if is_participant_row(cells)]
+    timed = sum(race_time_key(cells[TIME_COLUMN]) < UNKNOWN_KEY for cells in participants)
+    if not participants or timed < MIN_TIMED_ROWS * len(participants):
+        raise ValueError(
+            "The results are not laid out in columns under the header row: "
+            "read them from the page text instead"
+        )
+
+
+class TableRowParser:
+    """
+    Assemble participant records from the rows of a results table.
+
+    Rows can be fed page by page: a record is only complete once the next
+    participant row is seen, because the athlete name may be wrapped on the
+    following rows, possibly on the next page.
+    """
+
+    def __init__(self):
+        self._participant = None
+
+    def feed(self, rows):
+        """
+        Parse a batch of rows.
+
+        Args:
+            rows (iterable): Cells of the rows, as returned by table_body
+
+        Yields:
+            list: Completed [bib, athlete, year, sex, team, nat, time] records
+        """
+        participant = self._participant
+        for cells in rows:
+            if not is_participant_row(cells):
+                if participant is not None and is_wrapped_name(cells):
+                    participant[1] += " " + cells[ATHLETE_COLUMN]
+                continue
+
+            if participant is not None:
+                yield participant
+            bib, athlete, year, sex, team, nat, time = cells
+            if sex != "M" and sex != "F":
+                sex = ""
+            participant = [bib, athlete, year or "null", sex, team, nat, time]
+            self._participant = participant
+
+    def close(self):
+        """
+        Flush the record being assembled.
+
+        Returns:
+            list: The last [bib, athlete, year, sex, team, nat, time] record,
+                or None if there is none
+        """
+        participant = self._participant
+        self._participant = None
+        return participant
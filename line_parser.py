@@ -0,0 +1,146 @@
+import re
+
+# A name glued to the birth year, e.g. "ROSSI1985". Only the leading letters
+# and digits of the token are kept, as the original regex fix-up did.
+GLUED_TOKEN = re.compile(r"([A-Za-zÀ-ÿ]+)(\d+)")
+
+# Quick check for a line containing at least one glued token, so that lines
+# without any (the vast majority) are split without looking at every token
+GLUED_TOKEN_IN_LINE = re.compile(r"(?:^| )[A-Za-zÀ-ÿ]+\d")
+
+# Minimum number of whitespace separated tokens of a participant line. Shorter
+# lines continue the name of the previous participant.
+MIN_FIELDS = 5
+
+
+class ParticipantLineParser:
+    """
+    Assemble participant records from the lines of a race results PDF.
+
+    Lines can be fed page by page: a record is only complete once the next
+    participant line is seen, because the athlete name may continue on the
+    following lines, possibly on the next page.
+    """
+
+    def __init__(self):
+        self._participant = None
+
+    def feed(self, lines):
+        """
+        Parse a batch of lines.
+
+        Args:
+            lines (iterable): Participant lines, without headers and footers
+
+        Yields:
+            list: Completed [bib, athlete, year, sex, team, nat, time] records
+        """
+        participant = self._participant
+        for line in lines:
+            # Check if this line continues the athlete name
+            if participant is not None and len(line.split(None, MIN_FIELDS - 1)) < MIN_FIELDS:
+                participant[1] += " " + line.strip()
+                continue
+
+            if participant is not None:
+                participant[1] = participant[1].strip()
+                self._participant = None
+                yield participant
+
+            participant = parse_participant_line(line) if line else None
+            self._participant = participant
+
+    def close(self):
+        """
+        Flush the record being assembled.
+
+        Returns:
+            list: The last [bib, athlete, year, sex, team, nat, time] record,
+                or None if there is none
+        """
+        participant = self._participant
+        self._participant = None
+        if participant is not None:
+            participant[1] = participant[1].strip()
+        return participant
+
+
+def parse_lines(lines):
+    """
+    Parse participant lines into records.
+
+    Args:
+        lines (iterable): Participant lines, without headers and footers
+
+    Yields:
+        list: [bib, athlete, year, sex, team, nat, time] in document order
+    """
+    parser = ParticipantLineParser()
+    yield from parser.feed(lines)
+    participant = parser.close()
+    if participant is not None:
+        yield participant
+
+
+def tokenize_line(line):
+    """
+    Split a participant line into tokens, separating names glued to the year.
+
+    Args:
+        line (str): Line of text as extracted from the PDF
+
+    Returns:
+        list: Tokens of the line
+    """
+    tokens = line.split(" ")
+    if GLUED_TOKEN_IN_LINE.search(line) is None:
+        return tokens
+
+    formatted_tokens = []
+    for token in tokens:
+        match = GLUED_TOKEN.match(token)
+        if match:
+            formatted_tokens.extend(match.groups())
+        else:
+            formatted_tokens.append(token)
+    return formatted_tokens
+
+
+def parse_participant_line(line):
+    """
+    Parse a single participant line into its fields.
+
+    Args:
+        line (str): Line of text as extracted from the PDF
+
+    Returns:
+        list: [bib, athlete, year, sex, team, nat, time], or None if the line
+            does not contain all the required fields. The athlete name is not
+            stripped, as continuation lines may still be appended to it.
+    """
+    data = tokenize_line(line)
+    if len(data) < MIN_FIELDS:
+        return None
+
+    # The year is the first 4-digit (or "null") token after the bib number
+    for year_idx in range(1, len(data)):
+        token = data[year_idx]
+        if len(token) == 4 and (token.isdecimal() or token.lower() == "null"):
+            break
+    else:
+        year_idx = None
+
+    if year_idx is not None:
+        year = data[year_idx]
+        sex = data[year_idx + 1]
+        if sex != "M" and sex != "F":
+            sex = ""
+        athlete_name = " ".join(data[1:year_idx])
+        team = " ".join(data[year_idx + 2 : -2])
+    else:
+        year = "null"
+        sex = data[-3]
+        athlete_name = " ".join(data[2:-3])
+        team = ""
+
+    return [data[0], athlete_name, year, sex, team, data[-2], data[-1]]
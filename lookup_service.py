@@ -0,0 +1,402 @@
+"""
+Local HTTP service looking up athletes in processed race results.
+
+Serves the sorted CSVs written by main.py to an output folder:
+
+    python lookup_service.py output [--port 8080]
+
+    GET /lookup?bib=123            results of bib 123, in every race
+    GET /lookup?name=ross ma       athletes whose name has words starting with
+                                   "ROSS" and "MA", accents and case ignored
+    GET /lookup?...&race=10k       only look in the race 10k (10k_sorted.csv)
+    GET /races                     loaded races and their number of results
+
+Answers are JSON. CSVs are loaded into in-memory indexes and reloaded in the
+background when they change, so lookups never touch the disk.
+"""
+import argparse
+import asyncio
+import bisect
+import csv
+import json
+import os
+import re
+import unicodedata
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+# Suffix of the sorted results written by process_race_results. Category
+# files (race_sorted_M_1960-1979.csv) repeat the same athletes and are not
+# loaded.
+RESULTS_SUFFIX = "_sorted.csv"
+
+# Maximum number of results of a name lookup, unless ?limit= is given
+DEFAULT_LIMIT = 20
+
+# Letters of the accented range the line parser accepts (À-ÿ) that Unicode
+# decomposition does not reduce to ASCII letters
+FOLDED_LETTERS = str.maketrans({
+    "Æ": "AE", "æ": "AE", "Ø": "O", "ø": "O", "Ð": "D", "ð": "D",
+    "Þ": "TH", "þ": "TH", "ß": "SS",
+})
+
+
+def fold_name(name):
+    """
+    Normalize a name for lookups: no accents, upper case, words only.
+
+    Args:
+        name (str): Name as printed in the results or typed by a user,
+            e.g. "D'Ambrosio Niccolò"
+
+    Returns:
+        str: Folded name, e.g. "D AMBROSIO NICCOLO"
+    """
+    name = unicodedata.normalize("NFKD", name.translate(FOLDED_LETTERS))
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[\W_]+", " ", name.upper()).split())
+
+
+class RaceIndex:
+    """
+    Indexes of the results of one race.
+
+    Bibs are looked up in a dict. Names are looked up by word prefix: every
+    word of every folded name is kept in a sorted list, so the words starting
+    with a prefix form a contiguous range found by bisection.
+    """
+
+    def __init__(self, race, columns, rows):
+        """
+        Args:
+            race (str): Name of the race, from the CSV file name
+            columns (list): Column names of the CSV
+            rows (list): Rows of the CSV, in ranking order
+        """
+        self.race = race
+        self.results = [dict(zip(columns, row), race=race) for row in rows]
+        self.bibs = {}
+        # Folded name of each result, with a leading space so that " " + prefix
+        # is found in it when a word starts with the prefix
+        self.names = []
+        words = []
+        for index, result in enumerate(self.results):
+            self.bibs.setdefault(result.get("pett", "").strip(), []).append(index)
+            name = fold_name(result.get("athlete", ""))
+            self.names.append(" " + name)
+            words += [(word, index) for word in set(name.split())]
+        words.sort()
+        self.words = [word for word, _ in words]
+        self.word_results = [index for _, index in words]
+
+    def find_bib(self, bib):
+        """Return the results of a bib, in ranking order."""
+        return [self.results[index] for index in self.bibs.get(bib, ())]
+
+    def find_name(self, prefixes, limit):
+        """
+        Return the results whose name has a word starting with each prefix.
+
+        Args:
+            prefixes (list): Folded word prefixes, e.g. ["ROSS", "MA"]
+            limit (int): Maximum number of results
+
+        Returns:
+            list: Matching results, in ranking order
+        """
+        # Candidates come from the prefix matching the fewest words; the other
+        # prefixes are checked on the names of the candidates
+        ranges = []
+        for prefix in prefixes:
+            start = bisect.bisect_left(self.words, prefix)
+            stop = bisect.bisect_left(self.words, prefix + "\uffff", start)
+            ranges.append((stop - start, start, stop, prefix))
+        _, start, stop, prefix = min(ranges)
+        others = [" " + other for other in prefixes if other != prefix]
+        matches = []
+        for index in sorted(set(self.word_results[start:stop])):
+            if len(matches) == limit:
+                break
+            name = self.names[index]
+            if all(other in name for other in others):
+                matches.append(self.results[index])
+        return matches
+
+
+def load_race(csv_path):
+    """
+    Build the index of a sorted results CSV.
+
+    Args:
+        csv_path (str): Path to a CSV written by process_race_results
+
+    Returns:
+        RaceIndex: Index of the race, named after the input PDF
+    """
+    with open(csv_path, newline="", encoding="utf-8") as csv_file:
+        reader = csv.reader(csv_file)
+        columns = next(reader, [])
+        rows = list(reader)
+    race = os.path.basename(csv_path)[:-len(RESULTS_SUFFIX)]
+    return RaceIndex(race, columns, rows)
+
+
+class ResultsLookup:
+    """
+    In-memory indexes of every sorted results CSV of a folder.
+
+    refresh() reloads the CSVs that were added, modified or removed since the
+    last call. Indexes are rebuilt aside and swapped in at once, so lookups
+    running in other threads always see a complete set of races.
+    """
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory (str): Output folder of main.py
+        """
+        self.directory = directory
+        # race -> RaceIndex, replaced as a whole on reload
+        self.races = {}
+        # CSV path -> (mtime_ns, size) of the loaded version
+        self._signatures = {}
+
+    def refresh(self):
+        """
+        Reload the CSVs that changed.
+
+        Returns:
+            list: Names of the races loaded or removed
+        """
+        signatures = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(RESULTS_SUFFIX) and entry.is_file():
+                    stat = entry.stat()
+                    signatures[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        if signatures == self._signatures:
+            return []
+
+        races = {
+            race: index for race, index in self.races.items()
+            if self._signatures.get(self._path(race)) == signatures.get(self._path(race))
+        }
+        changed = sorted(set(self.races) - set(races))
+        for path in sorted(signatures):
+            race = os.path.basename(path)[:-len(RESULTS_SUFFIX)]
+            if race not in races:
+                try:
+                    races[race] = load_race(path)
+                except (OSError, UnicodeDecodeError, csv.Error):
+                    # Still being written: retried on the next refresh
+                    signatures.pop(path)
+                    continue
+                if race not in changed:
+                    changed.append(race)
+        self.races = races
+        self._signatures = signatures
+        return changed
+
+    def lookup(self, bib=None, name=None, race=None, limit=DEFAULT_LIMIT):
+        """
+        Find results by bib or by name.
+
+        Args:
+            bib (str, optional): Bib number
+            name (str, optional): Words of the name, or their beginning
+            race (str, optional): Only look in this race. Defaults to all races.
+            limit (int, optional): Maximum number of results of a name lookup.
+                Defaults to DEFAULT_LIMIT.
+
+        Returns:
+            list: Result dicts (the CSV columns plus "race")
+        """
+        races = self.races
+        if race is None:
+            indexes = races.values()
+        else:
+            indexes = [races[race]] if race in races else []
+        if bib is not None:
+            bib = bib.strip()
+            return [result for index in indexes for result in index.find_bib(bib)]
+        prefixes = fold_name(name or "").split()
+        if not prefixes:
+            return []
+        matches = []
+        for index in indexes:
+            if len(matches) >= limit:
+                break
+            matches += index.find_name(prefixes, limit - len(matches))
+        return matches
+
+    def _path(self, race):
+        return os.path.join(self.directory, race + RESULTS_SUFFIX)
+
+
+class LookupServer:
+    """
+    Minimal HTTP/1.1 server answering lookups over a ResultsLookup, on asyncio.
+
+    Only GET requests without a body are supported, which is all lookups
+    need; connections are kept open between requests. The CSVs are checked
+    for changes every poll interval and reloaded in a worker thread, so
+    lookups keep being answered from the previous indexes meanwhile.
+    """
+
+    def __init__(self, directory, poll_interval=1.0, verbose=False):
+        """
+        Args:
+            directory (str): Output folder of main.py
+            poll_interval (float, optional): Seconds between two checks for
+                changed CSVs. Defaults to 1.0.
+            verbose (bool, optional): Log every request. Defaults to False.
+        """
+        self.results = ResultsLookup(directory)
+        self.results.refresh()
+        self.poll_interval = poll_interval
+        self.verbose = verbose
+
+    async def serve(self, host="127.0.0.1", port=8080, started=None):
+        """
+        Serve lookups until cancelled.
+
+        Args:
+            host (str, optional): Address to listen on. Defaults to 127.0.0.1.
+            port (int, optional): Port to listen on, 0 for any free port.
+                Defaults to 8080.
+            started (callable, optional): Called with the port once listening
+        """
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        reload_task = asyncio.ensure_future(self.reload_loop())
+        try:
+            if started is not None:
+                started(server.sockets[0].getsockname()[1])
+            async with server:
+                await server.serve_forever()
+        finally:
+            reload_task.cancel()
+
+    async def reload_loop(self):
+        """Reload the CSVs that changed, every poll interval."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                changed = await loop.run_in_executor(None, self.results.refresh)
+            except OSError as e:
+                print(f"Could not reload results: {e}")
+                continue
+            if changed:
+                print(f"Reloaded: {', '.join(changed)}")
+
+    async def handle_connection(self, reader, writer):
+        """Answer the requests of one connection, until the client closes it."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                parts = request_line.split()
+                headers = {
+                    name.strip().lower(): value.strip()
+                    for name, _, value in (line.partition(":") for line in header_lines if line)
+                }
+                if len(parts) != 3:
+                    status, body = 400, {"error": "Malformed request"}
+                elif parts[0] != "GET" or "content-length" in headers:
+                    status, body = 405, {"error": "Only GET requests are supported"}
+                else:
+                    status, body = self.respond(parts[1])
+                keep_alive = (
+                    status != 405 and len(parts) == 3 and parts[2] == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                    "Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                    "\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if self.verbose:
+                    print(f"{request_line} {status}")
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def respond(self, target):
+        """
+        Answer a request.
+
+        Args:
+            target (str): Path and query string of the request,
+                e.g. "/lookup?bib=123"
+
+        Returns:
+            tuple: (HTTP status, JSON-serializable body)
+        """
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path == "/lookup":
+            if "bib" not in query and "name" not in query:
+                return 400, {"error": "Missing bib or name parameter"}
+            try:
+                limit = int(query.get("limit", DEFAULT_LIMIT))
+            except ValueError:
+                return 400, {"error": "limit must be an integer"}
+            return 200, {"results": self.results.lookup(
+                query.get("bib"), query.get("name"), query.get("race"), limit
+            )}
+        if url.path == "/races":
+            return 200, {"races": {
+                race: len(index.results) for race, index in sorted(self.results.races.items())
+            }}
+        return 404, {"error": f"Unknown path: {url.path}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.strip().splitlines()[2:]),
+    )
+    parser.add_argument("directory", help="output folder with the sorted CSVs")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on (default: 8080)")
+    parser.add_argument(
+        "--poll-interval", type=float, default=1.0,
+        help="seconds between two checks for changed CSVs (default: 1.0)"
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+    if not os.path.isdir(args.directory):
+        parser.error(f"Not a directory: {args.directory}")
+    if args.poll_interval <= 0:
+        parser.error("--poll-interval must be positive")
+
+    server = LookupServer(args.directory, args.poll_interval, args.verbose)
+    races = server.results.races
+
+    def started(port):
+        print(
+            f"Serving {sum(len(index.results) for index in races.values())} results of "
+            f"{len(races)} race(s) on http://{args.host}:{port}",
+            flush=True,
+        )
+
+    try:
+        asyncio.run(server.serve(args.host, args.port, started))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,452 @@
 import os
+import io
+import sys
+import time
+import shutil
 import argparse
-from pdf_to_csv import pdf_to_csv
-from csv_to_pdf import csv_to_pdf
+import tempfile
+import traceback
+from contextlib import redirect_stdout
+from checkpoint import CompletedJournal
+from extraction_cache import DEFAULT_MAX_BYTES, ExtractionCache
+from extraction_engines import DEFAULT_ENGINE, ENGINES
+from profiling import stage, tracing, write_profile
+from result_formats import OUTPUT_FORMATS
+from watcher import FolderWatcher
 
-def process_race_results(input_pdf, output_directory="output", generate_final_pdf=True):
+# Options of process_race_results that do not change the outputs: a file
+# completed by a checkpointed run is skipped even if they differ on rerun
+RESUME_IGNORED_OPTIONS = ("page_jobs", "cache_dir", "cache_max_bytes", "checkpoint_dir", "engine")
+
+# Pages per volume of the formatted PDFs in diff mode, unless a volume size
+# is given: volumes are the unit that is rendered again when results change
+DIFF_PAGES_PER_VOLUME = 5
+
+def process_race_results(input_pdf, output_directory="output", generate_final_pdf=True, page_jobs=1,
+                         cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES, top=None, generate_csv=True,
+                         max_rows_per_volume=None, max_pages_per_volume=None, category_bands=None,
+                         category_files=False, series_db=None, engine=DEFAULT_ENGINE,
+                         output_format="csv", checkpoint_dir=None, compact_pdf=False, diff=False,
+                         previous_directory=None, progress=None, layout=False, outputs=None):
     """
     Process race results from PDF: convert to sorted CSV and optionally generate a formatted PDF.
     
+    The sorted results are kept in memory and handed to the PDF renderer
+    directly; the CSV is only written as a side output.
+    
     Args:
         input_pdf (str): Path to the input PDF file containing race results
         output_directory (str): Directory where output files will be saved
-        generate_final_pdf (bool): Whether to generate a formatted PDF from the sorted CSV
+        generate_final_pdf (bool): Whether to generate a formatted PDF from the sorted results
+        page_jobs (int): Number of processes used to extract the pages of the PDF
+        cache_dir (str): Directory of the extraction cache, or None to disable it
+        cache_max_bytes (int): Size limit of the extraction cache
+        top (int): Only keep the first top athletes of the overall ranking and of
+            each category, or None to keep all of them
+        generate_csv (bool): Whether to write the sorted CSV
+        max_rows_per_volume (int): Split the formatted PDF in volumes of at most this many rows
+        max_pages_per_volume (int): Split the formatted PDF in volumes of at most this many pages
+        category_bands (list): Year-of-birth category bands (see ranking.parse_category_bands).
+            When given, sex and category positions are added as extra columns.
+        category_files (bool): Also write a CSV and formatted PDF for each category
+        series_db (str): SQLite series store the results are added to, or None
+        engine (str): Text extraction engine (see extraction_engines.ENGINES)
+        output_format (str): Format of the sorted results file and category files,
+            one of result_formats.OUTPUT_FORMATS
+        checkpoint_dir (str): Directory of the page journals used to resume an
+            interrupted extraction, or None to disable them
+        compact_pdf (bool): Write smaller formatted PDFs that look the same
+            (see csv_to_pdf.RenderSession)
+        diff (bool): Compare the results with the sorted CSV of the previous run
+            on the same file: write the changes by bib to <name>_changes.json
+            (see changeset.diff_results), and split the formatted PDFs in
+            volumes (DIFF_PAGES_PER_VOLUME pages unless a volume size is given)
+            of which only those that changed are rendered again. Needs the
+            CSV output format.
+        previous_directory (str): Directory of the outputs of the previous run,
+            when it is not output_directory (e.g. when staging the outputs)
+        progress (callable): Called as progress(page_number, page_count) after each
+            page is extracted; an exception it raises stops the processing
+        layout (bool): Read the participants from the columns of the results table,
+            detected from its header row, instead of the page text
+        outputs (list): Filled with the paths of every file written: results,
+            changeset, formatted PDFs (with their volumes and index, including
+            the volumes kept from the previous run), category files and the
+            series store
     
     Returns:
-        tuple: Paths to the generated files (csv_path, pdf_path if generated, else None)
+        tuple: Paths to the generated files (results_path, the sorted results
+            file in output_format, if generated, else None,
+            pdf_path if generated, else None). When the formatted PDF is split
+            in volumes, pdf_path is the index file listing them.
     """
+    # The pipeline stages pull in heavy dependencies (pdfplumber, fpdf), so they
+    # are only imported when a file is actually processed
+    from pdf_to_csv import CSV_COLUMNS, extract_results, write_results
+    
+    if outputs is None:
+        outputs = []
     try:
         # Create output directory if it doesn't exist
         os.makedirs(output_directory, exist_ok=True)
         
         # Generate output file paths
         input_filename = os.path.splitext(os.path.basename(input_pdf))[0]
-        csv_path = os.path.join(output_directory, f"{input_filename}_sorted.csv")
+        extension = OUTPUT_FORMATS[output_format]
+        results_path = os.path.join(output_directory, f"{input_filename}_sorted{extension}")
         pdf_path = os.path.join(output_directory, f"{input_filename}_sorted_formatted.pdf")
+        previous_directory = previous_directory or output_directory
+        if diff and not (max_rows_per_volume or max_pages_per_volume):
+            max_pages_per_volume = DIFF_PAGES_PER_VOLUME
+        
+        # Step 1: Extract and sort the results, writing the CSV if requested
+        print("Extracting and sorting race results...")
+        cache = ExtractionCache(cache_dir, cache_max_bytes) if cache_dir else None
+        with stage("extract_results") as extract_stage:
+            # Category standings are computed on the full ranking, then cut
+            rows, metadata = extract_results(
+                input_pdf, workers=page_jobs, cache=cache,
+                top=top if category_bands is None else None, engine=engine,
+                progress=progress, checkpoint_dir=checkpoint_dir, layout=layout
+            )
+            extract_stage.set(rows=len(rows))
+        columns = CSV_COLUMNS
+        categories = {}
+        if category_bands is not None:
+            from ranking import RANKING_COLUMNS, add_rankings, top_standings
+            
+            with stage("rankings", rows=len(rows)):
+                rows, categories = add_rankings(rows, category_bands)
+                if top is not None:
+                    rows, categories = top_standings(rows, categories, top)
+            columns = CSV_COLUMNS + RANKING_COLUMNS
+        
+        # Compare with the results of the previous run if requested
+        if diff:
+            from changeset import count_changes, diff_results, read_results_csv, write_changeset
+            
+            previous = read_results_csv(os.path.join(previous_directory, os.path.basename(results_path)))
+            if previous is None:
+                print("No previous results to compare with: writing all the outputs")
+            else:
+                with stage("diff", rows=len(rows)):
+                    changeset = diff_results(*previous, columns, rows)
+                changes_path = os.path.join(output_directory, f"{input_filename}_changes.json")
+                write_changeset(changeset, changes_path)
+                outputs.append(changes_path)
+                counts = ", ".join(f"{count} {kind}" for kind, count in count_changes(changeset).items())
+                print(f"Changes since the previous run ({counts}): {changes_path}")
         
-        # Step 1: Convert PDF to sorted CSV
-        print("Converting race results PDF to sorted CSV...")
-        pdf_to_csv(input_pdf, csv_path)
-        print(f"Sorted CSV created: {csv_path}")
+        if generate_csv:
+            outputs.extend(write_results(rows, results_path, columns, output_format, metadata))
+            print(f"Sorted {output_format.upper()} created: {results_path}")
+        else:
+            results_path = None
         
         # Step 2: Generate formatted PDF if requested
         if generate_final_pdf:
+            from csv_to_pdf import get_render_session, rows_to_pdf, volume_files, volume_index_path
+            
+            def previous_index(path):
+                # Index of the volumes of the previous run, whose unchanged
+                # volumes are kept in diff mode
+                if not diff:
+                    return None
+                return os.path.join(previous_directory, os.path.basename(volume_index_path(path)))
+            
+            def add_report_outputs(path, written):
+                # In volumes, the unchanged volumes kept in diff mode are not
+                # written again but are still part of the report
+                outputs.extend(written)
+                index_path = volume_index_path(path)
+                if index_path in written:
+                    outputs.extend(
+                        volume_path
+                        for volume_path in (
+                            os.path.join(output_directory, name) for name in sorted(volume_files(index_path))
+                        )
+                        if volume_path not in written
+                    )
+            
+            # Every report of the process shares the loaded font and its
+            # embedded subsets, e.g. all the files of a batch worker
+            session = get_render_session(compact=compact_pdf)
             print("Generating formatted PDF from sorted data...")
             description = (
                 "Race Results\n"
                 "This document contains the sorted race results with participant details.\n"
                 "Athletes are ranked by their finish time."
             )
-            csv_to_pdf(csv_path, pdf_path, description)
+            with stage("render_pdf", rows=len(rows)):
+                written = rows_to_pdf(
+                    columns, rows, pdf_path, description,
+                    max_rows=max_rows_per_volume, max_pages=max_pages_per_volume,
+                    session=session, previous_index=previous_index(pdf_path)
+                )
+            if not written:
+                raise RuntimeError(f"Could not write the formatted PDF: {pdf_path}")
+            add_report_outputs(pdf_path, written)
+            pdf_path = written[-1]
             print(f"Formatted PDF created: {pdf_path}")
-            return csv_path, pdf_path
+        else:
+            pdf_path = None
+        
+        # Step 3: Write the standings of each category if requested
+        if category_files:
+            from ranking import category_slug
+            
+            for category, category_rows in categories.items():
+                category_path = os.path.join(
+                    output_directory, f"{input_filename}_sorted_{category_slug(category)}"
+                )
+                if generate_csv:
+                    outputs.extend(write_results(
+                        category_rows, f"{category_path}{extension}", columns, output_format,
+                        dict(metadata, category=category)
+                    ))
+                if generate_final_pdf:
+                    category_pdf_path = f"{category_path}_formatted.pdf"
+                    written = rows_to_pdf(
+                        columns, category_rows, category_pdf_path,
+                        f"Race Results - {category}\n"
+                        "Athletes of the category are ranked by their finish time.",
+                        max_rows=max_rows_per_volume, max_pages=max_pages_per_volume,
+                        session=session,
+                        previous_index=previous_index(category_pdf_path)
+                    )
+                    add_report_outputs(category_pdf_path, written)
+            print(f"Category standings created: {len(categories)} categories")
+        
+        # Step 4: Add the results to the series store if requested
+        if series_db:
+            from series_store import SeriesStore
+            
+            with stage("series_store", rows=len(rows)), SeriesStore(series_db) as store:
+                if store.add_race(input_filename, rows, metadata):
+                    print(f"Series results updated: {series_db}")
+            outputs.append(series_db)
         
-        return csv_path, None
+        return results_path, pdf_path
         
     except Exception as e:
         print(f"Error processing race results: {str(e)}")
         raise
 
+def process_file_job(input_pdf, output_directory, profile=False, **options):
+    """
+    Run process_race_results for a single file inside a batch worker.
+
+    Everything the pipeline prints is captured so the parent process can
+    report each file as a block, in input order, regardless of which worker
+    finished first.
+
+    Args:
+        input_pdf (str): Path to the input PDF file
+        output_directory (str): Directory where output files will be saved
+        profile (bool): Record the timings of the pipeline stages
+        **options: Other arguments of process_race_results
+
+    Returns:
+        dict: Result of the job with keys "input", "csv_path", "pdf_path",
+            "outputs" (paths of every file written, see process_race_results),
+            "output" (captured stdout), "error" (None on success),
+            "cpu_time" (CPU seconds spent in the worker) and "events" (stage
+            timings, see profiling.Trace; empty unless profile is set)
+    """
+    result = {
+        "input": input_pdf,
+        "csv_path": None,
+        "pdf_path": None,
+        "outputs": [],
+        "output": "",
+        "error": None,
+        "cpu_time": 0.0,
+        "events": [],
+    }
+    buffer = io.StringIO()
+    cpu_start = time.process_time()
+    try:
+        with redirect_stdout(buffer):
+            if profile:
+                with tracing() as trace:
+                    result["events"] = trace.events
+                    with stage("process_file"):
+                        csv_path, pdf_path = process_race_results(
+                            input_pdf, output_directory=output_directory,
+                            outputs=result["outputs"], **options
+                        )
+            else:
+                csv_path, pdf_path = process_race_results(
+                    input_pdf, output_directory=output_directory, outputs=result["outputs"], **options
+                )
+        result["csv_path"] = csv_path
+        result["pdf_path"] = pdf_path
+    except Exception as e:
+        result["error"] = str(e) or traceback.format_exc()
+    finally:
+        result["cpu_time"] = time.process_time() - cpu_start
+        result["output"] = buffer.getvalue()
+    return result
+
+def run_batch(pdf_files, output_directory, jobs=1, profile=False, **options):
+    """
+    Process several PDF files, optionally on a process pool.
+
+    Results are yielded in the same order as pdf_files, so the caller can
+    print them as soon as the next file in line is done.
+
+    Args:
+        pdf_files (list): Paths to the input PDF files
+        output_directory (str): Directory where output files will be saved
+        jobs (int): Number of worker processes (1 runs everything in-process)
+        profile (bool): Record the timings of the pipeline stages of each file
+        **options: Other arguments of process_race_results
+
+    Yields:
+        dict: One result per file, as returned by process_file_job
+    """
+    jobs = max(1, min(jobs, len(pdf_files)))
+    if jobs == 1:
+        for pdf_file in pdf_files:
+            yield process_file_job(pdf_file, output_directory, profile, **options)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(process_file_job, pdf_file, output_directory, profile, **options)
+            for pdf_file in pdf_files
+        ]
+        for future in futures:
+            yield future.result()
+
+def publish_race_results(input_pdf, output_directory="output", **options):
+    """
+    Process race results like process_race_results, publishing outputs atomically.
+
+    The files are generated in a staging folder inside the output directory
+    and then renamed into place, so readers never see a half-written file.
+    In diff mode, PDF volumes that did not change are not staged: the
+    published ones are left in place. Published volumes that the new index
+    of their report no longer lists are deleted once it is published.
+
+    Args:
+        input_pdf (str): Path to the input PDF file containing race results
+        output_directory (str): Directory where output files will be saved
+        **options: Other arguments of process_race_results
+
+    Returns:
+        tuple: (csv_path or None, pdf_path or None, time.time() when the first
+            output was published)
+    """
+    from csv_to_pdf import remove_stale_volumes, volume_files
+    
+    os.makedirs(output_directory, exist_ok=True)
+    staging_directory = tempfile.mkdtemp(prefix=".staging-", dir=output_directory)
+    try:
+        staged_csv, staged_pdf = process_race_results(
+            input_pdf, staging_directory, previous_directory=output_directory, **options
+        )
+
+        # Publish the CSV first, then PDF volumes if any, and the formatted PDF
+        # (or the index of the volumes) last
+        staged_paths = [staged_csv] + [
+            os.path.join(staging_directory, name)
+            for name in sorted(os.listdir(staging_directory))
+            if os.path.join(staging_directory, name) not in (staged_csv, staged_pdf)
+        ] + [staged_pdf]
+        # Volumes of the reports as published before, by index file
+        replaced_volumes = {
+            path: volume_files(path)
+            for path in (
+                os.path.join(output_directory, os.path.basename(staged_path))
+                for staged_path in staged_paths
+                if staged_path and staged_path.endswith("_index.json")
+            )
+        }
+        published_paths = []
+        first_published_at = None
+        for staged_path in staged_paths:
+            if not staged_path:
+                published_paths.append(None)
+                continue
+            path = os.path.join(output_directory, os.path.basename(staged_path))
+            os.replace(staged_path, path)
+            if first_published_at is None:
+                first_published_at = time.time()
+            published_paths.append(path)
+        for index_path, previous_files in replaced_volumes.items():
+            remove_stale_volumes(index_path, previous_files)
+
+        csv_path, pdf_path = published_paths[0], published_paths[-1]
+        return csv_path, pdf_path, first_published_at
+    finally:
+        shutil.rmtree(staging_directory, ignore_errors=True)
+
+def write_series_standings(series_db, output_directory):
+    """
+    Write the standings of a series store next to the race outputs.
+
+    Args:
+        series_db (str): Path to the SQLite series store
+        output_directory (str): Directory where the standings CSV is saved
+
+    Returns:
+        str: Path to the standings CSV
+    """
+    from series_store import SeriesStore
+    
+    standings_path = os.path.join(output_directory, "series_standings.csv")
+    with SeriesStore(series_db) as store:
+        count = store.write_standings(standings_path)
+        races = len(store.races())
+    print(f"Series standings: {count} athletes over {races} races -> {standings_path}")
+    return standings_path
+
+def watch_folder(directory, output_directory, poll_interval=1.0, debounce=2.0, verbose=False, **options):
+    """
+    Process new or modified PDFs dropped in a folder until interrupted.
+
+    Args:
+        directory (str): Folder to watch
+        output_directory (str): Directory where output files will be saved
+        poll_interval (float): Seconds between two scans of the folder
+        debounce (float): Seconds a file must stay unchanged before processing
+        verbose (bool): Print the output of the processing pipeline
+        **options: Other arguments of process_race_results
+    """
+    watcher = FolderWatcher(directory, debounce=debounce)
+    print(f"Watching {directory} for race results PDFs (press Ctrl+C to stop)...")
+    try:
+        while True:
+            for pdf_file, landed_at in watcher.poll():
+                buffer = io.StringIO()
+                try:
+                    with redirect_stdout(buffer):
+                        csv_path, pdf_path, published_at = publish_race_results(
+                            pdf_file, output_directory, **options
+                        )
+                except Exception as e:
+                    if verbose:
+                        print(buffer.getvalue(), end="")
+                    print(f"Failed: {os.path.basename(pdf_file)} ({e})")
+                    continue
+                
+                if verbose:
+                    print(buffer.getvalue(), end="")
+                outputs = " + ".join(os.path.basename(path) for path in (csv_path, pdf_path) if path)
+                print(
+                    f"Updated: {os.path.basename(pdf_file)} -> {outputs} "
+                    f"({'CSV' if csv_path else 'PDF'} written "
+                    f"{published_at - landed_at:.2f}s after the file landed)"
+                )
+                if options.get("series_db"):
+                    write_series_standings(options["series_db"], output_directory)
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
 def setup_argument_parser():
     """
     Set up command line argument parser.
@@ -59,10 +459,16 @@ def setup_argument_parser():
         formatter_class=argparse.RawTextHelpFormatter
     )
     
-    parser.add_argument(
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument(
         '-i', '--input',
-        help='Input PDF file or directory containing PDF files',
-        required=True
+        help='Input PDF file or directory containing PDF files'
+    )
+    
+    input_group.add_argument(
+        '-w', '--watch',
+        metavar='DIR',
+        help='Keep running and process new or modified PDF files dropped in DIR'
     )
     
     parser.add_argument(
@@ -71,18 +477,194 @@ def setup_argument_parser():
         default='output'
     )
     
-    parser.add_argument(
+    output_group = parser.add_mutually_exclusive_group()
+    output_group.add_argument(
         '--csv-only',
         action='store_true',
         help='Generate only sorted CSV files (skip PDF generation)'
     )
     
+    output_group.add_argument(
+        '--pdf-only',
+        action='store_true',
+        help='Generate only formatted PDF files (skip CSV generation)'
+    )
+    
     parser.add_argument(
         '-v', '--verbose',
         action='store_true',
         help='Print detailed processing information'
     )
     
+    parser.add_argument(
+        '--max-rows-per-volume',
+        type=int,
+        metavar='N',
+        help='Split each formatted PDF in volumes of at most N rows\n'
+             '(<name>_part1.pdf, <name>_part2.pdf, ... listed in <name>_index.json)'
+    )
+    
+    parser.add_argument(
+        '--max-pages-per-volume',
+        type=int,
+        metavar='N',
+        help='Split each formatted PDF in volumes of at most N pages'
+    )
+    
+    parser.add_argument(
+        '--rankings',
+        action='store_true',
+        help='Add sex and category positions as extra columns (sex_pos, cat, cat_pos)'
+    )
+    
+    parser.add_argument(
+        '--categories',
+        metavar='BANDS',
+        help='Year-of-birth category bands, within each sex (implies --rankings),\n'
+             'e.g. "1940-1959,1960-1979,1980-" or "VET=-1969,SEN=1970-1989,JUN=1990-"'
+    )
+    
+    parser.add_argument(
+        '--category-files',
+        action='store_true',
+        help='Also write a CSV and formatted PDF for each category'
+    )
+    
+    parser.add_argument(
+        '--series',
+        metavar='DB',
+        help='Add the results to the SQLite series store DB (created if missing)\n'
+             'and write the season standings to <output>/series_standings.csv'
+    )
+    
+    parser.add_argument(
+        '--top',
+        type=int,
+        metavar='N',
+        help='Only keep the first N athletes of each ranking (e.g. 3 for the podium):\n'
+             'the overall one and, with --categories, each category'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Number of PDF files to process in parallel (default: CPU count)'
+    )
+    
+    parser.add_argument(
+        '--format',
+        dest='output_format',
+        choices=list(OUTPUT_FORMATS),
+        default='csv',
+        help='Format of the sorted results file (default: csv). jsonl, parquet and\n'
+             'feather use a typed schema; parquet and feather need pyarrow.'
+    )
+    
+    parser.add_argument(
+        '--compact-pdf',
+        action='store_true',
+        help='Write smaller formatted PDFs that look the same: only the characters\n'
+             'used are embedded and the table borders are drawn once per page'
+    )
+    
+    parser.add_argument(
+        '--diff',
+        action='store_true',
+        help='Compare with the outputs of the previous run on the same file: write\n'
+             'the added, removed, retimed, edited and reranked athletes (by bib) to\n'
+             '<name>_changes.json and only render again the PDF volumes that changed.\n'
+             f'Formatted PDFs are split in volumes of {DIFF_PAGES_PER_VOLUME} pages unless a volume size is given.'
+    )
+    
+    parser.add_argument(
+        '--engine',
+        choices=list(ENGINES),
+        default=DEFAULT_ENGINE,
+        help=f'Text extraction engine (default: {DEFAULT_ENGINE}). pdfium is much\n'
+             'faster and produces the same results on Endu-style PDFs.'
+    )
+    
+    parser.add_argument(
+        '--layout',
+        action='store_true',
+        help='Read the participants from the columns of the results table, found\n'
+             'from its header row, instead of guessing the fields of each line of\n'
+             'text. Handles blank cells and names printed against the birth year.\n'
+             'The header needs bib, athlete and time columns, matched by label in any\n'
+             'order (e.g. Pett/Pettorale, Atleta/Cognome Nome, Tempo/Real Time).\n'
+             'Only tested on synthetic PDFs (benchmarks/bench_layout.py).'
+    )
+    
+    parser.add_argument(
+        '--page-jobs',
+        type=int,
+        default=1,
+        help='Number of processes extracting the pages of each PDF (default: 1).\n'
+             'Useful for very large result files.'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        help='Directory of the cache of extracted results, so unchanged PDFs\n'
+             'are never parsed twice (default: <output>/.cache)'
+    )
+    
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help='Size limit of the cache in MB; least recently used entries are\n'
+             f'removed first (default: {DEFAULT_MAX_BYTES // (1024 * 1024)})'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always extract results from the PDFs, without using the cache'
+    )
+    
+    parser.add_argument(
+        '--checkpoint',
+        action='store_true',
+        help='Journal extracted pages and completed files, so that a rerun after\n'
+             'a crash skips the files already done and resumes the others'
+    )
+    
+    parser.add_argument(
+        '--checkpoint-dir',
+        help='Directory of the checkpoint journals (default: <output>/.checkpoints)'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        metavar='FILE',
+        help='Write the timings of every pipeline stage (PDF opening, text\n'
+             'extraction per page, parsing, sorting, CSV and PDF writing) as JSON'
+    )
+    
+    parser.add_argument(
+        '--cprofile',
+        metavar='FILE',
+        help='Run a single input file under cProfile and save the statistics\n'
+             '(view them with: python -m pstats FILE)'
+    )
+    
+    parser.add_argument(
+        '--poll-interval',
+        type=float,
+        default=1.0,
+        help='Seconds between two scans of the watched folder (default: 1.0)'
+    )
+    
+    parser.add_argument(
+        '--debounce',
+        type=float,
+        default=2.0,
+        help='Seconds a watched file must stay unchanged before it is processed\n'
+             '(default: 2.0)'
+    )
+    
     return parser
 
 def main():
@@ -99,17 +681,139 @@ def main():
         # Generate only CSV files:
         python main.py -i race_results.pdf --csv-only
         
+        # Generate only formatted PDF files:
+        python main.py -i race_results.pdf --pdf-only
+        
         # Show detailed processing information:
         python main.py -i race_results.pdf -v
+        
+        # Split formatted PDFs in volumes of at most 20 pages:
+        python main.py -i race_results.pdf --max-pages-per-volume 20
+        
+        # Republish a corrected PDF, rendering again only the pages that changed:
+        python main.py -i race_results.pdf --diff
+        
+        # Write smaller formatted PDFs, e.g. to send category reports to phones:
+        python main.py -i race_results.pdf --category-files --compact-pdf
+        
+        # Add sex and age category standings, with a file per category:
+        python main.py -i race_results.pdf --categories "1940-1959,1960-1979,1980-" --category-files
+        
+        # Add the results to the season standings of a race series:
+        python main.py -i input_folder --series series.db
+        
+        # Only keep the podium:
+        python main.py -i race_results.pdf --top 3
+        
+        # Process a directory using 4 worker processes:
+        python main.py -i input_folder -j 4
+        
+        # Extract the page text with the faster PDFium engine:
+        python main.py -i input_folder --engine pdfium
+        
+        # Read the fields from the columns of the results table:
+        python main.py -i input_folder --layout --engine pdfium
+        
+        # Write the sorted results as typed JSON lines instead of CSV:
+        python main.py -i input_folder --format jsonl
+        
+        # Split the pages of a very large PDF across 8 processes:
+        python main.py -i marathon.pdf --page-jobs 8
+        
+        # Re-extract every PDF, ignoring previously cached results:
+        python main.py -i input_folder --no-cache
+        
+        # Find out which stage of the pipeline is slow:
+        python main.py -i input_folder --profile profile.json
+        
+        # Process results PDFs as they are dropped in a shared folder:
+        python main.py --watch shared_folder -o output_folder
     """
     # Parse command line arguments
     parser = setup_argument_parser()
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.page_jobs < 1:
+        parser.error("--page-jobs must be at least 1")
+    if args.cache_size < 0:
+        parser.error("--cache-size must not be negative")
+    for option in ("max_rows_per_volume", "max_pages_per_volume"):
+        if getattr(args, option) is not None and getattr(args, option) < 1:
+            parser.error(f"--{option.replace('_', '-')} must be at least 1")
+    category_bands = None
+    if args.categories or args.rankings or args.category_files:
+        from ranking import parse_category_bands
+        
+        try:
+            category_bands = parse_category_bands(args.categories or "")
+        except ValueError as e:
+            parser.error(str(e))
+    if args.top is not None and args.top < 1:
+        parser.error("--top must be at least 1")
+    if args.poll_interval <= 0:
+        parser.error("--poll-interval must be positive")
+    if args.debounce < 0:
+        parser.error("--debounce must not be negative")
+    if args.watch and (args.profile or args.cprofile):
+        parser.error("--profile and --cprofile cannot be used with --watch")
+    if args.cprofile and not os.path.isfile(args.input):
+        parser.error("--cprofile needs a single input PDF file")
+    if args.diff and (args.pdf_only or args.output_format != "csv"):
+        parser.error("--diff compares with the sorted CSV of the previous run: it needs CSV output")
+    if args.output_format in ("parquet", "feather"):
+        import importlib.util
+        
+        if importlib.util.find_spec("pyarrow") is None:
+            parser.error(f"--format {args.output_format} needs pyarrow: pip install pyarrow")
     
     try:
         # Create output directory
         os.makedirs(args.output, exist_ok=True)
         
+        if args.no_cache:
+            cache_dir = None
+        else:
+            cache_dir = args.cache_dir or os.path.join(args.output, ".cache")
+        
+        checkpoint_dir = None
+        if args.checkpoint:
+            checkpoint_dir = args.checkpoint_dir or os.path.join(args.output, ".checkpoints")
+        
+        # Options of process_race_results shared by every file
+        options = dict(
+            generate_final_pdf=not args.csv_only,
+            generate_csv=not args.pdf_only,
+            page_jobs=args.page_jobs,
+            cache_dir=cache_dir,
+            cache_max_bytes=args.cache_size * 1024 * 1024,
+            top=args.top,
+            max_rows_per_volume=args.max_rows_per_volume,
+            max_pages_per_volume=args.max_pages_per_volume,
+            category_bands=category_bands,
+            category_files=args.category_files,
+            series_db=args.series,
+            engine=args.engine,
+            output_format=args.output_format,
+            checkpoint_dir=checkpoint_dir,
+            compact_pdf=args.compact_pdf,
+            diff=args.diff,
+            layout=args.layout
+        )
+        
+        if args.watch:
+            if not os.path.isdir(args.watch):
+                raise ValueError("Watched path must be a directory")
+            watch_folder(
+                args.watch,
+                args.output,
+                poll_interval=args.poll_interval,
+                debounce=args.debounce,
+                verbose=args.verbose,
+                **options
+            )
+            return
+        
         # Determine input files
         if os.path.isfile(args.input):
             # Single file processing
@@ -121,7 +825,7 @@ def main():
             # Directory processing
             pdf_files = [
                 os.path.join(args.input, f) 
-                for f in os.listdir(args.input) 
+                for f in sorted(os.listdir(args.input)) 
                 if f.endswith('.pdf')
             ]
             if not pdf_files:
@@ -129,27 +833,113 @@ def main():
         else:
             raise ValueError("Input path does not exist")
         
-        # Process each PDF file
-        for pdf_file in pdf_files:
+        # Skip the files a previous checkpointed run already completed
+        completed_journal = None
+        skipped_files = []
+        if checkpoint_dir:
+            completed_journal = CompletedJournal(checkpoint_dir)
+            output_options = {
+                option: value for option, value in options.items()
+                if option not in RESUME_IGNORED_OPTIONS
+            }
+            completed_keys = {
+                pdf_file: completed_journal.key(pdf_file, output_options)
+                for pdf_file in pdf_files
+            }
+            skipped_files = [
+                pdf_file for pdf_file in pdf_files
+                if completed_journal.completed(completed_keys[pdf_file]) is not None
+            ]
+            if skipped_files:
+                print(f"Skipping {len(skipped_files)} file(s) completed by a previous run")
+                pdf_files = [pdf_file for pdf_file in pdf_files if pdf_file not in skipped_files]
+        
+        profiler = None
+        if args.cprofile:
+            import cProfile
+            
+            # A single file runs in this process, where the profiler can see it
+            profiler = cProfile.Profile()
+            profiler.enable()
+        
+        # Process each PDF file, reporting results in input order
+        wall_start = time.perf_counter()
+        total_cpu_time = 0.0
+        failed_files = []
+        profiled_files = []
+        for result in run_batch(
+            pdf_files,
+            output_directory=args.output,
+            jobs=args.jobs,
+            profile=bool(args.profile),
+            **options
+        ):
+            pdf_file = result["input"]
+            total_cpu_time += result["cpu_time"]
+            if args.profile:
+                profiled_files.append({
+                    "input": pdf_file,
+                    "error": result["error"],
+                    "cpu_time": result["cpu_time"],
+                    "events": result["events"],
+                })
+            
             if args.verbose:
                 print(f"\nProcessing: {pdf_file}")
                 print("-" * 50)
+            print(result["output"], end="")
             
-            csv_path, pdf_path = process_race_results(
-                pdf_file,
-                output_directory=args.output,
-                generate_final_pdf=not args.csv_only
-            )
+            if result["error"] is not None:
+                failed_files.append(pdf_file)
+                print(f"Failed: {os.path.basename(pdf_file)} ({result['error']})")
+                continue
+            if completed_journal is not None:
+                completed_journal.record(
+                    completed_keys[pdf_file],
+                    pdf_file,
+                    result["outputs"]
+                )
             
             if args.verbose:
                 print("\nProcessing completed!")
                 print(f"- Input PDF: {pdf_file}")
-                print(f"- Generated CSV: {csv_path}")
-                if pdf_path:
-                    print(f"- Generated PDF: {pdf_path}")
+                if result["csv_path"]:
+                    print(f"- Generated CSV: {result['csv_path']}")
+                if result["pdf_path"]:
+                    print(f"- Generated PDF: {result['pdf_path']}")
                 print("-" * 50)
             else:
                 print(f"Processed: {os.path.basename(pdf_file)}")
+        wall_time = time.perf_counter() - wall_start
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+            print(f"cProfile statistics saved: {args.cprofile}")
+        if args.profile:
+            write_profile(
+                args.profile,
+                wall_start,
+                profiled_files,
+                argv=sys.argv[1:],
+                jobs=min(args.jobs, len(pdf_files)),
+                wall_time=wall_time,
+                cpu_time=total_cpu_time,
+            )
+            print(f"Profile saved: {args.profile}")
+        
+        print(
+            f"\nProcessed {len(pdf_files) - len(failed_files)}/{len(pdf_files)} files "
+            f"in {wall_time:.2f}s wall-clock, {total_cpu_time:.2f}s CPU "
+            f"({total_cpu_time / wall_time if wall_time else 0:.1f}x, "
+            f"{min(args.jobs, len(pdf_files))} jobs)"
+        )
+        if args.series:
+            write_series_standings(args.series, args.output)
+        if failed_files:
+            print(f"{len(failed_files)} file(s) failed:")
+            for pdf_file in failed_files:
+                print(f"- {pdf_file}")
+            exit(1)
         
         print("\nAll files processed successfully!")
         
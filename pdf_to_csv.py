@@ -1,170 +1,498 @@
-import pdfplumber
 import csv
-import re
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from checkpoint import PageJournal
+from extraction_cache import file_digest
+from extraction_engines import DEFAULT_ENGINE, get_engine
+from layout_parser import TableRowParser, check_table, find_header_row, table_body
+from line_parser import ParticipantLineParser
+from profiling import merge, profiled_call, profiling_enabled, stage
+from race_time import rank_by_time
+from ranking import RANKING_COLUMNS, add_rankings, top_standings
+from result_formats import write_typed_results
 
+# Version of the extraction and parsing logic. Bump it whenever the records
+# produced for the same PDF change, so cached records are not reused.
+PARSER_VERSION = "2"
 
-def pdf_to_csv(pdf_path, csv_path):
+# Columns of the sorted results, as written to the CSV
+CSV_COLUMNS = ["pos", "pett", "athlete", "year", "sex", "team", "nat", "time"]
+
+# Number of page ranges handed to each worker when extraction is sharded.
+# More, smaller ranges keep workers busy when some pages are slower than others.
+SHARDS_PER_WORKER = 4
+
+
+def pdf_to_csv(pdf_path, csv_path, workers=1, cache=None, top=None, category_bands=None,
+               engine=DEFAULT_ENGINE, output_format="csv", checkpoint_dir=None, layout=False):
     """
-    Convert a race results PDF to a sorted CSV file.
+    Convert a race results PDF to a sorted CSV file, or another output format.
 
     Args:
         pdf_path (str): Path to the input PDF file
         csv_path (str): Path where the sorted CSV will be saved
+        workers (int, optional): Number of processes used to extract page text.
+            Pages are split in contiguous ranges and merged back in page order,
+            so the CSV is the same as with a single process. Defaults to 1.
+        cache (ExtractionCache, optional): Cache of extracted records. On a
+            hit the PDF is not opened at all. Defaults to None (no cache).
+        top (int, optional): Only write the first top participants, e.g. the
+            podium. Category standings are computed on all the participants
+            first. Defaults to None (all participants).
+        category_bands (list, optional): Year-of-birth category bands, as
+            returned by ranking.parse_category_bands. When given, sex and
+            category standings are added as extra columns. Defaults to None.
+        engine (str, optional): Text extraction engine, one of
+            extraction_engines.ENGINES. Defaults to DEFAULT_ENGINE.
+        output_format (str, optional): Format of the file written to csv_path,
+            one of result_formats.OUTPUT_FORMATS. Defaults to "csv".
+        checkpoint_dir (str, optional): Directory of the page journals used to
+            resume an interrupted extraction (see extract_results). Defaults
+            to None (no journal).
+        layout (bool, optional): Read the participants from the columns of
+            the results table (see iter_participant_lines). Defaults to False.
+
+    Returns:
+        dict: Competition metadata read from the page headers and footers
+    """
+    rows, competition_metadata = extract_results(
+        pdf_path, workers, cache, top if category_bands is None else None, engine,
+        checkpoint_dir=checkpoint_dir, layout=layout
+    )
+    columns = CSV_COLUMNS
+    if category_bands is not None:
+        rows, categories = add_rankings(rows, category_bands)
+        if top is not None:
+            rows, _ = top_standings(rows, categories, top)
+        columns = CSV_COLUMNS + RANKING_COLUMNS
+    write_results(rows, csv_path, columns, output_format, competition_metadata)
+    return competition_metadata
+
+
+def extract_results(pdf_path, workers=1, cache=None, top=None, engine=DEFAULT_ENGINE,
+                    progress=None, checkpoint_dir=None, layout=False):
     """
-    participants_data = []
-    participants_list = []
-
-    # Open PDF file and read its content
-    with pdfplumber.open(pdf_path) as pdf:
-        # Loop through each page in the PDF
-        for page in pdf.pages:
-            # Extract text from the page and split by line
-            text = page.extract_text()
-            if text:
-                lines = text.split("\n")
-
-                # Parse header information on the first page
-                if page.page_number == 1:
-                    competition_title = text[0]
-                    competition_sponsor_info = text[1]
-                    competition_date = text[2]
-                    competition_type = text[3]
-                    competition_header_data = text[5]
-
-                competition_timekeeping_info = text[-3]
-                competition_site = text[-2]
-
-                if page.page_number == 1:
-                    participants_data.extend(lines[6:-3])
-                else:
-                    participants_data.extend(lines[2:-3])
-
-    # Extract participants data
-    i = 0
-    while i < len(participants_data):
-        if participants_data[i] != "":
-            # Split the participant's line data
-            data = participants_data[i].split(" ")
-
-            # Search for bad formatted data
-            formatted_data = []
-            for item in data:
-                # Check if the element contains both letters and numbers
-                match = re.match(r"([A-Za-zÀ-ÿá-úà-ùè-éî-ôù]+)(\d+)", item)
-                if match:
-                    name = match.group(1)
-                    year = match.group(2)
-                    formatted_data.append(name)
-                    formatted_data.append(year)
-                else:
-                    formatted_data.append(item)
-            data = formatted_data
-
-            # Check if the data is complete (contains all required fields)
-            if len(data) >= 5:
-                # Extract participant data
-                bib_number = data[0]
-                race_time = data[-1]
-                nationality = data[-2]
-                sex = ""
-                team = ""
-                year = ""
-
-                # Extract sex, team and year
-                year_idx = next(
-                    (
-                        i
-                        for i, w in enumerate(data[1:])
-                        if re.match(r"^\d{4}$", w) or w.lower() == "null"
-                    ),
-                    None,
-                )
-
-                if year_idx is not None:
-                    year = data[1:][year_idx]
-                    if data[1:][year_idx + 1] == "M" or data[1:][year_idx + 1] == "F":
-                        sex = data[1:][year_idx + 1]
-                    athlete_name = " ".join(data[1:][:year_idx])
-                    team = " ".join(data[1:][year_idx + 2 : -2])
-                else:
-                    year = "null"
-                    sex = data[1:][-3]
-                    athlete_name = " ".join(data[1:][1:-3])
-                    team = ""
-
-                # Check if next line continues the athlete name
-                while (
-                    i + 1 < len(participants_data)
-                    and len(participants_data[i + 1].split()) < 5
-                ):
-                    next_line = participants_data[i + 1].strip()
-                    athlete_name += " " + next_line
-                    i += 1
-
-                participants_list.append(
-                    [
-                        bib_number,
-                        athlete_name.strip(),
-                        year,
-                        sex,
-                        team,
-                        nationality,
-                        race_time,
-                    ]
-                )
-                i += 1
-
-    # Assemble competition metadata
-    competition_metadata = {
-        "title": competition_title,
-        "sponsor": competition_sponsor_info,
-        "date": competition_date,
-        "type": competition_type,
-        "header_data": competition_header_data,
-        "timekeeping_info": competition_timekeeping_info,
-        "site": competition_site,
-    }
+    Extract the sorted race results of a PDF, in memory.
+
+    Args:
+        pdf_path (str): Path to the input PDF file
+        workers (int, optional): Number of processes used to extract page text.
+            Defaults to 1.
+        cache (ExtractionCache, optional): Cache of extracted records. On a
+            hit the PDF is not opened at all. Defaults to None (no cache).
+        top (int, optional): Only keep the first top participants, e.g. the
+            podium. Defaults to None (all participants).
+        engine (str, optional): Text extraction engine. Defaults to
+            DEFAULT_ENGINE.
+        progress (callable, optional): Called as progress(page_number,
+            page_count) after each page is extracted; not called on a cache
+            hit. Defaults to None.
+        checkpoint_dir (str, optional): Directory of page journals. Each
+            extracted page is journaled as soon as it is done, and an
+            extraction interrupted by a crash resumes after the last
+            journaled page of the same PDF. The journal is removed once the
+            extraction completes. Defaults to None (no journal).
+        layout (bool, optional): Read the participants from the columns of
+            the results table instead of the page text (see
+            iter_participant_lines). Defaults to False.
+
+    Returns:
+        tuple: (rows, metadata) where rows are [pos, bib, athlete, year, sex,
+            team, nat, time] lists sorted by race time, matching CSV_COLUMNS,
+            and metadata is the competition metadata dict
+    """
+    cached = None
+    if cache is not None:
+        with stage("cache_lookup") as cache_stage:
+            cache_key = cache.key(pdf_path, extraction_version(engine, layout))
+            cached = cache.get(cache_key)
+            cache_stage.set(hit=cached is not None)
+
+    if cached is not None:
+        participants_list, competition_metadata = cached
+    else:
+        journal = None
+        if checkpoint_dir is not None:
+            if cache is None:
+                cache_key = file_digest(pdf_path, f"{extraction_version(engine, layout)}\0".encode("utf-8"))
+            journal = PageJournal(checkpoint_dir, cache_key)
+        competition_metadata = {}
+        try:
+            participants_list = list(iter_participants(
+                pdf_path, competition_metadata, workers, engine, progress, journal, layout
+            ))
+        finally:
+            if journal is not None:
+                journal.close()
+        if journal is not None:
+            journal.remove()
+        if cache is not None:
+            with stage("cache_store", rows=len(participants_list)):
+                cache.put(cache_key, participants_list, competition_metadata)
 
     # Sort participants list by race time
-    participants_list.sort(key=lambda x: parse_race_time(x[6]))
+    with stage("sort", rows=len(participants_list)):
+        participants_list = rank_by_time(participants_list, 6, top)
+
+    # Add the position column
+    rows = [
+        [position] + participant
+        for position, participant in enumerate(participants_list, 1)
+    ]
+    return rows, competition_metadata
+
 
-    # Write sorted data to CSV file
-    with open(csv_path, mode="w", newline="", encoding="utf-8") as csv_file:
+def write_csv(rows, csv_path, columns=CSV_COLUMNS):
+    """
+    Write sorted race results to a CSV file.
+
+    Args:
+        rows (list): Rows matching columns, as returned by extract_results
+        csv_path (str): Path where the CSV will be saved
+        columns (list, optional): Column names. Defaults to CSV_COLUMNS.
+    """
+    with stage("write_csv", rows=len(rows)), \
+            open(csv_path, mode="w", newline="", encoding="utf-8") as csv_file:
         writer = csv.writer(csv_file)
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+
+def write_results(rows, path, columns=CSV_COLUMNS, output_format="csv", metadata=None):
+    """
+    Write sorted race results as CSV or as a typed format.
+
+    Args:
+        rows (list): Rows matching columns, as returned by extract_results
+        path (str): Path of the file to write
+        columns (list, optional): Column names. Defaults to CSV_COLUMNS.
+        output_format (str, optional): One of result_formats.OUTPUT_FORMATS.
+            Defaults to "csv".
+        metadata (dict, optional): Competition metadata, stored with the typed
+            formats (see result_formats.write_typed_results). Defaults to None.
+
+    Returns:
+        list: Paths of the files written
+    """
+    if output_format == "csv":
+        write_csv(rows, path, columns)
+        return [path]
+    with stage("write_" + output_format, rows=len(rows)):
+        return write_typed_results(rows, path, columns, output_format, metadata)
+
+
+def iter_participants(pdf_path, metadata=None, workers=1, engine=DEFAULT_ENGINE, progress=None,
+                      journal=None, layout=False):
+    """
+    Yield the participant records of a race results PDF, page by page.
+
+    Only the current page's lines and the record being assembled are kept in
+    memory, so memory use does not grow with the size of the PDF.
+
+    Args:
+        pdf_path (str): Path to the input PDF file
+        metadata (dict, optional): Filled with the competition metadata read
+            from the page headers and footers. Complete once the generator is
+            exhausted.
+        workers (int, optional): Number of processes used to extract page text.
+            Defaults to 1.
+        engine (str, optional): Text extraction engine. Defaults to
+            DEFAULT_ENGINE.
+        progress (callable, optional): Called as progress(page_number,
+            page_count) after each page is extracted. Defaults to None.
+        journal (PageJournal, optional): Journal of the extracted pages (see
+            iter_participant_lines). Defaults to None.
+        layout (bool, optional): Read the participants from the columns of
+            the results table (see iter_participant_lines). Defaults to False.
+
+    Yields:
+        list: [bib, athlete, year, sex, team, nat, time] in document order
+    """
+    parser = TableRowParser() if layout else ParticipantLineParser()
+    for lines in iter_participant_lines(
+        pdf_path, metadata, workers, engine, progress, journal, layout
+    ):
+        with stage("parse_lines", lines=len(lines)) as parse_stage:
+            participants = list(parser.feed(lines))
+            parse_stage.set(rows=len(participants))
+        yield from participants
+
+    participant = parser.close()
+    if participant is not None:
+        yield participant
+
+
+def iter_participant_lines(pdf_path, metadata=None, workers=1, engine=DEFAULT_ENGINE,
+                           progress=None, journal=None, layout=False):
+    """
+    Yield the participant lines of each page, without headers and footers.
+
+    With layout, pages are cropped to the body of the results table and each
+    line is split in the columns of the table, detected once per document
+    from the header row of the first page: lines are then lists of cells.
+
+    Args:
+        pdf_path (str): Path to the input PDF file
+        metadata (dict, optional): Filled with the competition metadata read
+            from the page headers and footers
+        workers (int, optional): Number of processes used to extract page text.
+            Defaults to 1.
+        engine (str, optional): Text extraction engine. Defaults to
+            DEFAULT_ENGINE.
+        progress (callable, optional): Called as progress(page_number,
+            page_count) after each page is extracted. Defaults to None.
+        journal (PageJournal, optional): Journal of the extracted pages. The
+            pages journaled by a previous run are replayed instead of being
+            extracted again, and every newly extracted page is appended.
+            Defaults to None.
+        layout (bool, optional): Split the lines in the columns of the
+            results table, using the position of their characters. Defaults
+            to False.
+
+    Yields:
+        list: Participant lines of one page, in page order, or the cells of
+            its table rows with layout
+
+    Raises:
+        ValueError: With layout, if the first page has no table header row or
+            its participants are not laid out in columns under it
+    """
+    if metadata is None:
+        metadata = {}
+
+    start = 0
+    if journal is not None:
+        for page_number, lines, page_metadata in journal.replay():
+            metadata.update(page_metadata)
+            start = page_number
+            if lines is not None:
+                yield lines
+
+    table_layout = None
+    for page in iter_page_texts(pdf_path, workers, engine, progress, start, layout):
+        page_number, text = page[0], page[1]
+        # Split the page text by line
+        lines = None
+        if text:
+            lines = text.split("\n")
+
+            # Parse header information on the first page
+            if page_number == 1:
+                metadata["title"] = lines[0]
+                metadata["sponsor"] = lines[1]
+                metadata["date"] = lines[2]
+                metadata["type"] = lines[3]
+                metadata["header_data"] = lines[5]
+
+            metadata["timekeeping_info"] = lines[-3]
+            metadata["site"] = lines[-2]
 
-        # Write header row with position column
-        writer.writerow(
-            [
-                "pos",
-                "pett",
-                "athlete",
-                "year",
-                "sex",
-                "team",
-                "nat",
-                "time",
-            ]
+            if layout:
+                if table_layout is None:
+                    table_layout = table_columns(pdf_path, engine, page)
+                with stage("table_body", page=page_number):
+                    lines = table_body(page[2], table_layout)
+                if page_number == 1:
+                    check_table(lines)
+            elif page_number == 1:
+                lines = lines[6:-3]
+            else:
+                lines = lines[2:-3]
+
+        if journal is not None:
+            journal.append(page_number, lines, metadata)
+        if lines is not None:
+            yield lines
+
+
+def table_columns(pdf_path, engine, page):
+    """
+    Detect the columns of the results table from the header row of the
+    first page of a PDF.
+
+    Args:
+        pdf_path (str): Path to the input PDF file
+        engine (str): Text extraction engine
+        page (tuple): (page_number, text, lines) of the first page extracted,
+            which is read again from the PDF unless it is the first page
+
+    Returns:
+        tuple: (starts, fields) of the columns, as returned by
+            layout_parser.find_header_row
+
+    Raises:
+        ValueError: If the first page has no header row
+    """
+    if page[0] != 1:
+        page = next(iter_page_range(pdf_path, 0, 1, engine, layout=True))
+    header = find_header_row(page[2])
+    if header is None:
+        raise ValueError(
+            f"No results table header (with bib, athlete and time columns) on the first page of {pdf_path}"
         )
+    return header[1]
 
-        # Write sorted data with positions
-        for position, participant in enumerate(participants_list, 1):
-            writer.writerow([position] + participant)
 
-    return competition_metadata
+def extraction_version(engine, layout=False):
+    """
+    Version of the records extracted from a PDF, keying cached records and
+    page journals.
+
+    Args:
+        engine (str): Text extraction engine
+        layout (bool, optional): Whether records are read from the table
+            columns. Defaults to False.
+
+    Returns:
+        str: e.g. "2:pdfium" or "2:pdfium:layout"
+    """
+    version = f"{PARSER_VERSION}:{engine}"
+    return version + ":layout" if layout else version
+
+
+def iter_page_texts(pdf_path, workers=1, engine=DEFAULT_ENGINE, progress=None, start=0,
+                    layout=False):
+    """
+    Yield the extracted text of every page of a PDF, in page order.
+
+    Args:
+        pdf_path (str): Path to the input PDF file
+        workers (int, optional): Number of processes used for extraction.
+            With more than one worker, each process opens the PDF on its own
+            and extracts a contiguous range of pages. Defaults to 1.
+        engine (str, optional): Text extraction engine. Defaults to
+            DEFAULT_ENGINE.
+        progress (callable, optional): Called as progress(page_number,
+            page_count) after each page is extracted. An exception it raises
+            stops the extraction. Defaults to None.
+        start (int, optional): Index of the first page to extract (0-based),
+            e.g. to resume an interrupted extraction. Defaults to 0.
+        layout (bool, optional): Also yield the lines of each page with the
+            position of their characters. Defaults to False.
+
+    Yields:
+        tuple: (page_number, text) with 1-based page numbers; text may be None
+            for pages without text. With layout, (page_number, text, lines)
+            as yielded by the iter_page_lines method of the engine.
+    """
+    page_count = None
+    if workers > 1 or progress is not None:
+        page_count = get_engine(engine).page_count(pdf_path)
+
+    ranges = []
+    if workers > 1 and page_count > start:
+        ranges = [
+            (start + range_start, start + range_stop)
+            for range_start, range_stop in split_page_range(
+                page_count - start, workers * SHARDS_PER_WORKER
+            )
+        ]
+    if len(ranges) > 1:
+        pages = iter_sharded_pages(pdf_path, ranges, workers, engine, layout)
+    else:
+        pages = iter_page_range(pdf_path, start, None, engine, layout)
 
+    for page in pages:
+        if progress is not None:
+            progress(page[0], page_count)
+        yield page
 
-def parse_race_time(time_str):
+
+def iter_sharded_pages(pdf_path, ranges, workers, engine=DEFAULT_ENGINE, layout=False):
+    """
+    Extract ranges of pages on a process pool, yielding them in page order.
+
+    Args:
+        pdf_path (str): Path to the input PDF file
+        ranges (list): (start, stop) page ranges, as returned by split_page_range
+        workers (int): Number of worker processes
+        engine (str, optional): Text extraction engine. Defaults to
+            DEFAULT_ENGINE.
+        layout (bool, optional): Also yield the lines of each page with the
+            position of their characters. Defaults to False.
+
+    Yields:
+        tuple: (page_number, text) with 1-based page numbers, or
+            (page_number, text, lines) with layout
+    """
+    profiled = profiling_enabled()
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+        futures = [
+            executor.submit(profiled_call, extract_page_range, pdf_path, start, stop, engine, layout)
+            if profiled
+            else executor.submit(extract_page_range, pdf_path, start, stop, engine, layout)
+            for start, stop in ranges
+        ]
+        # Results are consumed in submission order, i.e. page order
+        for future in futures:
+            if profiled:
+                pages, events = future.result()
+                merge(events)
+                yield from pages
+            else:
+                yield from future.result()
+
+
+def iter_page_range(pdf_path, start, stop, engine=DEFAULT_ENGINE, layout=False):
     """
-    Parse a race time string into a datetime object for comparison.
+    Yield the text of a contiguous range of pages, one page at a time.
 
     Args:
-        time_str (str): Race time in format "HH:MM:SS"
+        pdf_path (str): Path to the input PDF file
+        start (int): Index of the first page (0-based)
+        stop (int): Index after the last page, or None for the end of the file
+        engine (str, optional): Text extraction engine. Defaults to
+            DEFAULT_ENGINE.
+        layout (bool, optional): Also yield the lines of each page with the
+            position of their characters. Defaults to False.
+
+    Yields:
+        tuple: (page_number, text) with 1-based page numbers, or
+            (page_number, text, lines) with layout
+    """
+    if layout:
+        yield from get_engine(engine).iter_page_lines(pdf_path, start, stop)
+    else:
+        yield from get_engine(engine).iter_pages(pdf_path, start, stop)
+
+
+def extract_page_range(pdf_path, start, stop, engine=DEFAULT_ENGINE, layout=False):
+    """
+    Extract the text of a contiguous range of pages.
+
+    Args:
+        pdf_path (str): Path to the input PDF file
+        start (int): Index of the first page (0-based)
+        stop (int): Index after the last page, or None for the end of the file
+        engine (str, optional): Text extraction engine. Defaults to
+            DEFAULT_ENGINE.
+        layout (bool, optional): Also yield the lines of each page with the
+            position of their characters. Defaults to False.
 
     Returns:
-        datetime: Parsed time or datetime.max for invalid times
+        list: (page_number, text) tuples with 1-based page numbers, or
+            (page_number, text, lines) tuples with layout
+    """
+    return list(iter_page_range(pdf_path, start, stop, engine, layout))
+
+
+def split_page_range(page_count, shards):
     """
-    try:
-        return datetime.strptime(time_str, "%H:%M:%S")
-    except ValueError:
-        return datetime.max  # Return maximum datetime for invalid/missing times
+    Split page indexes into contiguous ranges of (almost) equal size.
+
+    Args:
+        page_count (int): Number of pages in the document
+        shards (int): Maximum number of ranges
+
+    Returns:
+        list: (start, stop) tuples covering range(page_count) in order
+    """
+    shards = max(1, min(shards, page_count))
+    size, extra = divmod(page_count, shards)
+    ranges = []
+    start = 0
+    for shard in range(shards):
+        stop = start + size + (1 if shard < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
@@ -0,0 +1,197 @@
+import json
+import time
+from contextlib import contextmanager
+
+# Version of the profile JSON layout, bumped whenever it changes
+PROFILE_VERSION = 1
+
+# Trace receiving the stages of the running pipeline, or None when profiling
+# is disabled. Stages then cost a global lookup and a function call.
+_trace = None
+
+
+class Trace:
+    """
+    Timings of the stages run while a trace is active.
+
+    Events are kept as (name, start, duration, fields) tuples, with start as
+    an absolute time.perf_counter() value. On Linux that clock is shared by
+    every process of the machine, so events recorded by worker processes can
+    be merged into the trace of the parent.
+    """
+
+    def __init__(self):
+        self.events = []
+
+
+class Stage:
+    """Context manager timing one stage into a trace."""
+
+    __slots__ = ("trace", "name", "fields", "start")
+
+    def __init__(self, trace, name, fields):
+        self.trace = trace
+        self.name = name
+        self.fields = fields
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        self.trace.events.append((self.name, self.start, duration, self.fields))
+        return False
+
+    def set(self, **fields):
+        """Attach counts or other values to the stage, e.g. rows=1200."""
+        self.fields.update(fields)
+
+
+class NullStage:
+    """Stage returned while profiling is disabled: does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+NULL_STAGE = NullStage()
+
+
+def stage(name, **fields):
+    """
+    Time a stage of the pipeline, if profiling is enabled.
+
+    Example:
+        with stage("write_csv", rows=len(rows)):
+            write_csv(rows, csv_path)
+
+    Args:
+        name (str): Name of the stage, shared by every run of the stage
+        **fields: Values recorded with the timing, e.g. page=3 or rows=1200
+
+    Returns:
+        Stage: Context manager; its set() method adds fields from inside
+    """
+    if _trace is None:
+        return NULL_STAGE
+    return Stage(_trace, name, fields)
+
+
+def profiling_enabled():
+    """Return whether a trace is active."""
+    return _trace is not None
+
+
+@contextmanager
+def tracing():
+    """
+    Record the stages run inside the block.
+
+    Yields:
+        Trace: The active trace
+    """
+    global _trace
+    previous = _trace
+    _trace = Trace()
+    try:
+        yield _trace
+    finally:
+        _trace = previous
+
+
+def profiled_call(function, *args, **kwargs):
+    """
+    Call a function with profiling enabled, e.g. in a worker process.
+
+    Returns:
+        tuple: (result of the function, events recorded during the call)
+    """
+    with tracing() as trace:
+        result = function(*args, **kwargs)
+    return result, trace.events
+
+
+def merge(events):
+    """
+    Add events recorded elsewhere, e.g. by a worker process, to the active trace.
+
+    Args:
+        events (list): Events of another trace
+    """
+    if _trace is not None:
+        _trace.events.extend(events)
+
+
+def summarize(events):
+    """
+    Aggregate events by stage name.
+
+    Args:
+        events (list): Events of one or more traces
+
+    Returns:
+        dict: Stage name -> {"count", "total", "mean", "max"} in seconds, plus
+            the sum of every numeric field (e.g. "rows"), by total time
+    """
+    summary = {}
+    for name, _, duration, fields in events:
+        totals = summary.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+        totals["count"] += 1
+        totals["total"] += duration
+        totals["max"] = max(totals["max"], duration)
+        for key, value in fields.items():
+            if key != "page" and isinstance(value, (int, float)) and not isinstance(value, bool):
+                totals[key] = totals.get(key, 0) + value
+    for totals in summary.values():
+        totals["mean"] = totals["total"] / totals["count"]
+    return dict(sorted(summary.items(), key=lambda item: -item[1]["total"]))
+
+
+def event_dicts(events, origin):
+    """
+    Convert events to JSON-friendly dicts, in start order.
+
+    Args:
+        events (list): Events of a trace
+        origin (float): time.perf_counter() value used as time zero
+
+    Returns:
+        list: {"stage", "start", "duration", **fields} dicts, in seconds
+    """
+    return [
+        dict(stage=name, start=round(start - origin, 6), duration=round(duration, 6), **fields)
+        for name, start, duration, fields in sorted(events, key=lambda event: event[1])
+    ]
+
+
+def write_profile(profile_path, origin, files, **info):
+    """
+    Write a profile trace as JSON.
+
+    Args:
+        profile_path (str): Path of the JSON file
+        origin (float): time.perf_counter() value at the start of the run
+        files (list): {"input": path, "events": events, ...} dicts, one per
+            processed file; other keys are written as they are
+        **info: Other values describing the run, e.g. wall_time
+    """
+    all_events = [event for file in files for event in file["events"]]
+    profile = {"version": PROFILE_VERSION, **info}
+    profile["summary"] = summarize(all_events)
+    profile["files"] = [
+        dict(file, events=event_dicts(file["events"], origin)) for file in files
+    ]
+    with open(profile_path, "w", encoding="utf-8") as profile_file:
+        json.dump(profile, profile_file, indent=2)
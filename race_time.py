@@ -0,0 +1,184 @@
+import heapq
+import re
+
+# H:MM:SS, HH:MM:SS or MM:SS, optionally followed by tenths, hundredths or
+# thousandths of a second ("01:02:03.4", "1:02:03,45", "59:59.123")
+TIME_PATTERN = re.compile(r"(?:(\d{1,3}):)?(\d{1,2}):(\d{1,2})(?:[.,](\d{1,3}))?")
+
+# Status codes found in the time column instead of a finish time, with the
+# order in which they are ranked after all the finishers
+STATUS_ORDER = ("DNF", "DSQ", "DNS")
+STATUS_ALIASES = {
+    "DNF": "DNF",
+    "RIT": "DNF",
+    "DSQ": "DSQ",
+    "DQ": "DSQ",
+    "SQ": "DSQ",
+    "DNS": "DNS",
+    "NP": "DNS",
+}
+
+# Sort keys are plain integers: finish times in milliseconds, then status codes,
+# then anything that could not be parsed at all
+STATUS_KEY_BASE = 10 ** 12
+UNKNOWN_KEY = STATUS_KEY_BASE + len(STATUS_ORDER)
+
+
+class RaceTime:
+    """
+    A race time parsed once into an integer number of milliseconds.
+
+    Times that are not a finish time keep their status code (DNF, DSQ, DNS)
+    apart, or are marked as unknown when the value cannot be parsed.
+    """
+
+    __slots__ = ("milliseconds", "status", "sort_key")
+
+    def __init__(self, milliseconds=None, status=None):
+        """
+        Args:
+            milliseconds (int, optional): Finish time, None if not finished
+            status (str, optional): Status code when there is no finish time
+        """
+        self.milliseconds = milliseconds
+        self.status = status
+        if milliseconds is not None:
+            self.sort_key = milliseconds
+        elif status in STATUS_ORDER:
+            self.sort_key = STATUS_KEY_BASE + STATUS_ORDER.index(status)
+        else:
+            self.sort_key = UNKNOWN_KEY
+
+    @property
+    def finished(self):
+        """bool: Whether the time is an actual finish time."""
+        return self.milliseconds is not None
+
+    def __lt__(self, other):
+        return self.sort_key < other.sort_key
+
+    def __eq__(self, other):
+        if not isinstance(other, RaceTime):
+            return NotImplemented
+        return self.milliseconds == other.milliseconds and self.status == other.status
+
+    def __hash__(self):
+        return hash((self.milliseconds, self.status))
+
+    def __repr__(self):
+        return f"RaceTime({self.milliseconds!r}, {self.status!r})"
+
+    def __str__(self):
+        if self.milliseconds is None:
+            return self.status or ""
+        return format_milliseconds(self.milliseconds)
+
+
+def parse_race_time(time_str):
+    """
+    Parse a race time string.
+
+    Args:
+        time_str (str): Race time such as "HH:MM:SS", "MM:SS", "HH:MM:SS.t"
+            or a status code such as "DNF"
+
+    Returns:
+        RaceTime: Parsed time; unknown values have neither time nor status
+    """
+    milliseconds = parse_milliseconds(time_str)
+    if milliseconds is not None:
+        return RaceTime(milliseconds)
+    return RaceTime(status=STATUS_ALIASES.get(time_str.strip().upper()))
+
+
+def parse_milliseconds(time_str):
+    """
+    Parse a finish time string into milliseconds.
+
+    Args:
+        time_str (str): Race time, as accepted by parse_race_time
+
+    Returns:
+        int: Finish time in milliseconds, or None if time_str is not a time
+    """
+    match = TIME_PATTERN.fullmatch(time_str)
+    if match is None:
+        match = TIME_PATTERN.fullmatch(time_str.strip())
+        if match is None:
+            return None
+
+    hours, minutes, seconds, fraction = match.groups()
+    minutes = int(minutes)
+    seconds = int(seconds)
+    if minutes >= 60 or seconds >= 60:
+        return None
+
+    hours = int(hours) if hours else 0
+    milliseconds = ((hours * 60 + minutes) * 60 + seconds) * 1000
+    if fraction:
+        milliseconds += int(fraction.ljust(3, "0"))
+    return milliseconds
+
+
+def race_time_key(time_str):
+    """
+    Integer sort key of a race time string.
+
+    Args:
+        time_str (str): Race time, as accepted by parse_race_time
+
+    Returns:
+        int: Milliseconds for finish times; status codes and unparsable
+            values sort after every finish time
+    """
+    milliseconds = parse_milliseconds(time_str)
+    if milliseconds is not None:
+        return milliseconds
+    status = STATUS_ALIASES.get(time_str.strip().upper())
+    if status is None:
+        return UNKNOWN_KEY
+    return STATUS_KEY_BASE + STATUS_ORDER.index(status)
+
+
+def format_milliseconds(milliseconds):
+    """
+    Format a number of milliseconds as HH:MM:SS, with decimals only if needed.
+
+    Args:
+        milliseconds (int): Race time in milliseconds
+
+    Returns:
+        str: Formatted time, e.g. "01:02:03" or "01:02:03.450"
+    """
+    seconds, fraction = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    text = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    if fraction:
+        text += f".{fraction:03d}"
+    return text
+
+
+def rank_by_time(participants, time_index, top=None):
+    """
+    Sort participants by race time.
+
+    The sort is stable, so participants with the same time keep their
+    document order. When only the first participants are needed, a heap is
+    used instead of sorting the whole list.
+
+    Args:
+        participants (iterable): Participant records
+        time_index (int): Index of the race time in each record
+        top (int, optional): Only return the first top participants
+
+    Returns:
+        list: Participants ordered by race time
+    """
+    def key(participant):
+        return race_time_key(participant[time_index])
+
+    if top is None:
+        return sorted(participants, key=key)
+    # nsmallest is stable and equivalent to sorted(...)[:top]
+    return heapq.nsmallest(top, participants, key=key)
@@ -0,0 +1,159 @@
+import re
+
+from race_time import parse_milliseconds
+
+# Columns appended to the sorted results by add_rankings
+RANKING_COLUMNS = ["sex_pos", "cat", "cat_pos"]
+
+# Indexes of the fields used for rankings in the sorted result rows
+YEAR_INDEX = 3
+SEX_INDEX = 4
+TIME_INDEX = 7
+
+
+def parse_category_bands(spec):
+    """
+    Parse year-of-birth category bands.
+
+    Bands are separated by commas. Each band is a range of birth years,
+    optionally preceded by a name: "1940-1959,1960-1969" or
+    "VET=1940-1969,SEN=1970-1989,JUN=1990-". Either end of a range may be
+    left open.
+
+    Args:
+        spec (str): Category bands specification
+
+    Returns:
+        list: (name, first_year, last_year) tuples, with None for open ends
+
+    Raises:
+        ValueError: If a band is not a valid range, or bands overlap
+    """
+    bands = []
+    for band in spec.split(","):
+        band = band.strip()
+        if not band:
+            continue
+        name, _, years = band.rpartition("=")
+        match = re.fullmatch(r"(\d{4})?-(\d{4})?", years.strip())
+        if match is None or match.groups() == (None, None):
+            raise ValueError(f"Invalid category band: {band}")
+        first_year = int(match.group(1)) if match.group(1) else None
+        last_year = int(match.group(2)) if match.group(2) else None
+        if first_year is not None and last_year is not None and first_year > last_year:
+            raise ValueError(f"Invalid category band: {band}")
+        bands.append((name.strip() or years.strip(), first_year, last_year))
+
+    ordered = sorted(bands, key=lambda band: band[1] if band[1] is not None else -1)
+    for previous, current in zip(ordered, ordered[1:]):
+        if previous[2] is None or current[1] is None or current[1] <= previous[2]:
+            raise ValueError(f"Overlapping category bands: {previous[0]} and {current[0]}")
+    return bands
+
+
+def category_lookup(bands):
+    """
+    Build a function mapping a birth year string to a category name.
+
+    Args:
+        bands (list): Bands as returned by parse_category_bands
+
+    Returns:
+        callable: year string -> band name, or None if no band contains it
+    """
+    cache = {}
+
+    def lookup(year):
+        if year not in cache:
+            name = None
+            if len(year) == 4 and year.isdecimal():
+                value = int(year)
+                for band_name, first_year, last_year in bands:
+                    if (first_year is None or value >= first_year) and (
+                        last_year is None or value <= last_year
+                    ):
+                        name = band_name
+                        break
+            cache[year] = name
+        return cache[year]
+
+    return lookup
+
+
+def add_rankings(rows, bands):
+    """
+    Compute sex and category standings in a single pass over ranked rows.
+
+    Rows must already be sorted by race time: every standing follows from
+    that one sort. Categories are the year-of-birth bands within each sex
+    (e.g. "M 1960-1969"). Only athletes with a finish time get a position;
+    athletes without sex or birth year in a band get no position in the
+    corresponding standing.
+
+    Args:
+        rows (list): Sorted result rows matching pdf_to_csv.CSV_COLUMNS
+        bands (list): Bands as returned by parse_category_bands
+
+    Returns:
+        tuple: (rows, categories) where rows are the input rows extended with
+            RANKING_COLUMNS and categories maps each category name to its
+            rows, in ranking order
+    """
+    lookup = category_lookup(bands)
+    sex_counts = {}
+    category_counts = {}
+    categories = {}
+    ranked_rows = []
+
+    for row in rows:
+        sex = row[SEX_INDEX]
+        band = lookup(row[YEAR_INDEX])
+        category = (f"{sex} {band}" if sex else band) if band else ""
+        finished = parse_milliseconds(row[TIME_INDEX]) is not None
+
+        sex_position = ""
+        if finished and sex:
+            sex_position = sex_counts[sex] = sex_counts.get(sex, 0) + 1
+
+        category_position = ""
+        if finished and category:
+            category_position = category_counts[category] = category_counts.get(category, 0) + 1
+
+        ranked_row = row + [sex_position, category, category_position]
+        ranked_rows.append(ranked_row)
+        if category:
+            categories.setdefault(category, []).append(ranked_row)
+
+    return ranked_rows, categories
+
+
+def top_standings(rows, categories, top):
+    """
+    Keep the first athletes of the overall and of every category standing.
+
+    Standings must be computed on the full results first (see add_rankings),
+    so that every category keeps its own podium rather than the athletes of
+    the overall top that belong to it.
+
+    Args:
+        rows (list): Ranked rows, as returned by add_rankings
+        categories (dict): Rows of each category, as returned by add_rankings
+        top (int): Number of athletes to keep in each standing
+
+    Returns:
+        tuple: (rows, categories) cut to their first top athletes
+    """
+    return rows[:top], {category: category_rows[:top] for category, category_rows in categories.items()}
+
+
+def category_slug(category):
+    """
+    Turn a category name into a string usable in file names.
+
+    Args:
+        category (str): Category name, e.g. "M 1960-1969"
+
+    Returns:
+        str: File name friendly name, e.g. "M_1960-1969"
+    """
+    return re.sub(r"[^\w-]+", "_", category, flags=re.ASCII).strip("_")
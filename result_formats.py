@@ -0,0 +1,188 @@
+import json
+
+from race_time import parse_race_time
+
+# Formats of the sorted results file, with their file extension. CSV is
+# written by pdf_to_csv.write_csv; the others by write_typed_results.
+OUTPUT_FORMATS = {
+    "csv": ".csv",
+    "jsonl": ".jsonl",
+    "parquet": ".parquet",
+    "feather": ".feather",
+}
+
+# Key of the competition metadata in the schema metadata of columnar files
+METADATA_KEY = "race_results"
+
+# Type of each known column in typed formats. Types are
+# "int" (integer or null), "text", "category" (text with few distinct values,
+# dictionary encoded in columnar files) and "milliseconds" (a race time,
+# split in an integer time_ms column and a status category column).
+TYPED_COLUMNS = {
+    "pos": "int",
+    "pett": "int",
+    "athlete": "text",
+    "year": "int",
+    "sex": "category",
+    "team": "text",
+    "nat": "category",
+    "time": "milliseconds",
+    "sex_pos": "int",
+    "cat": "category",
+    "cat_pos": "int",
+}
+
+
+def write_typed_results(rows, path, columns, output_format, metadata=None):
+    """
+    Write sorted race results in a typed format.
+
+    Unlike the CSV, which keeps the values as they appear in the PDF, typed
+    formats follow typed_schema(): integer bib and year (null when missing),
+    categorical sex and nationality, and the race time as integer
+    milliseconds with the DNF/DSQ/DNS status in a separate column.
+
+    Args:
+        rows (list): Sorted result rows matching columns
+        path (str): Path of the file to write
+        columns (list): Column names
+        output_format (str): "jsonl", "parquet" or "feather"
+        metadata (dict, optional): Competition metadata, embedded in the schema
+            of Parquet and Feather files and written next to JSON lines files
+            as <path>.meta.json
+
+    Returns:
+        list: Paths of the files written
+
+    Raises:
+        ValueError: If the format is not a typed format
+        ImportError: If pyarrow is needed but not installed
+    """
+    if output_format == "jsonl":
+        write_jsonl(rows, path, columns, metadata)
+        return [path, f"{path}.meta.json"]
+    elif output_format in ("parquet", "feather"):
+        write_arrow(rows, path, columns, output_format, metadata)
+        return [path]
+    else:
+        raise ValueError(
+            f"Unknown typed output format: {output_format} (choose from jsonl, parquet, feather)"
+        )
+
+
+def typed_schema(columns):
+    """
+    Return the typed columns written for the given result columns.
+
+    Args:
+        columns (list): Column names of the result rows
+
+    Returns:
+        list: (name, type) pairs; a "milliseconds" column becomes a "time_ms"
+            int column followed by a "status" category column
+    """
+    schema = []
+    for name in columns:
+        column_type = TYPED_COLUMNS.get(name, "text")
+        if column_type == "milliseconds":
+            schema += [("time_ms", "int"), ("status", "category")]
+        else:
+            schema.append((name, column_type))
+    return schema
+
+
+def typed_columns(rows, columns):
+    """
+    Convert result rows to typed column lists.
+
+    Args:
+        rows (list): Sorted result rows matching columns
+        columns (list): Column names
+
+    Returns:
+        dict: Column name -> list of values, following typed_schema(columns)
+    """
+    values = {}
+    for index, name in enumerate(columns):
+        column_type = TYPED_COLUMNS.get(name, "text")
+        texts = [row[index] for row in rows]
+        if column_type == "int":
+            values[name] = [to_int(text) for text in texts]
+        elif column_type == "milliseconds":
+            race_times = [parse_race_time(text) for text in texts]
+            values["time_ms"] = [race_time.milliseconds for race_time in race_times]
+            values["status"] = [race_time.status for race_time in race_times]
+        elif column_type == "category":
+            values[name] = [str(text) or None for text in texts]
+        else:
+            values[name] = [str(text) for text in texts]
+    return values
+
+
+def to_int(value):
+    """
+    Convert a cell to an integer.
+
+    Args:
+        value (int or str): Cell value, e.g. 12, "0012", "null" or ""
+
+    Returns:
+        int: The integer, or None if the cell does not hold one
+    """
+    if isinstance(value, int):
+        return value
+    value = value.strip()
+    return int(value) if value.isdecimal() else None
+
+
+def write_jsonl(rows, path, columns, metadata=None):
+    """Write typed results as one JSON object per line (see write_typed_results)."""
+    values = typed_columns(rows, columns)
+    names = list(values)
+    with open(path, mode="w", encoding="utf-8") as jsonl_file:
+        for record in zip(*values.values()):
+            jsonl_file.write(json.dumps(dict(zip(names, record)), ensure_ascii=False))
+            jsonl_file.write("\n")
+
+    # JSON lines have no room for file metadata: keep it alongside
+    with open(f"{path}.meta.json", mode="w", encoding="utf-8") as meta_file:
+        json.dump(
+            {METADATA_KEY: metadata or {}, "schema": dict(typed_schema(columns))},
+            meta_file,
+            ensure_ascii=False,
+            indent=2,
+        )
+
+
+def write_arrow(rows, path, columns, output_format, metadata=None):
+    """Write typed results as a Parquet or Feather file (see write_typed_results)."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError(
+            f"The {output_format} format needs pyarrow: pip install pyarrow"
+        ) from None
+
+    arrow_types = {
+        "int": pa.int64(),
+        "text": pa.string(),
+        "category": pa.dictionary(pa.int32(), pa.string()),
+    }
+    schema = pa.schema(
+        [pa.field(name, arrow_types[column_type]) for name, column_type in typed_schema(columns)],
+        metadata={METADATA_KEY: json.dumps(metadata or {}, ensure_ascii=False)},
+    )
+    values = typed_columns(rows, columns)
+    table = pa.table(
+        [pa.array(values[field.name], type=field.type) for field in schema],
+        schema=schema,
+    )
+
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, path)
+    else:
+        import pyarrow.feather as feather
+
+        feather.write_feather(table, path)
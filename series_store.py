@@ -0,0 +1,306 @@
+import csv
+import hashlib
+import json
+import re
+import sqlite3
+import time
+import unicodedata
+
+from race_time import format_milliseconds, parse_milliseconds
+
+# Points awarded for each position in the standings of a sex, from the
+# winner down. Finishers further down the standings get no points.
+DEFAULT_POINTS = (
+    100, 80, 65, 55, 50, 45, 40, 36, 32, 29,
+    26, 24, 22, 20, 18, 16, 14, 12, 10, 9,
+    8, 7, 6, 5, 4, 3, 2, 1,
+)
+
+# Columns of the series standings, as written to the CSV
+STANDINGS_COLUMNS = ["rank", "athlete", "year", "sex", "races", "points", "best_time"]
+
+# Seconds a connection waits for another process to release the database,
+# e.g. while batch workers add their races
+LOCK_TIMEOUT = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS races (
+    race_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    title TEXT,
+    date TEXT,
+    site TEXT,
+    metadata TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS athletes (
+    athlete_id INTEGER PRIMARY KEY,
+    name_key TEXT NOT NULL,
+    year TEXT NOT NULL,
+    sex TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (name_key, year, sex)
+);
+CREATE TABLE IF NOT EXISTS results (
+    race_id INTEGER NOT NULL REFERENCES races (race_id) ON DELETE CASCADE,
+    athlete_id INTEGER NOT NULL REFERENCES athletes (athlete_id),
+    position INTEGER NOT NULL,
+    sex_position INTEGER,
+    bib TEXT,
+    team TEXT,
+    nat TEXT,
+    time_ms INTEGER,
+    PRIMARY KEY (race_id, athlete_id)
+);
+CREATE INDEX IF NOT EXISTS results_athlete ON results (athlete_id, sex_position);
+CREATE TABLE IF NOT EXISTS points (
+    position INTEGER PRIMARY KEY,
+    points INTEGER NOT NULL
+);
+"""
+
+STANDINGS_QUERY = """
+WITH scored AS (
+    SELECT results.athlete_id, COALESCE(points.points, 0) AS points, results.time_ms,
+           ROW_NUMBER() OVER (
+               PARTITION BY results.athlete_id ORDER BY COALESCE(points.points, 0) DESC
+           ) AS result_rank
+    FROM results LEFT JOIN points ON points.position = results.sex_position
+    WHERE results.sex_position IS NOT NULL
+),
+totals AS (
+    SELECT athlete_id, COUNT(*) AS races, SUM(points) AS total, MIN(time_ms) AS best_time
+    FROM scored
+    WHERE :best IS NULL OR result_rank <= :best
+    GROUP BY athlete_id
+)
+SELECT RANK() OVER (PARTITION BY athletes.sex ORDER BY totals.total DESC),
+       athletes.name, athletes.year, athletes.sex, totals.races, totals.total,
+       totals.best_time
+FROM totals JOIN athletes USING (athlete_id)
+WHERE :sex IS NULL OR athletes.sex = :sex
+ORDER BY athletes.sex, totals.total DESC, athletes.name_key, athletes.year
+"""
+
+
+def athlete_key(name, year, sex):
+    """
+    Build the key identifying an athlete across races.
+
+    The name is compared without accents, case, punctuation and extra spaces,
+    so "Élodie  Martin" and "ELODIE MARTIN" are the same athlete when the year
+    of birth and sex also match.
+
+    Args:
+        name (str): Athlete name as printed in the results
+        year (str): Year of birth, possibly empty or "null"
+        sex (str): Sex, possibly empty
+
+    Returns:
+        tuple: (name_key, year, sex)
+    """
+    name_key = unicodedata.normalize("NFKD", name)
+    name_key = "".join(char for char in name_key if not unicodedata.combining(char))
+    name_key = " ".join(re.sub(r"[\W_]+", " ", name_key.upper()).split())
+    if not year.isdecimal():
+        year = ""
+    return name_key, year, sex.strip().upper()
+
+
+class SeriesStore:
+    """
+    SQLite store of the results of a series of races.
+
+    Athletes are indexed by their normalized (name, year, sex) key, so the
+    standings of the whole series come from a single grouped query instead of
+    matching every race against every other. Adding a race again replaces its
+    results only, and does nothing when they did not change.
+
+    Args:
+        db_path (str): Path to the SQLite database, created if missing
+        points (sequence, optional): Points for each position in the standings
+            of a sex, from the winner down. Defaults to DEFAULT_POINTS for a
+            new store; an existing store keeps its own table.
+    """
+
+    def __init__(self, db_path, points=None):
+        self.connection = sqlite3.connect(db_path, timeout=LOCK_TIMEOUT)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            empty = self.connection.execute("SELECT COUNT(*) FROM points").fetchone()[0] == 0
+        if points is not None or empty:
+            self.set_points(DEFAULT_POINTS if points is None else points)
+
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def set_points(self, points):
+        """
+        Replace the points table of the series.
+
+        Args:
+            points (sequence): Points for each position, from the winner down
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM points")
+            self.connection.executemany(
+                "INSERT INTO points (position, points) VALUES (?, ?)",
+                enumerate(points, 1),
+            )
+
+    def add_race(self, name, rows, metadata=None):
+        """
+        Add the results of a race, or replace them if the race is known.
+
+        Args:
+            name (str): Name identifying the race in the series, e.g. the
+                input file name
+            rows (list): Sorted result rows matching pdf_to_csv.CSV_COLUMNS,
+                as returned by extract_results
+            metadata (dict, optional): Competition metadata, as returned by
+                pdf_to_csv
+
+        Returns:
+            bool: True if the store changed, False if the race was already
+                stored with the same results
+        """
+        metadata = metadata or {}
+        digest = hashlib.sha256(
+            json.dumps([rows, metadata], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+        athletes = {}
+        results = []
+        sex_counts = {}
+        for position, bib, athlete, year, sex, team, nat, race_time in (row[:8] for row in rows):
+            key = athlete_key(athlete, year, sex)
+            if key in athletes:
+                # Homonyms born the same year: only the best placed one counts
+                continue
+            athletes[key] = athlete
+
+            time_ms = parse_milliseconds(race_time)
+            sex_position = None
+            if time_ms is not None and key[2]:
+                sex_position = sex_counts[key[2]] = sex_counts.get(key[2], 0) + 1
+            results.append((int(position), sex_position, bib, team, nat, time_ms) + key)
+
+        with self.connection:
+            row = self.connection.execute(
+                "SELECT race_id, digest FROM races WHERE name = ?", (name,)
+            ).fetchone()
+            if row is not None and row[1] == digest:
+                return False
+
+            values = (
+                metadata.get("title"), metadata.get("date"), metadata.get("site"),
+                json.dumps(metadata, default=str), digest, time.time(), name,
+            )
+            if row is None:
+                race_id = self.connection.execute(
+                    "INSERT INTO races (title, date, site, metadata, digest, updated_at, name)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    values,
+                ).lastrowid
+            else:
+                race_id = row[0]
+                self.connection.execute(
+                    "UPDATE races SET title = ?, date = ?, site = ?, metadata = ?,"
+                    " digest = ?, updated_at = ? WHERE name = ?",
+                    values,
+                )
+                self.connection.execute("DELETE FROM results WHERE race_id = ?", (race_id,))
+
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO athletes (name_key, year, sex, name) VALUES (?, ?, ?, ?)",
+                (key + (athlete,) for key, athlete in athletes.items()),
+            )
+            self.connection.executemany(
+                "INSERT INTO results"
+                " (race_id, athlete_id, position, sex_position, bib, team, nat, time_ms)"
+                " SELECT ?, athlete_id, ?, ?, ?, ?, ?, ? FROM athletes"
+                " WHERE name_key = ? AND year = ? AND sex = ?",
+                ((race_id,) + result for result in results),
+            )
+        return True
+
+    def remove_race(self, name):
+        """
+        Remove a race and its results from the series.
+
+        Args:
+            name (str): Name of the race, as given to add_race
+
+        Returns:
+            bool: True if the race was in the store
+        """
+        with self.connection:
+            cursor = self.connection.execute("DELETE FROM races WHERE name = ?", (name,))
+        return cursor.rowcount > 0
+
+    def races(self):
+        """
+        List the races of the series.
+
+        Returns:
+            list: (name, title, date, site, athletes) tuples, by name
+        """
+        return self.connection.execute(
+            "SELECT races.name, races.title, races.date, races.site, COUNT(results.athlete_id)"
+            " FROM races LEFT JOIN results USING (race_id)"
+            " GROUP BY races.race_id ORDER BY races.name"
+        ).fetchall()
+
+    def standings(self, sex=None, best=None):
+        """
+        Compute the series standings.
+
+        Athletes are ranked within their sex by the sum of the points of their
+        results. Every finish counts as a race, including those placed beyond
+        the points table.
+
+        Args:
+            sex (str, optional): Only rank athletes of this sex. Defaults to
+                None (every sex, one ranking each).
+            best (int, optional): Only count the best results of each athlete.
+                Defaults to None (all results).
+
+        Returns:
+            list: Rows matching STANDINGS_COLUMNS, by sex and rank
+        """
+        rows = self.connection.execute(
+            STANDINGS_QUERY, {"sex": sex, "best": best}
+        ).fetchall()
+        return [
+            list(row[:6]) + [format_milliseconds(row[6]) if row[6] is not None else ""]
+            for row in rows
+        ]
+
+    def write_standings(self, csv_path, sex=None, best=None):
+        """
+        Write the series standings to a CSV file.
+
+        Args:
+            csv_path (str): Path where the CSV will be saved
+            sex (str, optional): Only rank athletes of this sex
+            best (int, optional): Only count the best results of each athlete
+
+        Returns:
+            int: Number of athletes in the standings
+        """
+        rows = self.standings(sex, best)
+        with open(csv_path, mode="w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(STANDINGS_COLUMNS)
+            writer.writerows(rows)
+        return len(rows)
@@ -0,0 +1,84 @@
+import os
+import time
+
+from extraction_cache import file_digest
+
+
+class FolderWatcher:
+    """
+    Detect new or modified PDF files in a folder by polling.
+
+    A file is reported once its modification time and size have not changed
+    for the debounce interval, so files still being copied are not picked up
+    half-written. Files whose content is identical to the last reported
+    version (e.g. touched or re-uploaded unchanged) are not reported again.
+    """
+
+    def __init__(self, directory, debounce=2.0):
+        """
+        Args:
+            directory (str): Folder to watch
+            debounce (float, optional): Seconds a file must stay unchanged
+                before it is reported. Defaults to 2.0.
+        """
+        self.directory = directory
+        self.debounce = debounce
+        # path -> ((mtime_ns, size), monotonic time the signature was first seen)
+        self._pending = {}
+        # path -> (mtime_ns, size) of the last version checked
+        self._checked = {}
+        # path -> content digest of the last version reported
+        self._digests = {}
+
+    def poll(self):
+        """
+        Scan the folder once.
+
+        Returns:
+            list: (path, mtime) tuples of the files whose content changed,
+                in file name order. mtime is the time the file landed.
+        """
+        now = time.monotonic()
+        seen = set()
+        changed = []
+
+        with os.scandir(self.directory) as entries:
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                if not entry.name.endswith(".pdf") or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                path = entry.path
+                signature = (stat.st_mtime_ns, stat.st_size)
+                seen.add(path)
+
+                if self._checked.get(path) == signature:
+                    self._pending.pop(path, None)
+                    continue
+
+                pending = self._pending.get(path)
+                if pending is None or pending[0] != signature:
+                    self._pending[path] = (signature, now)
+                    continue
+                if now - pending[1] < self.debounce:
+                    continue
+
+                del self._pending[path]
+                self._checked[path] = signature
+                try:
+                    digest = file_digest(path)
+                except FileNotFoundError:
+                    continue
+                if self._digests.get(path) == digest:
+                    continue
+                self._digests[path] = digest
+                changed.append((path, stat.st_mtime))
+
+        # Forget removed files, so they are processed again if they come back
+        for state in (self._pending, self._checked, self._digests):
+            for path in [path for path in state if path not in seen]:
+                del state[path]
+
+        return changed